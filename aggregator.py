@@ -0,0 +1,110 @@
+"""
+Streaming windowed aggregates for high-rate sensors.
+
+Each configured sensor keeps one running summary per numeric field (min,
+max, sum, count, last) for the current window, so memory is O(1) per
+sensor however fast it reports. Windows are aligned to multiples of
+`window` seconds since the epoch. When a reading lands in a later window,
+or flush() is called after a window has ended, the closed window is turned
+into one reading of measurement "<sensor_type>_agg" whose value holds
+min/max/mean/count/last (prefixed with the field name for JSON object
+values such as the gyroscope's x/y/z) and whose timestamp is the window
+start. Booleans count as 0/1, so "significant_max" says whether any sample
+in the window was significant; other non-numeric fields are ignored.
+"""
+import json
+import threading
+
+
+class _Window:
+    __slots__ = ("start", "sensor_type", "simulated", "unit", "count", "fields")
+
+    def __init__(self, start, sensor_type, simulated, unit):
+        self.start = start
+        self.sensor_type = sensor_type
+        self.simulated = simulated
+        self.unit = unit
+        self.count = 0
+        self.fields = {}    # field -> [min, max, sum, last]
+
+    def add(self, values):
+        self.count += 1
+        for field, v in values.items():
+            stats = self.fields.get(field)
+            if stats is None:
+                self.fields[field] = [v, v, v, v]
+            else:
+                if v < stats[0]:
+                    stats[0] = v
+                if v > stats[1]:
+                    stats[1] = v
+                stats[2] += v
+                stats[3] = v
+
+    def summary(self):
+        out = {"count": self.count}
+        for field, (lo, hi, total, last) in self.fields.items():
+            prefix = f"{field}_" if field else ""
+            out[prefix + "min"] = lo
+            out[prefix + "max"] = hi
+            out[prefix + "mean"] = round(total / self.count, 3)
+            out[prefix + "last"] = last
+        return out
+
+
+def numeric_fields(value):
+    """{field: number} of a reading value ("" is the field of a plain number)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    if isinstance(value, (int, float)):
+        return {"": float(value)}
+    if isinstance(value, dict):
+        return {k: float(v) for k, v in value.items() if isinstance(v, (int, float))}
+    return {}
+
+
+class WindowAggregator:
+    def __init__(self, window=10.0, modes=None):
+        """modes: sensor_type -> "both" (raw and aggregates) or "aggregate" (aggregates only)."""
+        self.window = window
+        self.modes = dict(modes or {})
+        self._windows = {}      # sensor id -> _Window
+        self._closed = []
+        self._lock = threading.Lock()
+
+    def mode(self, sensor_type):
+        return self.modes.get(sensor_type)
+
+    def add(self, sensor_id, sensor_type, value, simulated, unit, timestamp):
+        values = numeric_fields(value)
+        if not values:
+            return
+        start = timestamp - timestamp % self.window
+        with self._lock:
+            current = self._windows.get(sensor_id)
+            if current is not None and current.start != start:
+                self._closed.append((sensor_id, current))
+                current = None
+            if current is None:
+                current = self._windows[sensor_id] = _Window(start, sensor_type, simulated, unit)
+            current.add(values)
+
+    def flush(self, now):
+        """Close windows that ended before now; return them as aggregate readings."""
+        with self._lock:
+            for sensor_id, current in list(self._windows.items()):
+                if current.start + self.window <= now:
+                    self._closed.append((sensor_id, current))
+                    del self._windows[sensor_id]
+            closed, self._closed = self._closed, []
+        return [{
+            "measurement": f"{w.sensor_type}_agg",
+            "sensor_id": sensor_id,
+            "value": w.summary(),
+            "simulated": w.simulated,
+            "unit": w.unit,
+            "timestamp": w.start,
+        } for sensor_id, w in closed]
@@ -0,0 +1,102 @@
+"""
+Windowed aggregates: InfluxDB points, bytes and dashboard scan size.
+
+Streams --hours of DUS1/DUS2 (every 0.5 s) and gyroscope (every 1 s)
+readings through a WindowAggregator and compares what reaches InfluxDB:
+raw points as the server writes them today against one "<type>_agg" point
+per sensor per window. Sizes are line protocol as the InfluxDB client
+sends it. A Grafana panel over the last --range hours scans every point in
+the range, so the scan size is reported too. Also reports the add() cost
+per reading and that the aggregator's memory stays at one window per
+sensor.
+
+Usage:
+    python benchmarks/bench_aggregator.py [--hours 24] [--window 10] [--range 6]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aggregator import WindowAggregator  # noqa: E402
+
+TAGS = "pi_id=PI1,device_name=DoorController,simulated=true"
+
+
+def line(measurement, sensor_id, unit, fields, timestamp):
+    field_str = ",".join(f"{k}={float(v)}" for k, v in fields.items())
+    return f"{measurement},{TAGS},sensor_id={sensor_id},unit={unit} {field_str} {int(timestamp * 1e9)}"
+
+
+def raw_fields(value):
+    # What server/app.py stores for a raw reading
+    if isinstance(value, (int, float)):
+        return {"value": float(value)}
+    return {"value_str": 0.0, "value": 1.0}
+
+
+def readings(hours, seed=1):
+    rng = random.Random(seed)
+    distance = [150.0, 150.0]
+    start = 1.7e9
+    for step in range(int(hours * 7200)):
+        t = start + step * 0.5
+        for i, sid in enumerate(("DUS1", "DUS2")):
+            distance[i] = min(400, max(2, distance[i] + rng.uniform(-5, 5)))
+            yield t, sid, "ultrasonic", round(distance[i], 2), "cm"
+        if step % 2 == 0:
+            value = json.dumps({"x": round(rng.uniform(-0.5, 0.5), 2), "y": round(rng.uniform(-0.5, 0.5), 2),
+                                "z": round(9.81 + rng.uniform(-0.3, 0.3), 2), "significant": False})
+            yield t, "GSG", "gyroscope", value, "m/s2"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--window", type=float, default=10)
+    parser.add_argument("--range", type=float, default=6, help="hours shown by the dashboard panel")
+    args = parser.parse_args()
+
+    aggregator = WindowAggregator(args.window, {"ultrasonic": "both", "gyroscope": "both"})
+    raw = {"points": 0, "bytes": 0}
+    agg = {"points": 0, "bytes": 0}
+    add_time = 0.0
+    n = 0
+    max_open = 0
+    last_flush = 0.0
+    end = 1.7e9 + args.hours * 3600
+    scan_from = end - args.range * 3600
+    raw_scan = agg_scan = 0
+    for t, sensor_id, sensor_type, value, unit in readings(args.hours):
+        raw["points"] += 1
+        raw["bytes"] += len(line(sensor_type, sensor_id, unit, raw_fields(value), t)) + 1
+        raw_scan += t >= scan_from
+        started = time.perf_counter()
+        aggregator.add(sensor_id, sensor_type, value, True, unit, t)
+        add_time += time.perf_counter() - started
+        n += 1
+        if t - last_flush >= 5:  # the publisher flushes once per batch interval
+            last_flush = t
+            max_open = max(max_open, len(aggregator._windows))
+            for r in aggregator.flush(t):
+                agg["points"] += 1
+                agg["bytes"] += len(line(r["measurement"], r["sensor_id"], r["unit"], r["value"],
+                                         r["timestamp"])) + 1
+                agg_scan += r["timestamp"] >= scan_from
+
+    print(f"{args.hours:.0f}h of DUS1, DUS2 and GSG readings, {args.window:.0f}s windows\n")
+    print(f"{'written':<12}{'points':>10}{'MB':>9}{f'points in {args.range:.0f}h panel':>22}")
+    print(f"{'raw':<12}{raw['points']:>10}{raw['bytes'] / 1e6:>9.1f}{raw_scan:>22}")
+    print(f"{'aggregates':<12}{agg['points']:>10}{agg['bytes'] / 1e6:>9.1f}{agg_scan:>22}")
+    print(f"\npoints {raw['points'] / agg['points']:.0f}x fewer, bytes "
+          f"{raw['bytes'] / agg['bytes']:.1f}x fewer, dashboard scan {raw_scan / max(agg_scan, 1):.0f}x smaller")
+    print(f"add(): {add_time / n * 1e6:.1f} us per reading, at most {max_open} open windows "
+          f"(one per sensor)")
+
+
+if __name__ == "__main__":
+    main()
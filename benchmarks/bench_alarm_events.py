@@ -0,0 +1,133 @@
+"""
+Alarm events endpoint: request latency and event-loop stalls.
+
+Several dashboards poll /api/alarm-events concurrently while a ticker
+coroutine measures how late the asyncio event loop wakes it (every other
+request and WebSocket frame waits just as long). The legacy handler runs a
+synchronous Flux query inside the coroutine; InfluxDB is replaced by a
+stand-in that takes --influx-ms per query. The indexed handler is
+server/app.py's get_alarm_events over an EventIndex holding --events
+recent events. Also times deep pagination through the whole index.
+
+Usage:
+    python benchmarks/bench_alarm_events.py [--events 5000] [--influx-ms 30] [--clients 5] [--polls 40]
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+
+with redirect_stdout(io.StringIO()):
+    import app  # noqa: E402
+from event_index import EventIndex  # noqa: E402
+
+EVENTS = ("arming", "armed", "alarm_activated", "alarm_deactivated", "wrong_pin")
+
+
+class SlowQueryApi:
+    """Returns nothing after blocking like a real InfluxDB round trip."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def query(self, query, org=None):
+        time.sleep(self.delay)
+        return []
+
+
+async def legacy_get_alarm_events(query_api):
+    # The handler before the event index: blocking query inside async def
+    query = '''
+    from(bucket: "pi1_data")
+      |> range(start: -24h)
+      |> filter(fn: (r) => r["_measurement"] == "event")
+      |> filter(fn: (r) => r["sensor_id"] == "ALARM")
+      |> sort(columns: ["_time"], desc: true)
+      |> limit(n: 50)
+    '''
+    tables = query_api.query(query, org="pi1_org")
+    return {"events": [r for t in tables for r in t.records]}
+
+
+async def run(handler, clients, polls):
+    latencies = []
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            stalls.append(max(0.0, time.perf_counter() - expected))
+
+    async def dashboard():
+        for _ in range(polls):
+            start = time.perf_counter()
+            await handler()
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(dashboard() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return sorted(latencies), sorted(stalls), elapsed
+
+
+def pct(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--influx-ms", type=float, default=30)
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--polls", type=int, default=40)
+    args = parser.parse_args()
+
+    now = time.time()
+    app.alarm_events = EventIndex(capacity=args.events * 2, covered_from=now - 86400)
+    for i in range(args.events):
+        app.alarm_events.add("PI1", EVENTS[i % len(EVENTS)], now - 86000 + i * 86000 / args.events)
+    app.query_api = SlowQueryApi(args.influx_ms / 1000)
+
+    print(f"{args.clients} dashboards x {args.polls} polls, {args.events} events indexed, "
+          f"InfluxDB query {args.influx_ms:.0f} ms\n")
+    print(f"{'handler':<10}{'p50':>10}{'p99':>10}{'loop stall p99':>16}{'max stall':>11}{'req/s':>9}")
+    handlers = (("legacy", lambda: legacy_get_alarm_events(app.query_api)),
+                ("indexed", lambda: app.get_alarm_events()))
+    for name, handler in handlers:
+        latencies, stalls, elapsed = asyncio.run(run(handler, args.clients, args.polls))
+        print(f"{name:<10}{pct(latencies, 0.5) * 1e6:>8.0f}us{pct(latencies, 0.99) * 1e6:>8.0f}us"
+              f"{pct(stalls, 0.99) * 1e3:>14.1f}ms{stalls[-1] * 1e3:>9.1f}ms"
+              f"{len(latencies) / elapsed:>9.0f}")
+
+    async def paginate():
+        pages = seen = 0
+        cursor = None
+        while True:
+            page = await app.get_alarm_events(limit=100, before=cursor)
+            pages += 1
+            seen += len(page["events"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages, seen
+
+    start = time.perf_counter()
+    pages, seen = asyncio.run(paginate())
+    elapsed = time.perf_counter() - start
+    print(f"\npaginated all {seen} events in {pages} pages of 100: "
+          f"{elapsed / pages * 1e6:.0f} us per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Clip recorder: capture-thread cost, memory and disk use over a long run.
+
+A fake camera thread hands JPEG-sized frames to ClipRecorder.on_frame at
+--fps while alarms/motion trigger clips every --every seconds. Reports the
+time on_frame takes on the capture thread (it must never wait for the
+disk), the ring's size and the process RSS at each report interval (both
+should stay flat), and the clip directory size against its quota.
+
+Usage:
+    python benchmarks/bench_clip_recorder.py [--seconds 60] [--fps 30] [--quota-mb 20]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from clip_recorder import ClipRecorder  # noqa: E402
+from scheduler import process_stats  # noqa: E402
+
+
+def dir_size(path):
+    return sum(e.stat().st_size for e in os.scandir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frame-kb", type=int, default=40)
+    parser.add_argument("--every", type=float, default=4.0, help="seconds between triggers")
+    parser.add_argument("--quota-mb", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="clips-")
+    recorder = ClipRecorder(directory, pre_roll=2, post_roll=2, max_clip=10,
+                            ring_bytes=8 * 1024 * 1024, quota_bytes=args.quota_mb * 1024 * 1024)
+    recorder.start()
+    # A few distinct frames, reused like a camera's immutable buffers
+    frames = [bytes([i]) * (args.frame_kb * 1024) for i in range(16)]
+    costs = []
+    stop = threading.Event()
+
+    def camera():
+        n = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            recorder.on_frame(frames[n % len(frames)])
+            costs.append(time.perf_counter() - started)
+            n += 1
+            stop.wait(1.0 / args.fps)
+
+    thread = threading.Thread(target=camera, daemon=True)
+    thread.start()
+
+    print(f"{args.frame_kb} kB frames at {args.fps} fps, trigger every {args.every}s, "
+          f"quota {args.quota_mb} MB\n")
+    print(f"{'t (s)':>6}{'ring kB':>9}{'RSS kB':>9}{'disk MB':>9}{'clips':>7}{'dropped':>9}")
+    start = time.monotonic()
+    next_trigger = start + 1.0
+    next_report = start + 5.0
+    while time.monotonic() - start < args.seconds:
+        now = time.monotonic()
+        if now >= next_trigger:
+            recorder.trigger("bench")
+            next_trigger += args.every
+        if now >= next_report:
+            s = recorder.get_stats()
+            print(f"{now - start:>6.0f}{s['ring_kb']:>9}{process_stats()['rss_kb']:>9}"
+                  f"{dir_size(directory) / 1e6:>9.1f}{s['clips']:>7}{s['dropped']:>9}")
+            next_report += 5.0
+        time.sleep(0.05)
+
+    stop.set()
+    thread.join()
+    recorder.stop()
+    costs.sort()
+    print(f"\non_frame: p50 {costs[len(costs) // 2] * 1e6:.1f} us, "
+          f"p99 {costs[int(len(costs) * 0.99)] * 1e6:.1f} us, max {costs[-1] * 1e6:.0f} us "
+          f"over {len(costs)} frames")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Command endpoints: p99 latency under concurrent API calls.
+
+Fires --calls concurrent POSTs at the LED endpoint through the ASGI app
+(httpx in-process transport) while a ticker coroutine measures how late the
+event loop wakes it. The MQTT client is replaced by a stand-in whose
+publish() blocks for --publish-ms, as paho does while its network thread
+holds the client lock or the socket buffer is full, and answers each
+command with a device acknowledgement --ack-ms later from another thread.
+The legacy handler publishes inside the coroutine; the bus handler is
+server/app.py's, which queues the command for the publisher task. Also
+times the same calls waiting for the device acknowledgement (?wait=true).
+
+Usage:
+    python benchmarks/bench_command_bus.py [--calls 200] [--publish-ms 2] [--ack-ms 5]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+
+with redirect_stdout(io.StringIO()):
+    import app  # noqa: E402
+
+
+class PublishInfo:
+    rc = 0
+
+
+class SlowClient:
+    """paho stand-in: publish() blocks under a lock, the device acks commands later."""
+
+    def __init__(self, publish_delay, ack_delay, on_ack):
+        self.publish_delay = publish_delay
+        self.ack_delay = ack_delay
+        self.on_ack = on_ack
+        self.published = 0
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        with self._lock:
+            time.sleep(self.publish_delay)
+            self.published += 1
+        command_id = json.loads(payload).get("id")
+        if command_id:
+            ack = {"id": command_id, "status": "ok", "exec_ms": 0.1}
+            threading.Timer(self.ack_delay, self.on_ack, args=(ack,)).start()
+        return PublishInfo()
+
+
+def install_legacy_route(client):
+    # The handler before the command bus: blocking publish inside async def
+    @app.app.post("/bench/legacy/led")
+    async def legacy_led(req: app.ActuatorRequest):
+        client.publish("pi1/commands/led", json.dumps({"action": req.action}))
+        return {"status": "ok"}
+
+
+async def run(call, calls):
+    latencies = []
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            stalls.append(max(0.0, time.perf_counter() - expected))
+
+    async def one(i):
+        await call(i)
+        # From the moment all calls were fired, as the clients see it
+        latencies.append(time.perf_counter() - started)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return sorted(latencies), sorted(stalls), elapsed
+
+
+def pct(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def bench(args):
+    bus = app.command_bus
+    client = SlowClient(args.publish_ms / 1000, args.ack_ms / 1000, bus.on_ack)
+    bus.client = client
+    await bus.start()
+    install_legacy_route(client)
+
+    transport = httpx.ASGITransport(app=app.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def post(path):
+            response = await http.post(path, json={"action": "toggle"})
+            assert response.status_code == 200, response.text
+
+        modes = (
+            ("legacy", lambda i: post("/bench/legacy/led")),
+            ("bus", lambda i: post("/api/led")),
+            ("bus+ack", lambda i: post("/api/led?wait=true")),
+        )
+        for name, call in modes:
+            before = client.published
+            latencies, stalls, elapsed = await run(call, args.calls)
+            # Let queued commands reach the client before the next mode
+            while client.published - before < args.calls:
+                await asyncio.sleep(0.01)
+            results.append((name, latencies, stalls, elapsed))
+    await bus.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--publish-ms", type=float, default=2)
+    parser.add_argument("--ack-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.calls} concurrent command calls, publish blocks {args.publish_ms:g} ms, "
+          f"device ack after {args.ack_ms:g} ms\n")
+    print(f"{'handler':<10}{'p50':>10}{'p99':>10}{'max':>10}{'loop stall p99':>16}{'calls/s':>9}")
+    for name, latencies, stalls, elapsed in asyncio.run(bench(args)):
+        print(f"{name:<10}{pct(latencies, 0.5) * 1e3:>8.1f}ms{pct(latencies, 0.99) * 1e3:>8.1f}ms"
+              f"{latencies[-1] * 1e3:>8.1f}ms{pct(stalls, 0.99) * 1e3:>14.1f}ms"
+              f"{len(latencies) / elapsed:>9.0f}")
+    print(f"\ncommand bus: {app.command_bus.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Accuracy and throughput of enter/exit detection.
+
+Builds labeled traces from simulators/ultrasonic.generate_distance sampled
+every 0.5 s (as DUS1/DUS2 are). The label at each PIR event is the true net
+movement over the last 5 s of the clean walk (< -10 cm ENTERING,
+> +10 cm EXITING, otherwise none). Classifiers see the walk with added sensor
+noise and occasional spurious echoes. The previous first-half/second-half
+average split is compared to the streaming DirectionEstimator.
+
+Usage:
+    python benchmarks/bench_direction.py [--traces 200] [--noise 4] [--spikes 0.03]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from direction import HAS_NUMPY, DirectionEstimator, estimate_trace  # noqa: E402
+from simulators.ultrasonic import generate_distance  # noqa: E402
+
+PERIOD = 0.5
+WINDOW = 5.0
+
+
+def legacy_direction(buf, now):
+    """PeopleCounter.detect_direction before the streaming estimator (no cooldown)."""
+    if len(buf) < 5:
+        return None
+    recent = [(d, t) for d, t in buf if now - t < WINDOW]
+    if len(recent) < 4:
+        return None
+    mid = len(recent) // 2
+    first_half_avg = sum(d for d, _ in recent[:mid]) / mid
+    second_half_avg = sum(d for d, _ in recent[mid:]) / (len(recent) - mid)
+    diff = second_half_avg - first_half_avg
+    if diff < -10:
+        return "ENTERING"
+    elif diff > 10:
+        return "EXITING"
+    return None
+
+
+def make_trace(seed, length, noise, spikes):
+    random.seed(seed)
+    walk = generate_distance(random.uniform(50, 350))
+    clean = [next(walk) for _ in range(length)]
+    rnd = random.Random(seed + 1)
+    observed = []
+    for d in clean:
+        if rnd.random() < spikes:
+            observed.append(rnd.uniform(2, 400))
+        else:
+            observed.append(min(400.0, max(2.0, d + rnd.gauss(0, noise))))
+    timestamps = [i * PERIOD for i in range(length)]
+    return timestamps, clean, observed
+
+
+def label(clean, i):
+    steps = int(WINDOW / PERIOD) - 1
+    if i < steps:
+        return None
+    delta = clean[i] - clean[i - steps]
+    if delta < -10:
+        return "ENTERING"
+    if delta > 10:
+        return "EXITING"
+    return None
+
+
+def evaluate(args):
+    scores = {"legacy": [0, 0, 0], "streaming": [0, 0, 0]}  # correct, false, missed
+    for seed in range(args.traces):
+        timestamps, clean, observed = make_trace(seed, args.length, args.noise, args.spikes)
+        buf = deque(maxlen=50)
+        estimator = DirectionEstimator(window=WINDOW)
+        for i, (t, d) in enumerate(zip(timestamps, observed)):
+            buf.append((d, t))
+            estimator.add(d, t)
+            if i % args.event_every:
+                continue
+            truth = label(clean, i)
+            for name, guess in (("legacy", legacy_direction(buf, t)),
+                                ("streaming", estimator.estimate(t)[0])):
+                if guess == truth and guess is not None:
+                    scores[name][0] += 1
+                elif guess is not None:
+                    scores[name][1] += 1
+                elif truth is not None:
+                    scores[name][2] += 1
+    return scores
+
+
+def throughput(args):
+    _, _, observed = make_trace(0, 20000, args.noise, args.spikes)
+    timestamps = [i * PERIOD for i in range(len(observed))]
+    results = {}
+
+    buf = deque(maxlen=50)
+    start = time.perf_counter()
+    for t, d in zip(timestamps, observed):
+        buf.append((d, t))
+        legacy_direction(buf, t)
+    results["legacy (per sample)"] = len(observed) / (time.perf_counter() - start)
+
+    estimator = DirectionEstimator(window=WINDOW)
+    start = time.perf_counter()
+    for t, d in zip(timestamps, observed):
+        estimator.add(d, t)
+        estimator.estimate(t)
+    results["streaming (per sample)"] = len(observed) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    estimate_trace(timestamps, observed, window=WINDOW)
+    label_ = "batch replay (NumPy)" if HAS_NUMPY else "batch replay (pure Python)"
+    results[label_] = len(observed) / (time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--traces", type=int, default=200)
+    parser.add_argument("--length", type=int, default=400, help="samples per trace")
+    parser.add_argument("--event-every", type=int, default=4, help="samples between PIR events")
+    parser.add_argument("--noise", type=float, default=4.0, help="sensor noise stdev (cm)")
+    parser.add_argument("--spikes", type=float, default=0.03, help="spurious echo ratio")
+    args = parser.parse_args()
+
+    print(f"{args.traces} traces x {args.length} samples, noise {args.noise} cm, "
+          f"{args.spikes:.0%} spikes\n")
+    print(f"{'classifier':<12}{'correct':>10}{'wrong':>10}{'missed':>10}{'precision':>11}{'recall':>9}")
+    for name, (correct, wrong, missed) in evaluate(args).items():
+        precision = correct / (correct + wrong) if correct + wrong else 0.0
+        recall = correct / (correct + missed) if correct + missed else 0.0
+        print(f"{name:<12}{correct:>10}{wrong:>10}{missed:>10}{precision:>11.3f}{recall:>9.3f}")
+
+    print(f"\n{'throughput':<28}{'samples/s':>12}")
+    for name, rate in throughput(args).items():
+        print(f"{name:<28}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Micro-benchmark for the server MQTT message dispatcher.
+
+Replays a corpus of MQTT messages through server/app.py on_message and through
+the first commit's if-chain on_message (copied verbatim below), and reports
+messages per second for each. InfluxDB and WebSocket output are disabled so
+only decoding and dispatch are timed. The current on_message also does work
+the baseline did not (per-topic metrics, the device registry, WebSocket
+state versions), which this comparison includes.
+
+Usage:
+    python benchmarks/bench_dispatch.py [--corpus recorded.jsonl] [--rounds 20]
+
+A recorded corpus is a JSON-lines file of {"topic": ..., "payload": {...}} objects.
+Without one, a corpus shaped like main.py's publishing pattern is generated.
+"""
+import argparse
+import asyncio  # noqa: F401 (baseline_on_message)
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+import app  # noqa: E402
+
+
+class Message:
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+def _reading(sensor_id, measurement, value, unit):
+    return {"measurement": measurement, "sensor_id": sensor_id, "pi_id": "PI1",
+            "device_name": "DoorController", "value": value, "simulated": True,
+            "unit": unit, "timestamp": time.time()}
+
+
+def generate_corpus(n_batches=500):
+    """Generate batches resembling a 5 second publishing interval of main.py."""
+    rnd = random.Random(42)
+    corpus = []
+    for _ in range(n_batches):
+        batches = {
+            "pi1/sensors/ultrasonic": [_reading(s, "ultrasonic", round(rnd.uniform(2, 400), 2), "cm")
+                                       for s in ("DUS1", "DUS2") for _ in range(10)],
+            "pi1/sensors/pir": [_reading(s, "pir", rnd.randint(0, 1), "motion")
+                                for s in ("DPIR1", "DPIR2", "RPIR1", "RPIR2", "RPIR3")],
+            "pi1/sensors/dht": [_reading(s, "dht", json.dumps({"temperature": 21.5, "humidity": 44.0}), "C/%")
+                                for s in ("DHT1", "DHT2", "DHT3") for _ in range(2)],
+            "pi1/sensors/gyroscope": [_reading("GSG", "gyroscope",
+                                               json.dumps({"x": 0.1, "y": -0.2, "z": 9.8, "significant": False}),
+                                               "m/s2") for _ in range(5)],
+            "pi1/alarm/state": [_reading("ALARM", "alarm", 0, "state")],
+            "pi1/people/count": [_reading("PEOPLE", "people_count", 2, "count")],
+            "pi1/timer/state": [_reading("TIMER", "timer_state",
+                                         json.dumps({"remaining": 30, "display": "00:30",
+                                                     "running": True, "blinking": False}), "state")],
+            "pi1/actuators/rgb_led": [_reading("BRGB", "rgb_led",
+                                               json.dumps({"on": True, "r": 255, "g": 0, "b": 0,
+                                                           "brightness": 80}), "rgb")],
+        }
+        for topic, readings in batches.items():
+            payload = {"pi_id": "PI1", "device_name": "DoorController",
+                       "batch_timestamp": time.time(), "readings": readings}
+            corpus.append(Message(topic, json.dumps(payload).encode("utf-8")))
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                corpus.append(Message(entry["topic"], json.dumps(entry["payload"]).encode("utf-8")))
+    return corpus
+
+
+# The dispatcher as of the first commit (server/app.py on_message, verbatim), with
+# the module globals it reads bound to the current app's state. InfluxDB is
+# off in both: its write_to_influxdb returned at once without write_api.
+sensor_states, alarm_state, people_state = app.sensor_states, app.alarm_state, app.people_state
+timer_state, brgb_state, webcam_frame = app.timer_state, app.brgb_state, app.webcam_frame
+manager, event_loop = app.manager, None
+
+
+def write_to_influxdb(measurement, tags, fields, timestamp=None):
+    return
+
+
+def baseline_on_message(client, userdata, msg):
+    try:
+        payload = json.loads(msg.payload.decode('utf-8'))
+        topic = msg.topic
+        topic_parts = topic.split("/")
+        measurement_type = topic_parts[-1] if len(topic_parts) > 2 else "unknown"
+
+        readings = payload.get("readings", [])
+        pi_id = payload.get("pi_id", "PI1")
+        device_name = payload.get("device_name", "unknown")
+
+        for reading in readings:
+            sensor_id = reading.get("sensor_id", "unknown")
+            value = reading.get("value")
+            simulated = reading.get("simulated", False)
+            unit = reading.get("unit", "")
+            timestamp = reading.get("timestamp")
+
+            # Update in-memory state
+            if sensor_id in sensor_states:
+                sensor_states[sensor_id]["value"] = value
+                sensor_states[sensor_id]["timestamp"] = timestamp
+
+            # Handle alarm state (numeric: 0=disarmed, 1=alarm, 2=armed, 3=arming)
+            if measurement_type == "state" and "alarm" in topic:
+                state_map = {0: "DISARMED", 1: "ALARM", 2: "ARMED", 3: "ARMING"}
+                if isinstance(value, (int, float)):
+                    alarm_state["state"] = state_map.get(int(value), "DISARMED")
+                alarm_state["timestamp"] = timestamp
+
+            # Handle alarm events
+            if measurement_type == "event" and "alarm" in topic:
+                event_val = str(value)
+                if event_val == "armed":
+                    alarm_state["state"] = "ARMED"
+                elif event_val == "arming":
+                    alarm_state["state"] = "ARMING"
+                elif event_val == "alarm_activated":
+                    alarm_state["state"] = "ALARM"
+                elif event_val == "alarm_deactivated":
+                    alarm_state["state"] = "DISARMED"
+                    alarm_state["reason"] = ""
+                alarm_state["timestamp"] = timestamp
+
+            # Handle alarm reason
+            if measurement_type == "reason" and "alarm" in topic:
+                alarm_state["reason"] = str(value)
+                alarm_state["timestamp"] = timestamp
+
+            # Handle people count
+            if measurement_type == "count" and "people" in topic:
+                people_state["count"] = int(value) if isinstance(value, (int, float)) else 0
+                people_state["timestamp"] = timestamp
+
+            if measurement_type == "event" and "people" in topic:
+                people_state["last_direction"] = str(value)
+                people_state["timestamp"] = timestamp
+
+            # Handle gyroscope data (Feature 6)
+            if measurement_type == "gyroscope" and sensor_id == "GSG":
+                try:
+                    gsg_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["GSG"]["value"] = gsg_data
+                    sensor_states["GSG"]["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle DHT data (Feature 7)
+            if measurement_type == "dht" and sensor_id in ["DHT1", "DHT2", "DHT3"]:
+                try:
+                    dht_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states[sensor_id]["value"] = dht_data
+                    sensor_states[sensor_id]["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle LCD data (Feature 7)
+            if measurement_type == "lcd" and sensor_id == "LCD":
+                try:
+                    lcd_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["LCD"]["value"] = lcd_data
+                    sensor_states["LCD"]["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle 4SD display data (Feature 8)
+            if measurement_type == "segment_display" and sensor_id == "4SD":
+                try:
+                    sd_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["4SD"]["value"] = sd_data
+                    sensor_states["4SD"]["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle timer state (Feature 8)
+            if "timer" in topic and measurement_type == "state":
+                try:
+                    ts_data = json.loads(value) if isinstance(value, str) else value
+                    timer_state["remaining"] = ts_data.get("remaining", 0)
+                    timer_state["display"] = ts_data.get("display", "00:00")
+                    timer_state["running"] = ts_data.get("running", False)
+                    timer_state["blinking"] = ts_data.get("blinking", False)
+                    timer_state["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle IR receiver data (Feature 9)
+            if measurement_type == "ir_receiver" and sensor_id == "IR":
+                try:
+                    ir_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["IR"]["value"] = ir_data
+                    sensor_states["IR"]["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle BRGB LED data (Feature 9)
+            if measurement_type == "rgb_led" and sensor_id == "BRGB":
+                try:
+                    rgb_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["BRGB"]["value"] = rgb_data
+                    sensor_states["BRGB"]["timestamp"] = timestamp
+                    brgb_state["on"] = rgb_data.get("on", False)
+                    brgb_state["r"] = rgb_data.get("r", 255)
+                    brgb_state["g"] = rgb_data.get("g", 255)
+                    brgb_state["b"] = rgb_data.get("b", 255)
+                    brgb_state["brightness"] = rgb_data.get("brightness", 100)
+                    brgb_state["timestamp"] = timestamp
+                except:
+                    pass
+
+            # Handle webcam status (Feature 10)
+            if measurement_type == "webcam" and sensor_id == "WEBC":
+                try:
+                    webc_data = json.loads(value) if isinstance(value, str) else value
+                    sensor_states["WEBC"]["value"] = webc_data
+                    sensor_states["WEBC"]["timestamp"] = timestamp
+                    webcam_frame["simulated"] = webc_data.get("simulated", True)
+                except:
+                    pass
+
+            # Write to InfluxDB
+            tags = {
+                "pi_id": pi_id,
+                "device_name": device_name,
+                "sensor_id": sensor_id,
+                "simulated": str(simulated).lower(),
+                "unit": unit,
+            }
+            if isinstance(value, (int, float)):
+                fields = {"value": float(value)}
+            else:
+                fields = {"value_str": str(value), "value": 1.0}
+
+            write_to_influxdb(measurement_type, tags, fields, timestamp)
+
+        # Broadcast to WebSocket clients
+        ws_data = {
+            "type": measurement_type,
+            "topic": topic,
+            "readings": readings,
+            "alarm": alarm_state,
+            "people": people_state,
+            "timer": timer_state,
+            "brgb": brgb_state,
+        }
+        if event_loop:
+            asyncio.run_coroutine_threadsafe(manager.broadcast(ws_data), event_loop)
+
+    except json.JSONDecodeError:
+        pass
+    except Exception as e:
+        print(f"[MQTT] Error: {e}")
+
+
+def decode_only(client, userdata, msg):
+    """Reference: just the payload decode every dispatcher starts with."""
+    json.loads(msg.payload.decode("utf-8"))
+
+
+def bench(handlers, corpus, rounds):
+    """Best round per handler; rounds alternate between handlers so load noise hits all alike."""
+    best = {name: float("inf") for name in handlers}
+    for _ in range(rounds):
+        for name, handler in handlers.items():
+            start = time.perf_counter()
+            for msg in corpus:
+                handler(None, None, msg)
+            best[name] = min(best[name], time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="recorded JSON-lines corpus")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else generate_corpus()
+    readings = sum(len(json.loads(m.payload)["readings"]) for m in corpus)
+    print(f"Corpus: {len(corpus)} messages, {readings} readings")
+
+    best = bench({"baseline": baseline_on_message, "table": app.on_message,
+                  "json only": decode_only}, corpus, args.rounds)
+
+    print(f"{'dispatcher':<12}{'msgs/s':>14}{'readings/s':>14}{'us/msg':>9}")
+    for name, elapsed in best.items():
+        print(f"{name:<12}{len(corpus) / elapsed:>14,.0f}{readings / elapsed:>14,.0f}"
+              f"{elapsed / len(corpus) * 1e6:>9.1f}")
+    print(f"speedup: {best['baseline'] / best['table']:.2f}x; payload decode is "
+          f"{best['json only'] / best['baseline']:.0%} of the baseline's time")
+
+
+if __name__ == "__main__":
+    main()
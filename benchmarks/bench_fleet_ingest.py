@@ -0,0 +1,154 @@
+"""
+Fleet ingest: many controllers publishing to one server at once.
+
+Starts --devices simulated controllers (PI1, PI2, ... each under its own
+pi1/, pi2/, ... topic namespace), each publishing a door controller's batch
+(ultrasonic, PIR, buttons, DHT, gyroscope, people count) every --interval
+seconds from its own thread. A broker queue hands the messages, as MQTT
+payload bytes, to a single thread calling server/app.py's on_message, like
+paho's network thread; InfluxDB points go through the real batch writer
+into a write API that discards them. Reports offered vs ingested rate,
+ingest lag and backlog, and checks that every device ended up with its own
+state (people count, registered sensors) without overwriting the others.
+
+Usage:
+    python benchmarks/bench_fleet_ingest.py [--devices 50] [--seconds 20] [--interval 1]
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+
+with redirect_stdout(io.StringIO()):
+    import app  # noqa: E402
+from influx_writer import InfluxBatchWriter  # noqa: E402
+
+
+class DiscardWriteApi:
+    def write(self, bucket, org, record):
+        pass
+
+
+class Message:
+    __slots__ = ("topic", "payload", "sent")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+        self.sent = time.perf_counter()
+
+
+def device_batches(pi_id, rng, people):
+    """One batch interval of a door controller, as (topic suffix, readings)."""
+    now = time.time()
+
+    def reading(measurement, sensor_id, value, unit):
+        return {"measurement": measurement, "sensor_id": sensor_id, "value": value,
+                "simulated": True, "unit": unit, "timestamp": now}
+
+    return [
+        ("sensors/ultrasonic", [reading("ultrasonic", sid, round(rng.uniform(5, 200), 1), "cm")
+                                for sid in ("DUS1", "DUS2") for _ in range(5)]),
+        ("sensors/pir", [reading("pir", sid, rng.randint(0, 1), "motion")
+                         for sid in ("DPIR1", "RPIR1", "RPIR2")]),
+        ("sensors/button", [reading("button", "DS1", rng.randint(0, 1), "state")]),
+        ("sensors/dht", [reading("dht", sid, json.dumps({"temperature": round(rng.uniform(19, 25), 1),
+                                                         "humidity": round(rng.uniform(35, 60), 1)}), "C/%")
+                         for sid in ("DHT1", "DHT2", "DHT3")]),
+        ("sensors/gyroscope", [reading("gyroscope", "GSG", json.dumps({"x": 0.1, "y": -0.2, "z": 9.8,
+                                                                       "significant": False}), "m/s2")
+                               for _ in range(5)]),
+        ("people/count", [reading("people_count", "PEOPLE", people, "count")]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between a device's batches (5 on real devices)")
+    args = parser.parse_args()
+
+    app.influx_writer = InfluxBatchWriter(DiscardWriteApi(), "bench", "bench")
+    broker = queue.Queue()
+    stop = threading.Event()
+    sent = {"messages": 0, "readings": 0}
+    sent_lock = threading.Lock()
+    expected_people = {}
+
+    def device(index):
+        pi_id = f"PI{index + 1}"
+        rng = random.Random(index)
+        stop.wait(rng.uniform(0, args.interval))  # devices are not in lockstep
+        people = 0
+        while not stop.is_set():
+            people = max(0, people + rng.choice((-1, 0, 1)))
+            expected_people[pi_id] = people
+            for suffix, readings in device_batches(pi_id, rng, people):
+                payload = json.dumps({"pi_id": pi_id, "device_name": "DoorController",
+                                      "batch_timestamp": time.time(), "readings": readings})
+                broker.put(Message(f"{pi_id.lower()}/{suffix}", payload.encode()))
+                with sent_lock:
+                    sent["messages"] += 1
+                    sent["readings"] += len(readings)
+            stop.wait(args.interval)
+
+    lags = []
+    backlog = [0]
+
+    def network_thread():
+        while True:
+            msg = broker.get()
+            if msg is None:
+                return
+            backlog[0] = max(backlog[0], broker.qsize())
+            app.on_message(None, None, msg)
+            lags.append(time.perf_counter() - msg.sent)
+
+    consumer = threading.Thread(target=network_thread)
+    consumer.start()
+    devices = [threading.Thread(target=device, args=(i,), daemon=True) for i in range(args.devices)]
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        app.influx_writer.start()
+        for t in devices:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in devices:
+            t.join()
+        sent_elapsed = time.perf_counter() - start
+        broker.put(None)
+        consumer.join()
+        drained_elapsed = time.perf_counter() - start
+        app.influx_writer.stop()
+
+    lags.sort()
+    print(f"{args.devices} devices, a batch every {args.interval:g}s each, {args.seconds:.0f}s\n")
+    print(f"offered:  {sent['messages'] / sent_elapsed:8.0f} msg/s {sent['readings'] / sent_elapsed:9.0f} readings/s")
+    print(f"ingested: {len(lags) / drained_elapsed:8.0f} msg/s {sent['readings'] / drained_elapsed:9.0f} readings/s "
+          f"(all {len(lags)} messages, drained {drained_elapsed - sent_elapsed:.2f}s after the last send)")
+    print(f"ingest lag: p50 {lags[len(lags) // 2] * 1000:.2f} ms, p99 {lags[int(len(lags) * 0.99)] * 1000:.2f} ms, "
+          f"max {lags[-1] * 1000:.1f} ms; max backlog {backlog[0]} messages")
+    stats = app.influx_writer.get_stats()
+    print(f"influx points: {stats['points_queued']} queued, {stats['points_dropped']} dropped")
+
+    wrong = [pi_id for pi_id, people in expected_people.items()
+             if app.registry.get(pi_id) is None or app.registry.get(pi_id).people["count"] != people]
+    sensors = {len(app.registry.get(pi_id).sensors) for pi_id in expected_people if pi_id != app.DEFAULT_PI_ID}
+    print(f"devices registered: {len(app.registry)}; people count wrong on {len(wrong)}; "
+          f"sensors per non-default device: {sorted(sensors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Edge-detection vs polling for buttons and PIR sensors, on the fake GPIO backend.
+
+Creates the PI1 door/room inputs (DS1, DS2, BTN buttons; DPIR1, DPIR2, RPIR1-3
+PIRs) on FakeGPIO and drives random level changes into them. Each mode is run
+once: polling on the Scheduler (buttons every 50 ms, PIRs every 0.5 s, as in
+main.py) and edge events through GPIOEventQueue. Reports detection latency
+(pin change to callback) and process CPU time, including an idle phase where
+no inputs change.
+
+Usage:
+    python benchmarks/bench_gpio_events.py [--seconds 10] [--idle 5]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ["GPIO_BACKEND"] = "fake"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import sensors.pir  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from sensors.button import Button, make_button_step, watch_button  # noqa: E402
+from sensors.gpio_backend import GPIO  # noqa: E402
+from sensors.gpio_events import GPIOEventQueue  # noqa: E402
+from sensors.pir import PIRSensor, make_pir_step, watch_pir  # noqa: E402
+
+BUTTON_PINS = [17, 18, 5]
+PIR_PINS = [22, 25, 12, 16, 20]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(mode, seconds, idle):
+    GPIO.cleanup()
+    # PIRSensor waits 2 s for the sensor to settle; not needed on fake pins
+    sleep, sensors.pir.time.sleep = sensors.pir.time.sleep, lambda s: None
+    buttons = [Button(pin) for pin in BUTTON_PINS]
+    pirs = [PIRSensor(pin) for pin in PIR_PINS]
+    sensors.pir.time.sleep = sleep
+
+    changed_at = {}
+    latencies = {"button": [], "pir": []}
+    lock = threading.Lock()
+
+    def make_callback(kind, pin):
+        def callback(state):
+            with lock:
+                t = changed_at.pop(pin, None)
+                if t is not None:
+                    latencies[kind].append(time.perf_counter() - t)
+        return callback
+
+    stop_event = threading.Event()
+    if mode == "poll":
+        scheduler = Scheduler()
+        for b in buttons:
+            scheduler.every(0.05, make_button_step(b, make_callback("button", b.pin)))
+        for p in pirs:
+            scheduler.every(0.5, make_pir_step(p, make_callback("pir", p.pin)))
+        scheduler.start(stop_event)
+    else:
+        events = GPIOEventQueue()
+        for b in buttons:
+            watch_button(b, make_callback("button", b.pin), events, bouncetime=0)
+        for p in pirs:
+            watch_pir(p, make_callback("pir", p.pin), events, bouncetime=0)
+        events.start(stop_event)
+
+    # Idle phase: nothing changes, measure the cost of waiting
+    cpu = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu
+
+    rnd = random.Random(7)
+    cpu = time.process_time()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pin = rnd.choice(BUTTON_PINS + PIR_PINS)
+        with lock:
+            changed_at[pin] = time.perf_counter()
+        GPIO.set_input(pin, GPIO.LOW if GPIO.input(pin) else GPIO.HIGH)
+        # Leave the level long enough for the slowest poller to see it
+        time.sleep(rnd.uniform(0.6, 1.0))
+    active_cpu = time.process_time() - cpu
+    stop_event.set()
+    time.sleep(0.6)
+    return latencies, idle_cpu, active_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--idle", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{len(BUTTON_PINS)} buttons, {len(PIR_PINS)} PIRs; idle {args.idle:.0f}s, "
+          f"active {args.seconds:.0f}s\n")
+    print(f"{'mode':<8}{'button p50/p99 ms':>20}{'PIR p50/p99 ms':>20}"
+          f"{'idle CPU ms':>14}{'active CPU ms':>15}")
+    for mode in ("poll", "edge"):
+        latencies, idle_cpu, active_cpu = run(mode, args.seconds, args.idle)
+        b, p = latencies["button"], latencies["pir"]
+        print(f"{mode:<8}"
+              f"{percentile(b, 0.5) * 1000:>10.1f}/{percentile(b, 0.99) * 1000:<9.1f}"
+              f"{percentile(p, 0.5) * 1000:>10.1f}/{percentile(p, 0.99) * 1000:<9.1f}"
+              f"{idle_cpu * 1000:>14.1f}{active_cpu * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
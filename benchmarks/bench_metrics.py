@@ -0,0 +1,121 @@
+"""
+Metrics registry: cost per observation and /metrics render time.
+
+Times each server/metrics.py operation used on the hot paths (counter
+increment, labelled child lookup, histogram observe, gauge set, and the
+per-message topic_metrics() lookup in server/app.py's on_message) over
+--ops calls, minus the cost of an empty loop. Then --threads threads
+increment one counter and observe one histogram concurrently to check no
+update is lost without a lock, and the full registry is rendered.
+
+Usage:
+    python benchmarks/bench_metrics.py [--ops 1000000] [--threads 4]
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+
+with redirect_stdout(io.StringIO()):
+    import app  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+
+
+def per_op(fn, ops):
+    start = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - start) / ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--ops", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench")
+    family = registry.counter("bench_labelled_total", "bench", ("topic",))
+    histogram = registry.histogram("bench_seconds", "bench")
+    gauge = registry.gauge("bench_gauge", "bench")
+    value = 0.0042
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    def counter_inc(n):
+        inc = counter.inc
+        for _ in range(n):
+            inc()
+
+    def labelled_inc(n):
+        labels = family.labels
+        for _ in range(n):
+            labels("sensors/dht").inc()
+
+    def histogram_observe(n):
+        observe = histogram.observe
+        for _ in range(n):
+            observe(value)
+
+    def gauge_set(n):
+        set_ = gauge.set
+        for _ in range(n):
+            set_(value)
+
+    def topic_lookup(n):
+        topic_metrics = app.topic_metrics
+        for _ in range(n):
+            messages, decode, total = topic_metrics("pi1/sensors/dht")
+            messages.inc()
+
+    baseline = per_op(empty, args.ops)
+    print(f"{args.ops} operations each (empty loop {baseline * 1e9:.0f} ns subtracted)\n")
+    print(f"{'operation':<34}{'ns/op':>8}")
+    for name, fn in (("Counter.inc()", counter_inc),
+                     ("Counter.labels(topic).inc()", labelled_inc),
+                     ("Histogram.observe()", histogram_observe),
+                     ("Gauge.set()", gauge_set),
+                     ("on_message topic_metrics() + inc", topic_lookup)):
+        cost = per_op(fn, args.ops) - baseline
+        print(f"{name:<34}{cost * 1e9:>8.0f}{'' if cost < 1e-6 else '  OVER 1 us'}")
+
+    shared_counter = registry.counter("bench_threads_total", "bench")
+    shared_histogram = registry.histogram("bench_threads_seconds", "bench")
+    per_thread = args.ops // args.threads
+
+    def worker():
+        inc, observe = shared_counter.inc, shared_histogram.observe
+        for i in range(per_thread):
+            inc()
+            observe(i * 1e-7)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    expected = per_thread * args.threads
+    print(f"\n{args.threads} threads x {per_thread}: counter {shared_counter.value}/{expected}, "
+          f"histogram count {shared_histogram.count}/{expected} "
+          f"({elapsed / expected * 1e9:.0f} ns per inc+observe)")
+
+    for i in range(50):
+        app.topic_metrics(f"pi1/sensors/bench{i}")[2].observe(i * 1e-4)
+    start = time.perf_counter()
+    text = app.REGISTRY.render()
+    print(f"server /metrics: {len(text.splitlines())} lines rendered in "
+          f"{(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+MJPEG fan-out: per-client stream loops vs the single-producer broadcaster.
+
+A fake device replaces the server's webcam frame with a new JPEG-sized buffer
+at 10 fps. N viewers consume /api/webcam/stream in-process; half of them
+optionally read slowly. Reports delivered frames per viewer, multipart
+chunks built per second (the per-frame work that should stay flat as viewers
+grow) and process CPU.
+
+Usage:
+    python benchmarks/bench_mjpeg_broadcast.py [--clients 1 10 50 200] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+import app  # noqa: E402
+from mjpeg_broadcaster import MJPEGBroadcaster  # noqa: E402
+
+FRAME_SIZE = 60_000
+builds = [0]
+
+
+def counting_source():
+    builds[0] += 1
+    return app.current_webcam_frame()
+
+
+async def legacy_stream():
+    """Each viewer polls the frame and builds its own chunk every 0.1 s."""
+    while True:
+        frame, content_type = counting_source()
+        yield (b'--frame\r\nContent-Type: ' + content_type.encode() + b'\r\n\r\n'
+               + frame + b'\r\n')
+        await asyncio.sleep(0.1)
+
+
+async def camera(stop):
+    n = 0
+    while not stop.is_set():
+        n += 1
+        app.webcam_frame["data"] = n.to_bytes(4, "big") * (FRAME_SIZE // 4)
+        await asyncio.sleep(0.1)
+
+
+async def viewer(stream, counts, index, deadline, delay):
+    iterator = stream()
+    seen = set()
+    try:
+        async for chunk in iterator:
+            counts[index] += 1
+            seen.add(chunk[40:44])
+            if time.monotonic() >= deadline:
+                break
+            if delay:
+                await asyncio.sleep(delay)
+    finally:
+        await iterator.aclose()
+    return len(seen)
+
+
+async def run(mode, clients, seconds, slow_delay):
+    builds[0] = 0
+    stop = asyncio.Event()
+    cam = asyncio.create_task(camera(stop))
+    await asyncio.sleep(0.15)
+    if mode == "legacy":
+        stream = legacy_stream
+    else:
+        broadcaster = MJPEGBroadcaster(counting_source, fps=10)
+        stream = broadcaster.subscribe
+
+    counts = [0] * clients
+    deadline = time.monotonic() + seconds
+    cpu = time.process_time()
+    start = time.monotonic()
+    await asyncio.gather(*(viewer(stream, counts, i, deadline,
+                                  slow_delay if i % 2 else 0) for i in range(clients)))
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - cpu
+    stop.set()
+    await cam
+
+    fast = [c for i, c in enumerate(counts) if i % 2 == 0]
+    return {
+        "fps": sum(fast) / len(fast) / elapsed,
+        "chunks_per_s": (builds[0] if mode == "legacy" else broadcaster.frames_produced) / elapsed,
+        "cpu": cpu / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--slow", type=float, default=0.3,
+                        help="extra delay per frame for every other viewer (0 disables)")
+    args = parser.parse_args()
+
+    print(f"{FRAME_SIZE // 1000} kB frames at 10 fps, every other viewer sleeps "
+          f"{args.slow}s per frame, {args.seconds:.0f}s per run\n")
+    print(f"{'mode':<13}{'clients':>8}{'fast fps':>10}{'chunks/s':>10}{'CPU %':>8}")
+    for mode in ("legacy", "broadcaster"):
+        for clients in args.clients:
+            r = asyncio.run(run(mode, clients, args.seconds, args.slow))
+            print(f"{mode:<13}{clients:>8}{r['fps']:>10.1f}{r['chunks_per_s']:>10.1f}"
+                  f"{r['cpu'] * 100:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+MQTT publisher: queue-to-publish latency per priority class.
+
+Feeds MQTTPublisher a mix like the door controller's (ultrasonic and DHT
+telemetry every few hundred ms, buttons now and then, rare alarm and people
+events) through an in-process client that records when each reading was
+handed to the network. The legacy run classifies everything as "normal", so
+alarms wait for the batch interval like before; the priority run uses the
+default classes, where "high" readings wake the daemon and go out at once.
+Prints p50/p99 latency per class and a histogram of high-priority latency.
+
+Usage:
+    python benchmarks/bench_publisher_latency.py [--seconds 20] [--interval 5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import paho.mqtt.client as mqtt  # noqa: E402
+
+from mqtt_publisher import DEFAULT_PRIORITIES, MQTTPublisher  # noqa: E402
+
+DEVICE = {"pi_id": "PI1", "device_name": "DoorController"}
+# (sensor id, sensor type, mean seconds between readings)
+SOURCES = (
+    ("DUS1", "ultrasonic", 0.2),
+    ("DHT1", "dht", 1.0),
+    ("DS1", "button", 3.0),
+    ("ALARM", "alarm_event", 4.0),
+    ("PEOPLE", "people_event", 6.0),
+)
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+# Everything batched, as before priority classes
+LEGACY = {"normal": [sensor_type for _, sensor_type, _ in SOURCES]}
+CLASS_OF = {t: cls for cls, types in DEFAULT_PRIORITIES.items() for t in types}
+
+
+class RecordingClient:
+    """Stands in for paho's client; notes when each reading is published, by default class."""
+
+    class Info:
+        rc = mqtt.MQTT_ERR_SUCCESS
+
+        def wait_for_publish(self, timeout=None):
+            return True
+
+    def __init__(self):
+        self.latencies = {}
+
+    def publish(self, topic, payload, qos=0):
+        now = time.time()
+        for reading in json.loads(payload)["readings"]:
+            cls = CLASS_OF.get(reading["measurement"], "normal")
+            self.latencies.setdefault(cls, []).append(now - reading["timestamp"])
+        return self.Info()
+
+
+def run(priorities, seconds, interval, seed=1):
+    publisher = MQTTPublisher("localhost", 1883, DEVICE, {}, batch_interval=interval,
+                              priorities=priorities)
+    client = RecordingClient()
+    publisher.client = client
+    publisher._connected = True
+
+    def source(sensor_id, sensor_type, period, rng, stop):
+        while not stop.wait(rng.expovariate(1.0 / period)):
+            publisher.queue_data(sensor_id, sensor_type, round(rng.uniform(0, 100), 1), True)
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=source, args=(*s, random.Random(seed + i), stop), daemon=True)
+               for i, s in enumerate(SOURCES)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        publisher.start_batch_daemon()
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        publisher.stop_batch_daemon()
+    return client.latencies
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=5, help="batch interval in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:.0f}s of mixed readings, batch interval {args.interval:.0f}s\n")
+    print(f"{'mode':<10}{'class':<8}{'readings':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    results = {}
+    for name, priorities in (("legacy", LEGACY), ("priority", None)):
+        latencies = run(priorities, args.seconds, args.interval)
+        results[name] = latencies
+        for cls in ("high", "normal", "low"):
+            values = latencies.get(cls)
+            if values:
+                print(f"{name:<10}{cls:<8}{len(values):>9}{percentile(values, 0.5) * 1000:>10.1f}"
+                      f"{percentile(values, 0.99) * 1000:>10.1f}")
+
+    print("\nhigh-priority latency histogram (readings per bucket):")
+    print(f"{'< ms':>8}" + "".join(f"{name:>10}" for name in results))
+    for i, limit in enumerate(BUCKETS_MS + (None,)):
+        low = BUCKETS_MS[i - 1] if i else 0
+        label = f"{limit}" if limit else f">{low}"
+        counts = []
+        for latencies in results.values():
+            values = latencies.get("high", [])
+            counts.append(sum(1 for v in values if low <= v * 1000 < (limit or float("inf"))))
+        print(f"{label:>8}" + "".join(f"{c:>10}" for c in counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Reporting policies: published readings and bytes on a quiet home.
+
+Generates a --hours long trace at the device's real rates (DUS1/DUS2 every
+0.5 s, gyroscope every 1 s, three DHTs every 2 s) for a quiet home: the
+door ultrasonics see the hallway wall with +-1 cm of noise and someone
+walking through every --walk-every minutes, the icon stays still apart from
+sensor noise, and temperature/humidity drift slowly. Every reading goes
+through the "report" policies of settings.json the way MQTTPublisher
+applies them and the published count and JSON size are compared with
+publishing everything. Also checks that every walk-by still shows up in the
+published ultrasonic stream.
+
+Usage:
+    python benchmarks/bench_reporting.py [--hours 24] [--walk-every 20] [--settings settings.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from reporting import ReportingFilter  # noqa: E402
+from settings import load_settings  # noqa: E402
+
+WALL_CM = 180.0
+
+
+def trace(hours, walk_every, seed=1):
+    """Yield (time, sensor id, value) in time order."""
+    rng = random.Random(seed)
+    dht = {sid: [rng.uniform(20, 24), rng.uniform(40, 55)] for sid in ("DHT1", "DHT2", "DHT3")}
+    walks = [i * walk_every * 60 + rng.uniform(0, 60) for i in range(int(hours * 60 / walk_every))]
+    for step in range(int(hours * 3600 * 2)):
+        t = step * 0.5
+        for sid, offset in (("DUS1", 0.0), ("DUS2", 0.4)):
+            distance = WALL_CM + rng.gauss(0, 0.5)
+            for start in walks:
+                if start + offset <= t < start + offset + 1.5:
+                    distance = 40 + rng.uniform(0, 20)
+            yield t, sid, round(distance, 2)
+        if step % 2 == 0:
+            x, y, z = (rng.uniform(-0.3, 0.3) for _ in range(3))
+            yield t, "GSG", json.dumps({"x": round(x, 2), "y": round(y, 2), "z": round(9.81 + z, 2),
+                                        "significant": False})
+        if step % 4 == 0:
+            for sid, state in dht.items():
+                # Day/night cycle plus the sensor's 0.1 resolution jitter
+                state[0] += 0.5 * math.sin(2 * math.pi * t / 86400) / 1800 + rng.uniform(-0.05, 0.05)
+                state[1] += rng.uniform(-0.1, 0.1)
+                yield t, sid, json.dumps({"temperature": round(state[0], 1),
+                                          "humidity": round(state[1], 1)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--walk-every", type=float, default=20, help="minutes between walk-bys")
+    parser.add_argument("--settings", default=os.path.join(ROOT, "settings.json"))
+    args = parser.parse_args()
+
+    reporting = ReportingFilter.from_settings(load_settings(args.settings))
+    totals = {}
+    walk_times = []
+    for t, sensor_id, value in trace(args.hours, args.walk_every):
+        size = len(json.dumps({"sensor_id": sensor_id, "value": value, "timestamp": t}))
+        entry = totals.setdefault(sensor_id, [0, 0, 0, 0])
+        entry[0] += 1
+        entry[1] += size
+        if reporting.allow(sensor_id, value, t):
+            entry[2] += 1
+            entry[3] += size
+            if sensor_id == "DUS1" and value < 100:
+                walk_times.append(t)
+
+    print(f"{args.hours:.0f}h quiet home, walk-by every {args.walk_every:.0f} min\n")
+    print(f"{'sensor':<8}{'readings':>10}{'published':>11}{'kB before':>11}{'kB after':>10}{'cut':>7}")
+    total = [0, 0, 0, 0]
+    for sensor_id, (n, size, sent, sent_size) in totals.items():
+        print(f"{sensor_id:<8}{n:>10}{sent:>11}{size / 1024:>11.0f}{sent_size / 1024:>10.0f}"
+              f"{n / max(sent, 1):>6.0f}x")
+        total = [a + b for a, b in zip(total, (n, size, sent, sent_size))]
+    n, size, sent, sent_size = total
+    print(f"{'total':<8}{n:>10}{sent:>11}{size / 1024:>11.0f}{sent_size / 1024:>10.0f}"
+          f"{n / max(sent, 1):>6.0f}x")
+    walks_seen = len({int(t // (args.walk_every * 60)) for t in walk_times})
+    print(f"\nwalk-bys visible in published DUS1 readings: {walks_seen} of "
+          f"{int(args.hours * 60 / args.walk_every)}")
+    print(f"suppressed counter: {reporting.get_stats()['suppressed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Thread and memory footprint of sensor polling: thread-per-sensor vs Scheduler.
+
+Starts the same set of simulated sensors (the PI1 sensor mix from settings.json)
+once with the old run_* loops, one thread each, and once on the shared
+Scheduler, then reports live threads, RSS growth and callbacks delivered.
+Each mode runs in a fresh subprocess so RSS numbers do not mix.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--seconds 10] [--copies 1]
+
+--copies multiplies the sensor set, to see how each approach scales.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from scheduler import Scheduler, process_stats  # noqa: E402
+from simulators.button import make_button_simulator_step, run_button_simulator  # noqa: E402
+from simulators.dht import make_dht_simulator_step, run_dht_simulator  # noqa: E402
+from simulators.gyroscope import gyroscope_simulator_step, run_gyroscope_simulator  # noqa: E402
+from simulators.membrane_switch import (membrane_switch_simulator_step,  # noqa: E402
+                                        run_membrane_switch_simulator)
+from simulators.pir import pir_simulator_step, run_pir_simulator  # noqa: E402
+from simulators.ultrasonic import make_ultrasonic_simulator_step, run_ultrasonic_simulator  # noqa: E402
+
+# (sensor, period) as started by main.py
+SENSORS = [
+    ("DUS", 0.5), ("DUS", 0.5),
+    ("PIR", 2), ("PIR", 2), ("PIR", 2), ("PIR", 2), ("PIR", 2),
+    ("BTN", None), ("BTN", None), ("BTN", None),
+    ("DMS", None),
+    ("GSG", 1),
+    ("DHT", 2), ("DHT", 2), ("DHT", 2),
+]
+
+
+def run_threads(copies, callback, stop_event):
+    threads = []
+    for _ in range(copies):
+        for kind, period in SENSORS:
+            if kind == "DUS":
+                target, args = run_ultrasonic_simulator, (period, callback, stop_event)
+            elif kind == "PIR":
+                target, args = run_pir_simulator, (period, callback, stop_event)
+            elif kind == "BTN":
+                target, args = run_button_simulator, (callback, stop_event)
+            elif kind == "DMS":
+                target, args = run_membrane_switch_simulator, (callback, stop_event)
+            elif kind == "GSG":
+                target, args = run_gyroscope_simulator, (period, callback, stop_event)
+            else:
+                target, args = run_dht_simulator, (period, callback, stop_event)
+            t = threading.Thread(target=target, args=args, daemon=True)
+            t.start()
+            threads.append(t)
+    return threads
+
+
+def run_scheduler(copies, callback, stop_event):
+    scheduler = Scheduler()
+    for _ in range(copies):
+        for kind, period in SENSORS:
+            if kind == "DUS":
+                scheduler.every(period, make_ultrasonic_simulator_step(callback))
+            elif kind == "PIR":
+                scheduler.every(period, lambda: pir_simulator_step(callback))
+            elif kind == "BTN":
+                scheduler.every(random.uniform(5, 15), make_button_simulator_step(callback))
+            elif kind == "DMS":
+                scheduler.every(random.uniform(3, 10), lambda: membrane_switch_simulator_step(callback))
+            elif kind == "GSG":
+                scheduler.every(period, lambda: gyroscope_simulator_step(callback))
+            else:
+                scheduler.every(period, make_dht_simulator_step(callback))
+    scheduler.start(stop_event)
+    return scheduler
+
+
+def measure(mode, seconds, copies):
+    """Run one mode in this process and return its stats."""
+    before = process_stats()
+    calls = [0]
+    lock = threading.Lock()
+
+    def callback(*args):
+        with lock:
+            calls[0] += 1
+
+    stop_event = threading.Event()
+    if mode == "threads":
+        run_threads(copies, callback, stop_event)
+    else:
+        run_scheduler(copies, callback, stop_event)
+    time.sleep(seconds)
+    after = process_stats()
+    stop_event.set()
+
+    rss = None
+    if before["rss_kb"] is not None and after["rss_kb"] is not None:
+        rss = after["rss_kb"] - before["rss_kb"]
+    return {"mode": mode, "sensors": len(SENSORS) * copies,
+            "threads": after["threads"], "rss_growth_kb": rss, "callbacks": calls[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--copies", type=int, default=1)
+    parser.add_argument("--mode", choices=["threads", "scheduler"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.seconds, args.copies)))
+        return
+
+    print(f"{len(SENSORS) * args.copies} simulated sensors, {args.seconds:.0f}s per mode\n")
+    print(f"{'mode':<12}{'threads':>10}{'RSS growth (kB)':>18}{'callbacks':>12}")
+    for mode in ("threads", "scheduler"):
+        out = subprocess.run([sys.executable, __file__, "--mode", mode,
+                              "--seconds", str(args.seconds), "--copies", str(args.copies)],
+                             capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        rss = "n/a" if r["rss_growth_kb"] is None else r["rss_growth_kb"]
+        print(f"{mode:<12}{r['threads']:>10}{rss:>18}{r['callbacks']:>12}")
+
+
+if __name__ == "__main__":
+    main()
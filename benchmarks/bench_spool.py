@@ -0,0 +1,119 @@
+"""
+Store-and-forward spool: sustained spooling and draining throughput.
+
+Spools JSON readings shaped like MQTTPublisher's (80% ultrasonic noise in the
+low lane, the rest split between normal and high) into a DiskSpool, then
+drains them back in order with read/commit the way the publisher does after
+reconnecting. SD cards are slow to fsync; --fsync-ms adds that latency to
+every fsync so batched fsync can be compared with fsync per record on any
+disk (use --dir to run on a real card instead).
+
+Also fills a small spool past its cap to show which lanes get evicted.
+
+Usage:
+    python benchmarks/bench_spool.py [--records 50000] [--fsync-ms 15] [--dir /mnt/sd]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from spool import DiskSpool  # noqa: E402
+
+LANES = (("low", "ultrasonic", 0.8), ("normal", "button", 0.15), ("high", "alarm_event", 0.05))
+
+
+def make_readings(n, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        r = rng.random()
+        for lane, sensor_type, share in LANES:
+            if r < share:
+                break
+            r -= share
+        reading = {"measurement": sensor_type, "sensor_id": "DUS1", "pi_id": "PI1",
+                   "device_name": "DoorController", "value": round(rng.uniform(5, 200), 1),
+                   "simulated": True, "unit": "cm", "timestamp": 1.7e9 + i * 0.1}
+        out.append((lane, json.dumps(reading, separators=(",", ":")).encode()))
+    return out
+
+
+def slow_fsync(delay):
+    real = os.fsync
+
+    def fsync(fd):
+        real(fd)
+        time.sleep(delay)
+    return fsync
+
+
+def spool_and_drain(directory, items, fsync_interval, batch):
+    sp = DiskSpool(directory, fsync_interval=fsync_interval, max_bytes=1 << 40)
+    start = time.perf_counter()
+    for i in range(0, len(items), batch):
+        sp.append_many(items[i:i + batch])
+    sp.sync()
+    spool_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    drained = 0
+    for lane in sp.lanes:
+        while True:
+            payloads, position = sp.read(lane, 500)
+            if position is None:
+                break
+            drained += len([json.loads(p) for p in payloads])
+            sp.commit(lane, position)
+    drain_s = time.perf_counter() - start
+    sp.close()
+    return spool_s, drain_s, drained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--fsync-ms", type=float, default=15.0)
+    parser.add_argument("--dir", default=None, help="directory on the target disk")
+    args = parser.parse_args()
+
+    items = make_readings(args.records)
+    os.fsync = slow_fsync(args.fsync_ms / 1000)
+    size_mb = sum(len(p) for _, p in items) / 1e6
+    print(f"{args.records} readings ({size_mb:.1f} MB), +{args.fsync_ms:.0f} ms per fsync\n")
+    print(f"{'mode':<28}{'spool rec/s':>13}{'drain rec/s':>13}")
+    modes = (
+        ("fsync every record", 0.0, 1, min(args.records, 2000)),
+        ("fsync every 1s, 5s batches", 1.0, 50, args.records),
+        ("fsync every 1s, per record", 1.0, 1, args.records),
+    )
+    for name, interval, batch, n in modes:
+        directory = tempfile.mkdtemp(prefix="spool-", dir=args.dir)
+        spool_s, drain_s, drained = spool_and_drain(directory, items[:n], interval, batch)
+        assert drained == n
+        print(f"{name:<28}{n / spool_s:>13,.0f}{n / drain_s:>13,.0f}")
+        shutil.rmtree(directory)
+
+    # Eviction: 4x more data than the cap
+    directory = tempfile.mkdtemp(prefix="spool-", dir=args.dir)
+    cap = size_mb * 1e6 / 4
+    sp = DiskSpool(directory, max_bytes=int(cap), segment_bytes=64 * 1024, fsync_interval=1.0)
+    for i in range(0, len(items), 50):
+        sp.append_many(items[i:i + 50])
+    written = {lane: sum(1 for l, _ in items if l == lane) for lane, _, _ in LANES}
+    print(f"\nspool capped at {cap / 1e6:.1f} MB:")
+    for lane, stats in sp.get_stats().items():
+        print(f"  {lane:<7} kept {stats['records']:>6} of {written[lane]:>6}, "
+              f"evicted {stats['evicted']}")
+    sp.close()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
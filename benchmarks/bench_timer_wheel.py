@@ -0,0 +1,112 @@
+"""
+Stress test for the timer wheel under door-bounce style churn.
+
+Drives a target rate of schedule/cancel operations (a 5 s door-open timeout
+that is usually cancelled before it fires, as with a bouncing door contact)
+against TimerWheel and against threading.Timer, and reports the achieved
+operation rate, peak thread count and how late the surviving timeouts fired.
+
+Usage:
+    python benchmarks/bench_timer_wheel.py [--rate 10000] [--seconds 5] [--cancel 0.9]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from timer_wheel import TimerWheel  # noqa: E402
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def stress(schedule, rate, seconds, cancel_ratio, delay):
+    """Schedule `rate` timeouts per second, cancelling cancel_ratio of them."""
+    rnd = random.Random(1)
+    lateness = []
+    lock = threading.Lock()
+    peak_threads = threading.active_count()
+    ops = 0
+    expected = 0
+
+    def fired(due):
+        late = time.monotonic() - due
+        with lock:
+            lateness.append(late)
+
+    start = time.monotonic()
+    batch = max(1, rate // 100)
+    while time.monotonic() - start < seconds:
+        for _ in range(batch):
+            due = time.monotonic() + delay
+            handle = schedule(delay, fired, due)
+            ops += 1
+            if rnd.random() < cancel_ratio:
+                handle.cancel()
+                ops += 1
+            else:
+                expected += 1
+        peak_threads = max(peak_threads, threading.active_count())
+        # Pace to the target rate
+        ahead = ops / 2 / rate - (time.monotonic() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+    elapsed = time.monotonic() - start
+
+    # Let the survivors fire
+    time.sleep(delay + 0.5)
+    return {
+        "ops_per_sec": ops / elapsed,
+        "peak_threads": peak_threads,
+        "fired": len(lateness),
+        "expected": expected,
+        "late_p50_ms": percentile(lateness, 0.5) * 1000,
+        "late_p99_ms": percentile(lateness, 0.99) * 1000,
+    }
+
+
+def thread_timer(delay, fn, *args):
+    timer = threading.Timer(delay, fn, args=args)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rate", type=int, default=10000, help="schedules per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--cancel", type=float, default=0.9, help="fraction cancelled")
+    parser.add_argument("--delay", type=float, default=5.0)
+    parser.add_argument("--skip-threading", action="store_true",
+                        help="only run the timer wheel")
+    args = parser.parse_args()
+
+    wheel = TimerWheel()
+    wheel.start()
+    results = [("TimerWheel", stress(wheel.schedule, args.rate, args.seconds,
+                                     args.cancel, args.delay))]
+    wheel.stop()
+    if not args.skip_threading:
+        results.append(("threading.Timer", stress(thread_timer, args.rate, args.seconds,
+                                                  args.cancel, args.delay)))
+
+    print(f"target {args.rate} schedules/s, {args.cancel:.0%} cancelled, "
+          f"{args.delay}s timeouts, {args.seconds:.0f}s\n")
+    print(f"{'':<18}{'ops/s':>10}{'peak threads':>14}{'fired':>14}"
+          f"{'late p50 ms':>13}{'late p99 ms':>13}")
+    for name, r in results:
+        print(f"{name:<18}{r['ops_per_sec']:>10.0f}{r['peak_threads']:>14}"
+              f"{r['fired']:>7}/{r['expected']:<6}{r['late_p50_ms']:>13.1f}{r['late_p99_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
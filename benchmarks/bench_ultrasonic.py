@@ -0,0 +1,99 @@
+"""
+Ultrasonic read cost and stability: busy-wait polling vs edge capture,
+single ping vs median-of-N, on the fake GPIO backend.
+
+A fake HC-SR04 answers each trigger on its own thread: the echo pin goes
+high shortly after the trigger and stays high for the round-trip time of a
+fixed target distance. OS sleep jitter adds timing noise, and a fraction of
+pings return a spurious echo (multipath / the other sensor's ping).
+In poll mode the spinning reader also competes with the fake sensor for the
+GIL, which inflates its readings; on a Pi the cost shows up as a busy core.
+
+Usage:
+    python benchmarks/bench_ultrasonic.py [--readings 100] [--distance 120] [--spurious 0.05]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+os.environ["GPIO_BACKEND"] = "fake"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensors.gpio_backend import GPIO  # noqa: E402
+from sensors.ultrasonic import UltrasonicSensor, ultrasonic_group_step  # noqa: E402
+
+TRIG, ECHO = 23, 24
+
+
+class FakeHCSR04:
+    def __init__(self, distance, spurious, seed=3):
+        self.distance = distance
+        self.spurious = spurious
+        self._rnd = random.Random(seed)
+        self._ping = threading.Event()
+        GPIO.on_output(TRIG, self._on_trigger)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _on_trigger(self, pin, value):
+        if value == GPIO.LOW:
+            self._ping.set()
+
+    def _run(self):
+        while True:
+            self._ping.wait()
+            self._ping.clear()
+            distance = self.distance
+            if self._rnd.random() < self.spurious:
+                distance = self._rnd.uniform(20, 350)
+            time.sleep(0.0002)
+            GPIO.set_input(ECHO, GPIO.HIGH)
+            time.sleep(distance / 17150)
+            GPIO.set_input(ECHO, GPIO.LOW)
+
+
+def run(mode, samples, readings):
+    GPIO.cleanup(ECHO)
+    sensor = UltrasonicSensor(TRIG, ECHO, mode=mode)
+    values = []
+    cpu = time.process_time()
+    for _ in range(readings):
+        if samples == 1:
+            distance = sensor.get_distance()
+            if distance != -1:
+                values.append(distance)
+        else:
+            ultrasonic_group_step([(sensor, values.append)], samples=samples, spacing=0.005)
+        time.sleep(0.005)
+    cpu_ms = (time.process_time() - cpu) * 1000 / readings
+    return values, cpu_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--readings", type=int, default=100)
+    parser.add_argument("--distance", type=float, default=120.0)
+    parser.add_argument("--spurious", type=float, default=0.05)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    FakeHCSR04(args.distance, args.spurious)
+    print(f"target {args.distance} cm, {args.spurious:.0%} spurious echoes, "
+          f"{args.readings} readings per mode\n")
+    print(f"{'mode':<22}{'CPU/reading ms':>16}{'mean cm':>10}{'stdev cm':>10}{'max err cm':>12}")
+    for mode, samples in (("poll", 1), ("edge", 1), ("edge", args.samples)):
+        values, cpu_ms = run(mode, samples, args.readings)
+        label = f"{mode}, {'single ping' if samples == 1 else f'median of {samples}'}"
+        if len(values) < 2:
+            print(f"{label:<22}{cpu_ms:>16.3f}   (no readings)")
+            continue
+        err = max(abs(v - args.distance) for v in values)
+        print(f"{label:<22}{cpu_ms:>16.3f}{statistics.mean(values):>10.1f}"
+              f"{statistics.stdev(values):>10.2f}{err:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Webcam encode CPU: encode every frame vs the motion gate.
+
+Replays a synthetic door clip (textured static scene, sensor noise, slow
+lighting drift, and a few people walking past with a PIR trigger just
+before each walk-by) on a simulated clock. The baseline captures and
+JPEG-encodes every frame at --fps, like Webcam did before. The gated run
+captures at the gate's rate, computes the thumbnail score for every capture
+and encodes only frames that changed (plus keyframes). Reports encodes,
+CPU time spent in the camera loop (thumbnail + encode, frame synthesis
+excluded) and the encoded frame rate while someone is in view.
+
+Requires OpenCV and NumPy.
+
+Usage:
+    python benchmarks/bench_webcam_motion.py [--seconds 120] [--fps 10] [--quality 70]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from motion_gate import MotionGate, thumbnail  # noqa: E402
+
+WIDTH, HEIGHT = 640, 480
+
+
+class DoorClip:
+    """Deterministic synthetic clip; frame(t) renders the scene at time t."""
+
+    def __init__(self, seconds, seed=1):
+        rng = np.random.default_rng(seed)
+        ys, xs = np.indices((HEIGHT, WIDTH))
+        base = 90 + 60 * np.sin(xs / 70.0) * np.cos(ys / 50.0) + rng.normal(0, 12, (HEIGHT, WIDTH))
+        self.background = np.clip(np.stack([base, base * 0.9, base * 0.8], axis=-1), 0, 255)
+        self.rng = rng
+        self.seconds = seconds
+        # (start, duration) of each walk-by, about one every 30 s
+        self.walks = [(t, 3.0 + (i % 3)) for i, t in enumerate(range(12, int(seconds) - 6, 30))]
+
+    def person_x(self, t):
+        for start, duration in self.walks:
+            if start <= t < start + duration:
+                return int(-120 + (WIDTH + 240) * (t - start) / duration)
+        return None
+
+    def in_view(self, t):
+        x = self.person_x(t)
+        return x is not None and -120 < x < WIDTH
+
+    def frame(self, t):
+        drift = 10 * np.sin(2 * np.pi * t / self.seconds)  # slow lighting change
+        img = self.background + drift + self.rng.normal(0, 3, self.background.shape)
+        x = self.person_x(t)
+        if x is not None:
+            x0, x1 = max(0, x), min(WIDTH, x + 120)
+            if x1 > x0:
+                img[120:470, x0:x1] = (40, 50, 70)
+        return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def encode(frame, quality):
+    _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return jpeg
+
+
+def run_baseline(clip, fps, quality):
+    cpu = 0.0
+    captures = encodes = view_encodes = 0
+    t = 0.0
+    while t < clip.seconds:
+        frame = clip.frame(t)
+        start = time.process_time()
+        encode(frame, quality)
+        cpu += time.process_time() - start
+        captures += 1
+        encodes += 1
+        view_encodes += clip.in_view(t)
+        t += 1.0 / fps
+    return captures, encodes, view_encodes, cpu
+
+
+def run_gated(clip, fps, quality, idle_fps):
+    now = [0.0]
+    gate = MotionGate(idle_fps=idle_fps, active_fps=fps, clock=lambda: now[0])
+    pir_pending = [start - 0.5 for start, _ in clip.walks]
+    cpu = 0.0
+    captures = encodes = view_encodes = 0
+    while now[0] < clip.seconds:
+        t = now[0]
+        while pir_pending and pir_pending[0] <= t:
+            pir_pending.pop(0)
+            gate.trigger()
+        frame = clip.frame(t)
+        start = time.process_time()
+        if gate.check(thumbnail(frame), t):
+            encode(frame, quality)
+            encodes += 1
+            view_encodes += clip.in_view(t)
+        cpu += time.process_time() - start
+        captures += 1
+        now[0] = t + 1.0 / gate.fps
+    return captures, encodes, view_encodes, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--idle-fps", type=int, default=2)
+    parser.add_argument("--quality", type=int, default=70)
+    args = parser.parse_args()
+
+    clip = DoorClip(args.seconds)
+    view_time = sum(duration * (WIDTH + 120) / (WIDTH + 240) for _, duration in clip.walks)
+    print(f"{args.seconds:.0f}s {WIDTH}x{HEIGHT} clip, {len(clip.walks)} walk-bys "
+          f"({view_time:.0f}s in view), capture {args.fps} fps, JPEG quality {args.quality}\n")
+    print(f"{'mode':<10}{'captures':>9}{'encodes':>9}{'CPU s':>8}{'CPU %':>8}{'in-view fps':>13}")
+    results = {}
+    for name, fn in (("every", lambda: run_baseline(clip, args.fps, args.quality)),
+                     ("gated", lambda: run_gated(clip, args.fps, args.quality, args.idle_fps))):
+        captures, encodes, view_encodes, cpu = fn()
+        results[name] = cpu
+        print(f"{name:<10}{captures:>9}{encodes:>9}{cpu:>8.2f}{cpu / args.seconds * 100:>8.2f}"
+              f"{view_encodes / view_time:>13.1f}")
+    print(f"\nencode CPU reduced {results['every'] / max(results['gated'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
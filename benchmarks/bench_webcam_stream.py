@@ -0,0 +1,99 @@
+"""
+Simulated webcam stream: frames per second and CPU for concurrent viewers.
+
+Opens N concurrent /api/webcam/stream responses (the StreamingResponse body
+iterators of server/app.py, consumed in-process) and counts the frames each
+viewer receives and the process CPU time used. The current frame cache is
+compared with the previous per-frame pure-Python BMP render.
+
+The stream is served by the MJPEG broadcaster, which renders once per tick
+for all viewers and only resends changed frames: the cached pattern changes
+once per second, so viewers receive ~1-2 frames/s (changes plus keepalives).
+
+Usage:
+    python benchmarks/bench_webcam_stream.py [--clients 1 10 50] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+import app  # noqa: E402
+import webcam_frames  # noqa: E402
+
+
+def legacy_render():
+    """Per-request BMP render used before the frame cache."""
+    w, h = 320, 240
+    row_size = (w * 3 + 3) & ~3
+    pixel_data_size = row_size * h
+    file_size = 54 + pixel_data_size
+    r, g, b = webcam_frames.COLORS[int(time.time()) % 5]
+    header = struct.pack('<2sIHHI', b'BM', file_size, 0, 0, 54)
+    dib = struct.pack('<IiiHHIIiiII', 40, w, h, 1, 24, 0, pixel_data_size, 2835, 2835, 0, 0)
+    rows = []
+    for y in range(h):
+        row = bytearray()
+        for x in range(w):
+            if (x // 40 + y // 40) % 2 == 0:
+                row.extend([b, g, r])
+            else:
+                row.extend([b // 2, g // 2, r // 2])
+        while len(row) % 4 != 0:
+            row.append(0)
+        rows.append(bytes(row))
+    return header + dib + b''.join(rows)
+
+
+class LegacyFrames:
+    def current(self, now=None):
+        return legacy_render()
+
+
+async def viewer(counts, index, deadline):
+    response = await app.webcam_stream()
+    iterator = response.body_iterator
+    try:
+        async for _ in iterator:
+            counts[index] += 1
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        await iterator.aclose()
+
+
+async def run(clients, seconds):
+    counts = [0] * clients
+    deadline = time.monotonic() + seconds
+    cpu = time.process_time()
+    start = time.monotonic()
+    await asyncio.gather(*(viewer(counts, i, deadline) for i in range(clients)))
+    elapsed = time.monotonic() - start
+    return sum(counts) / elapsed / clients, (time.process_time() - cpu) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    app.webcam_frame["data"] = None
+    cached = app.simulated_frames
+    print(f"renderer: {'NumPy' if webcam_frames.HAS_NUMPY else 'pure Python'} (cached), "
+          f"{args.seconds:.0f}s per run\n")
+    print(f"{'mode':<10}{'clients':>8}{'frames/s':>12}{'CPU %':>8}")
+    for name, frames in (("legacy", LegacyFrames()), ("cached", cached)):
+        app.simulated_frames = frames
+        for clients in args.clients:
+            fps, cpu = asyncio.run(run(clients, args.seconds))
+            print(f"{name:<10}{clients:>8}{fps:>12.1f}{cpu * 100:>8.1f}")
+    app.simulated_frames = cached
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Webcam frame uplink: end-to-end latency and bandwidth over a limited link.
+
+A WebcamSimulator feeds the FrameUplink, whose MQTT client is replaced by an
+in-process link that serializes publishes at --kbps (like a socket write
+buffer draining onto the network) plus a fixed propagation delay. The
+receiving side unpacks frames with the server's unpack_frame and records
+latency from publish to arrival.
+
+Modes:
+    queue     publish every frame at the camera fps, never drop (latency grows)
+    drop      fixed fps, drop a frame while the previous one is in flight
+    adaptive  drop plus fps/quality adaptation (the shipped uplink)
+    idle      adaptive uplink with no stream viewers (should send nothing)
+
+Usage:
+    python benchmarks/bench_webcam_uplink.py [--kbps 2000 8000 50000] [--seconds 10]
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "server"))
+
+from simulators.webcam import WebcamSimulator  # noqa: E402
+from webcam_uplink import FrameUplink  # noqa: E402
+from webcam_frames import unpack_frame  # noqa: E402
+
+
+class SimInfo:
+    """Stands in for paho's MQTTMessageInfo."""
+
+    def __init__(self):
+        self.rc = 0
+        self._done = threading.Event()
+
+    def is_published(self):
+        return self._done.is_set()
+
+
+class SimLink:
+    """Publishes are sent one after another at kbps, then arrive after delay."""
+
+    def __init__(self, kbps, delay=0.02):
+        self.kbps = kbps
+        self.delay = delay
+        self.latencies = []
+        self.bytes_delivered = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def publish(self, topic, payload, qos=0):
+        info = SimInfo()
+        self._queue.put((info, payload))
+        return info
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            info, payload = item
+            time.sleep(len(payload) * 8 / (self.kbps * 1000))
+            info._done.set()
+            _, _, sent_at, _ = unpack_frame(payload)
+            self.latencies.append(time.time() + self.delay - sent_at)
+            self.bytes_delivered += len(payload)
+
+    def close(self):
+        self._queue.put(None)
+
+
+class QueueingUplink(FrameUplink):
+    """Publishes every frame regardless of what is still in flight."""
+
+    def send_frame(self):
+        self._pending = None
+        return super().send_frame()
+
+    def _adapt(self, lagged):
+        pass
+
+
+class FixedUplink(FrameUplink):
+    def _adapt(self, lagged):
+        pass
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run(mode, kbps, seconds, camera):
+    link = SimLink(kbps)
+    cls = {"queue": QueueingUplink, "drop": FixedUplink}.get(mode, FrameUplink)
+    uplink = cls(link, camera, "pi1/webcam/frame", max_fps=camera.fps, max_kbps=kbps * 0.9)
+    uplink.set_viewers(0 if mode == "idle" else 1)
+    start = time.monotonic()
+    uplink.start()
+    time.sleep(seconds)
+    uplink.stop()
+    elapsed = time.monotonic() - start
+    backlog = link._queue.qsize()
+    link.close()
+    return {
+        "delivered_fps": len(link.latencies) / elapsed,
+        "kbps": link.bytes_delivered * 8 / 1000 / elapsed,
+        "p50": percentile(link.latencies, 0.5) * 1000,
+        "p99": percentile(link.latencies, 0.99) * 1000,
+        "dropped": uplink.dropped,
+        "backlog": backlog,
+        "fps": uplink.fps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--kbps", type=float, nargs="+", default=[2000, 8000, 50000])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--fps", type=int, default=10)
+    args = parser.parse_args()
+
+    camera = WebcamSimulator(fps=args.fps)
+    camera.start()
+    time.sleep(0.2)
+    frame_kb = len(camera.get_frame()) / 1000
+    print(f"\nsimulated frames: {frame_kb:.0f} kB at {args.fps} fps "
+          f"({frame_kb * 8 * args.fps:.0f} kbps raw), {args.seconds:.0f}s per run\n")
+    print(f"{'mode':<10}{'link kbps':>10}{'recv fps':>10}{'kbps':>9}{'p50 ms':>9}"
+          f"{'p99 ms':>9}{'dropped':>9}{'backlog':>9}{'end fps':>9}")
+    for kbps in args.kbps:
+        for mode in ("queue", "drop", "adaptive", "idle"):
+            r = run(mode, kbps, args.seconds, camera)
+            print(f"{mode:<10}{kbps:>10.0f}{r['delivered_fps']:>10.1f}{r['kbps']:>9.0f}"
+                  f"{r['p50']:>9.0f}{r['p99']:>9.0f}{r['dropped']:>9}{r['backlog']:>9}"
+                  f"{r['fps']:>9.1f}")
+    camera.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Payload size and encode/decode time: JSON batches vs the compact wire format.
+
+Builds batches shaped like MQTTPublisher._publish_batch output (one batch per
+sensor type over a 5 second interval) and reports bytes per batch and
+microseconds per encode/decode for both encodings.
+
+Usage:
+    python benchmarks/bench_wire_format.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wire_format import encode_batch, decode_batch  # noqa: E402
+
+PI_ID, DEVICE = "PI1", "DoorController"
+
+
+def _reading(sensor_id, measurement, value, unit, ts):
+    return {"measurement": measurement, "sensor_id": sensor_id, "pi_id": PI_ID,
+            "device_name": DEVICE, "value": value, "simulated": True,
+            "unit": unit, "timestamp": ts}
+
+
+def build_batches():
+    rnd = random.Random(7)
+    now = time.time()
+    ts = lambda i: now + i * 0.5  # noqa: E731
+    return {
+        "ultrasonic": [_reading(s, "ultrasonic", round(rnd.uniform(2, 400), 2), "cm", ts(i))
+                       for s in ("DUS1", "DUS2") for i in range(10)],
+        "pir": [_reading(s, "pir", rnd.randint(0, 1), "motion", ts(i))
+                for i, s in enumerate(("DPIR1", "DPIR2", "RPIR1", "RPIR2", "RPIR3"))],
+        "dht": [_reading(s, "dht", json.dumps({"temperature": round(rnd.uniform(18, 28), 1),
+                                                "humidity": round(rnd.uniform(30, 70), 1)}), "C/%", ts(i))
+                for s in ("DHT1", "DHT2", "DHT3") for i in range(3)],
+        "gyroscope": [_reading("GSG", "gyroscope",
+                               json.dumps({"x": round(rnd.uniform(-0.5, 0.5), 2),
+                                           "y": round(rnd.uniform(-0.5, 0.5), 2),
+                                           "z": round(rnd.uniform(9.5, 10.1), 2),
+                                           "significant": False}), "m/s2", ts(i))
+                      for i in range(5)],
+    }
+
+
+def encode_json(readings):
+    return json.dumps({"pi_id": PI_ID, "device_name": DEVICE,
+                       "batch_timestamp": time.time(), "readings": readings}).encode("utf-8")
+
+
+def decode_json(payload):
+    return json.loads(payload.decode("utf-8"))
+
+
+def encode_compact(readings):
+    return encode_batch(PI_ID, DEVICE, readings, time.time())
+
+
+def timed(fn, arg, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'batch':<12}{'n':>4}{'json B':>9}{'compact B':>11}{'ratio':>7}"
+          f"{'json enc/dec us':>18}{'compact enc/dec us':>21}")
+    totals = [0, 0]
+    for name, readings in build_batches().items():
+        j, c = encode_json(readings), encode_compact(readings)
+        totals[0] += len(j)
+        totals[1] += len(c)
+        je, jd = timed(encode_json, readings, args.iterations), timed(decode_json, j, args.iterations)
+        ce, cd = timed(encode_compact, readings, args.iterations), timed(decode_batch, c, args.iterations)
+        print(f"{name:<12}{len(readings):>4}{len(j):>9}{len(c):>11}{len(j) / len(c):>6.1f}x"
+              f"{je:>9.1f}/{jd:<8.1f}{ce:>11.1f}/{cd:<8.1f}")
+    print(f"{'total':<16}{totals[0]:>9}{totals[1]:>11}{totals[0] / totals[1]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Pre/post-roll video clips around alarms and door motion.
+
+The camera hands every new encoded frame to ClipRecorder.on_frame (a deque
+append under a lock, so the capture thread never waits on disk). The ring
+keeps the last pre_roll seconds of frames, capped at ring_bytes; frames are
+the camera's own immutable bytes, so nothing is copied. trigger() snapshots
+the ring and a writer thread writes it, followed by the frames of the next
+post_roll seconds, into one segment file. Triggers during a clip extend it,
+up to max_clip seconds. Frames are dropped rather than queued without bound
+if the disk falls behind.
+
+Clip files are multipart MJPEG (the same framing as the live stream) with
+Content-Length and X-Timestamp part headers, so they can be replayed at the
+original pace. A clip is written as <name>.part and renamed when finished.
+Finished clips are kept under quota_bytes in the clip directory, oldest
+deleted first (the clip being written, at most max_clip seconds long, comes
+on top), and passed to on_clip(path).
+
+ClipUploader sends finished clips to the server from disk in fixed-size
+chunks, so memory use does not depend on clip size (see its docstring).
+"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+CLIP_BOUNDARY = b"clip"
+CLIP_SUFFIX = ".mjpeg"
+CHUNK_SIZE = 64 * 1024
+
+
+def clip_part(frame, timestamp):
+    content_type = b"image/bmp" if frame[:2] == b"BM" else b"image/jpeg"
+    return (b"--" + CLIP_BOUNDARY + b"\r\nContent-Type: " + content_type
+            + b"\r\nContent-Length: " + str(len(frame)).encode()
+            + b"\r\nX-Timestamp: " + f"{timestamp:.3f}".encode() + b"\r\n\r\n" + frame + b"\r\n")
+
+
+def enforce_quota(directory, quota_bytes, keep=()):
+    """Delete the oldest clips (never those in keep) until the directory fits in quota_bytes."""
+    clips = []
+    total = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith(CLIP_SUFFIX):
+            continue
+        stat = os.stat(path)
+        total += stat.st_size
+        if path not in keep:
+            clips.append((stat.st_mtime, stat.st_size, path))
+    clips.sort()
+    removed = []
+    for _, size, path in clips:
+        if total <= quota_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+class ClipRecorder:
+    def __init__(self, directory="clips", pre_roll=10.0, post_roll=10.0, max_clip=60.0,
+                 ring_bytes=32 * 1024 * 1024, quota_bytes=200 * 1024 * 1024,
+                 queue_size=256, on_clip=None):
+        self.directory = directory
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_clip = max_clip
+        self.ring_bytes = ring_bytes
+        self.quota_bytes = quota_bytes
+        self.on_clip = on_clip
+        self.clips_written = 0
+        self.frames_dropped = 0
+        self._ring = deque()
+        self._ring_size = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._recording = False
+        self._clip_start = 0.0
+        self._post_until = 0.0
+        self._thread = None
+        self._stop_event = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._writer, name="clip-writer", daemon=True)
+        self._thread.start()
+        print(f"[CLIP] Recorder ready ({self.pre_roll:.0f}s pre-roll, {self.post_roll:.0f}s "
+              f"post-roll, quota {self.quota_bytes // (1024 * 1024)} MB in {self.directory})")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def on_frame(self, frame, timestamp=None):
+        """Camera listener: remember the frame and add it to the open clip."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._ring.append((timestamp, frame))
+            self._ring_size += len(frame)
+            horizon = timestamp - self.pre_roll
+            while self._ring and (self._ring_size > self.ring_bytes or self._ring[0][0] < horizon):
+                self._ring_size -= len(self._ring.popleft()[1])
+            recording = self._recording
+        if recording:
+            self._put(("frame", frame, timestamp))
+
+    def trigger(self, reason):
+        """Start a clip with the buffered pre-roll, or extend the one being written."""
+        now = time.time()
+        safe_reason = re.sub(r"[^A-Za-z0-9]+", "-", reason).strip("-") or "event"
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"_{safe_reason}{CLIP_SUFFIX}"
+        with self._lock:
+            if self._recording:
+                self._post_until = min(self._clip_start + self.max_clip, now + self.post_roll)
+                return False
+            pre_roll = list(self._ring)
+            # Queued under the lock, so every frame on_frame sees as recording comes after it
+            self._put(("open", name, pre_roll))
+            self._recording = True
+            self._clip_start = now
+            self._post_until = now + self.post_roll
+        print(f"[CLIP] Recording {name} ({len(pre_roll)} pre-roll frames)")
+        return True
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _writer(self):
+        f = None
+        path = None
+        while not self._stop_event.is_set() or f is not None:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            try:
+                if item is not None and item[0] == "open":
+                    _, name, frames = item
+                    path = os.path.join(self.directory, name)
+                    f = open(path + ".part", "wb")
+                    for timestamp, frame in frames:
+                        f.write(clip_part(frame, timestamp))
+                elif item is not None and f is not None:
+                    _, frame, timestamp = item
+                    f.write(clip_part(frame, timestamp))
+            except OSError as e:
+                print(f"[CLIP] Write failed: {e}")
+
+            with self._lock:
+                finished = self._recording and (time.time() >= self._post_until
+                                                or self._stop_event.is_set())
+                if finished:
+                    self._recording = False
+            if finished and f is not None:
+                f.close()
+                f = None
+                self._finish(path)
+
+    def _finish(self, path):
+        self.clips_written += 1
+        try:
+            os.replace(path + ".part", path)
+            size = os.path.getsize(path)
+            removed = enforce_quota(self.directory, self.quota_bytes, keep=(path,))
+        except OSError as e:
+            print(f"[CLIP] Quota check failed: {e}")
+            return
+        print(f"[CLIP] Saved {os.path.basename(path)} ({size // 1024} kB)"
+              + (f", evicted {len(removed)} old clip(s)" if removed else ""))
+        if self.on_clip:
+            try:
+                self.on_clip(path)
+            except Exception as e:
+                print(f"[CLIP] Upload failed: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            ring_frames, ring_size = len(self._ring), self._ring_size
+        return {
+            "recording": self._recording,
+            "ring_frames": ring_frames,
+            "ring_kb": ring_size // 1024,
+            "clips": self.clips_written,
+            "dropped": self.frames_dropped,
+        }
+
+
+def chunk_header(name, offset, size):
+    """JSON line in front of every uploaded chunk; the chunk bytes follow it."""
+    return json.dumps({"name": name, "offset": offset, "size": size}).encode() + b"\n"
+
+
+class ClipUploader:
+    """
+    Uploads finished clips from the clip directory to the server.
+
+    Clips are read from disk and published in chunk_size chunks (QoS 1),
+    each preceded by a chunk_header line, with one clip and one chunk in
+    flight at a time, paced to max_kbps so the live frame uplink keeps its
+    bandwidth. Nothing is sent while the client is disconnected, so paho
+    never buffers more than one chunk. The directory is the retry queue:
+    clips go out in name (recording time) order, and the name of the last
+    fully uploaded clip is kept in the .uploaded file. A clip recorded
+    offline, or cut short by a disconnect, is sent again from the start
+    once the client is connected.
+    """
+
+    def __init__(self, client, topic, directory, chunk_size=CHUNK_SIZE, max_kbps=2000,
+                 ack_timeout=10.0, poll_interval=5.0):
+        self.client = client
+        self.topic = topic
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_kbps = max_kbps
+        self.ack_timeout = ack_timeout
+        self.poll_interval = poll_interval
+        self.clips_uploaded = 0
+        self.chunks_sent = 0
+        self.failures = 0
+        self._marker = os.path.join(directory, ".uploaded")
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def notify(self, path=None):
+        """A clip was finished (ClipRecorder on_clip callback)."""
+        self._wake.set()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="clip-uploader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _last_uploaded(self):
+        try:
+            with open(self._marker) as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    def pending(self):
+        """Finished clips newer than the last uploaded one, oldest first."""
+        last = self._last_uploaded()
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.endswith(CLIP_SUFFIX) and name > last)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            for name in self.pending():
+                if self._stop_event.is_set() or not self.client.is_connected():
+                    break
+                if not self._upload(name):
+                    self.failures += 1
+                    break
+                with open(self._marker, "w") as f:
+                    f.write(name)
+
+    def _upload(self, name):
+        """Send one clip; False if it has to be retried later."""
+        path = os.path.join(self.directory, name)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return True  # evicted by the quota before it could be sent
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while True:
+                started = time.monotonic()
+                data = f.read(self.chunk_size)
+                if not self.client.is_connected() or self._stop_event.is_set():
+                    return False
+                info = self.client.publish(self.topic, chunk_header(name, offset, size) + data, qos=1)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    return False
+                info.wait_for_publish(self.ack_timeout)
+                if not info.is_published():
+                    return False
+                self.chunks_sent += 1
+                offset += len(data)
+                if offset >= size:
+                    break
+                pause = len(data) * 8 / 1000 / self.max_kbps - (time.monotonic() - started)
+                if pause > 0:
+                    self._stop_event.wait(pause)
+        self.clips_uploaded += 1
+        print(f"[CLIP] Uploaded {name} ({size // 1024} kB)")
+        return True
+
+    def get_stats(self):
+        return {"uploaded": self.clips_uploaded, "chunks": self.chunks_sent,
+                "failures": self.failures, "pending": len(self.pending())}
@@ -0,0 +1,164 @@
+"""
+Streaming walking-direction estimation from ultrasonic distance readings.
+
+DirectionEstimator fits a least-squares line to the distance readings of the
+last `window` seconds, keeping running sums so each new sample costs O(1)
+(expired samples are subtracted as they leave the window). A negative slope
+means someone is approaching the sensor (ENTERING), a positive one moving away
+(EXITING). The fit's R^2 is reported as the confidence of the direction.
+
+estimate_trace() replays a recorded trace offline; it is vectorized with
+NumPy when available.
+"""
+import threading
+from collections import deque
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+ENTERING = "ENTERING"
+EXITING = "EXITING"
+
+
+def classify(slope, confidence, min_speed=3.0, min_confidence=0.25):
+    """Map a slope (cm/s) and confidence to ENTERING, EXITING or None."""
+    if confidence < min_confidence:
+        return None
+    if slope <= -min_speed:
+        return ENTERING
+    if slope >= min_speed:
+        return EXITING
+    return None
+
+
+class DirectionEstimator:
+    """Sliding-window linear regression of distance over time, O(1) per sample."""
+
+    REBASE_AFTER = 3600.0  # seconds; keeps the running sums well conditioned
+
+    def __init__(self, window=5.0, maxlen=50, min_samples=4, min_speed=3.0, min_confidence=0.25):
+        self.window = window
+        self.min_samples = min_samples
+        self.min_speed = min_speed
+        self.min_confidence = min_confidence
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._t0 = None
+        self._n = 0
+        self._st = self._sd = self._stt = self._std = self._sdd = 0.0
+
+    def add(self, distance, timestamp):
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = timestamp
+            elif timestamp - self._t0 > self.REBASE_AFTER:
+                self._rebase(timestamp)
+            if len(self._samples) == self._samples.maxlen:
+                self._remove(self._samples[0])
+            sample = (timestamp - self._t0, distance)
+            self._samples.append(sample)
+            t, d = sample
+            self._n += 1
+            self._st += t
+            self._sd += d
+            self._stt += t * t
+            self._std += t * d
+            self._sdd += d * d
+
+    def _remove(self, sample):
+        # Caller pops the sample (or lets deque(maxlen) drop it)
+        t, d = sample
+        self._n -= 1
+        self._st -= t
+        self._sd -= d
+        self._stt -= t * t
+        self._std -= t * d
+        self._sdd -= d * d
+
+    def _rebase(self, timestamp):
+        """Move the time origin forward and recompute the sums (amortized O(1))."""
+        shift = timestamp - self._t0
+        old = list(self._samples)
+        self._samples.clear()
+        self._t0 = timestamp
+        self._n = 0
+        self._st = self._sd = self._stt = self._std = self._sdd = 0.0
+        for t, d in old:
+            t -= shift
+            self._samples.append((t, d))
+            self._n += 1
+            self._st += t
+            self._sd += d
+            self._stt += t * t
+            self._std += t * d
+            self._sdd += d * d
+
+    def _expire(self, now):
+        cutoff = now - self._t0 - self.window
+        while self._samples and self._samples[0][0] <= cutoff:
+            self._remove(self._samples.popleft())
+
+    def estimate(self, now):
+        """
+        Return (direction, confidence, slope_cm_per_s) over the last window seconds.
+        direction is None when there are too few samples or no clear trend.
+        """
+        with self._lock:
+            if self._t0 is None:
+                return None, 0.0, 0.0
+            self._expire(now)
+            n = self._n
+            if n < self.min_samples:
+                return None, 0.0, 0.0
+            sxx = self._stt - self._st * self._st / n
+            sxy = self._std - self._st * self._sd / n
+            syy = self._sdd - self._sd * self._sd / n
+        if sxx <= 1e-9:
+            return None, 0.0, 0.0
+        slope = sxy / sxx
+        confidence = 0.0 if syy <= 1e-9 else min(1.0, max(0.0, sxy * sxy / (sxx * syy)))
+        return classify(slope, confidence, self.min_speed, self.min_confidence), confidence, slope
+
+    def __len__(self):
+        return self._n
+
+
+def estimate_trace(timestamps, distances, window=5.0):
+    """
+    Offline replay: slope and confidence at every sample of a recorded trace,
+    each computed over the preceding window seconds (inclusive).
+    Returns (slopes, confidences) as NumPy arrays when NumPy is available,
+    lists otherwise.
+    """
+    if not HAS_NUMPY:
+        estimator = DirectionEstimator(window=window, maxlen=len(timestamps) or 1, min_samples=2)
+        slopes, confidences = [], []
+        for t, d in zip(timestamps, distances):
+            estimator.add(d, t)
+            _, confidence, slope = estimator.estimate(t)
+            slopes.append(slope)
+            confidences.append(confidence)
+        return slopes, confidences
+
+    t = np.asarray(timestamps, dtype=float)
+    d = np.asarray(distances, dtype=float)
+    t = t - t[0] if len(t) else t
+
+    def windowed(x):
+        c = np.concatenate(([0.0], np.cumsum(x)))
+        return c[end] - c[start]
+
+    end = np.arange(1, len(t) + 1)
+    start = np.searchsorted(t, t - window, side="right")
+    n = (end - start).astype(float)
+    st, sd = windowed(t), windowed(d)
+    sxx = windowed(t * t) - st * st / n
+    sxy = windowed(t * d) - st * sd / n
+    syy = windowed(d * d) - sd * sd / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where(sxx > 1e-9, sxy / sxx, 0.0)
+        confidences = np.where((sxx > 1e-9) & (syy > 1e-9), sxy * sxy / (sxx * syy), 0.0)
+    return slopes, np.clip(confidences, 0.0, 1.0)
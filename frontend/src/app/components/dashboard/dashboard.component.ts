@@ -163,6 +163,13 @@ export class DashboardComponent implements OnInit, OnDestroy {
       return;
     }
 
+    // Resync after reconnect or dropped messages: only changed sensors are sent
+    if (msg.type === 'state_delta' && msg.sensors) {
+      for (const id of Object.keys(msg.sensors)) {
+        this.sensors[id] = msg.sensors[id];
+      }
+    }
+
     // Handle timer updates
     if (msg.timer) {
       this.timerDisplay = msg.timer.display || this.timerDisplay;
@@ -8,6 +8,9 @@ export class WebSocketService implements OnDestroy {
   private messagesSubject = new Subject<any>();
   private reconnectInterval = 3000;
   private reconnectTimer: any;
+  // Last applied server state version, used to resume with a delta on reconnect
+  private epoch = '';
+  private version = -1;
 
   messages$: Observable<any> = this.messagesSubject.asObservable();
 
@@ -16,7 +19,10 @@ export class WebSocketService implements OnDestroy {
       return;
     }
 
-    this.socket = new WebSocket(environment.wsUrl);
+    const url = this.epoch
+      ? `${environment.wsUrl}?epoch=${this.epoch}&version=${this.version}`
+      : environment.wsUrl;
+    this.socket = new WebSocket(url);
 
     this.socket.onopen = () => {
       console.log('[WS] Connected');
@@ -26,6 +32,7 @@ export class WebSocketService implements OnDestroy {
       try {
         const data = JSON.parse(event.data);
         this.messagesSubject.next(data);
+        this.trackVersion(data);
       } catch (e) {
         console.error('[WS] Parse error:', e);
       }
@@ -42,6 +49,17 @@ export class WebSocketService implements OnDestroy {
     };
   }
 
+  private trackVersion(data: any): void {
+    if (data.epoch === undefined || data.version === undefined) {
+      return;
+    }
+    if (data.epoch !== this.epoch || data.version > this.version) {
+      this.epoch = data.epoch;
+      this.version = data.version;
+      this.send({ type: 'ack', version: this.version });
+    }
+  }
+
   private scheduleReconnect(): void {
     clearTimeout(this.reconnectTimer);
     this.reconnectTimer = setTimeout(() => this.connect(), this.reconnectInterval);
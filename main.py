@@ -2,9 +2,16 @@ import threading
 import time
 import json
 import math
-from collections import deque
-from settings import load_settings
-from mqtt_publisher import init_publisher, shutdown_publisher, publish_sensor_data
+import os
+import random
+from settings import load_settings, mqtt_namespace, mqtt_topics
+from mqtt_publisher import init_publisher, shutdown_publisher, publish_sensor_data, get_publisher
+from scheduler import Scheduler, process_stats
+from timer_wheel import get_timer_wheel, shutdown_timer_wheel
+from direction import DirectionEstimator
+from webcam_uplink import FrameUplink
+from clip_recorder import ClipRecorder, ClipUploader
+from telemetry import Telemetry
 import paho.mqtt.client as mqtt
 
 try:
@@ -18,14 +25,15 @@ except:
 class KitchenTimer:
     """Kitchen countdown timer displayed on 4SD, controllable via web and BTN."""
 
-    def __init__(self):
+    def __init__(self, timers=None):
         self.remaining_seconds = 0
         self.running = False
         self.blinking = False
         self.lock = threading.Lock()
         self.btn_add_seconds = 10  # N seconds added per BTN press (configurable via web)
-        self._timer_thread = None
-        self._stop_event = threading.Event()
+        self._timers = timers or get_timer_wheel()
+        self._tick_timeout = None
+        self._deadline = 0.0  # monotonic time the next tick is due
         self._on_tick_callback = None
         self._on_finished_callback = None
         self._on_blink_stopped_callback = None
@@ -48,10 +56,9 @@ class KitchenTimer:
                 return False
             self.running = True
             self.blinking = False
-            self._stop_event.clear()
+            self._deadline = time.monotonic() + 1
+            self._tick_timeout = self._timers.schedule(1, self._countdown_tick)
 
-        self._timer_thread = threading.Thread(target=self._countdown, daemon=True)
-        self._timer_thread.start()
         print(f"[TIMER] Started: {self._format_time()}")
         return True
 
@@ -59,7 +66,9 @@ class KitchenTimer:
         """Stop the countdown."""
         with self.lock:
             self.running = False
-            self._stop_event.set()
+            if self._tick_timeout:
+                self._tick_timeout.cancel()
+                self._tick_timeout = None
             print("[TIMER] Stopped")
 
     def add_seconds(self, n=None):
@@ -103,32 +112,34 @@ class KitchenTimer:
         secs = self.remaining_seconds % 60
         return f"{mins:02d}:{secs:02d}"
 
-    def _countdown(self):
-        """Countdown thread loop."""
-        while not self._stop_event.is_set():
-            time.sleep(1)
-            if self._stop_event.is_set():
-                break
+    def _countdown_tick(self):
+        """One-second countdown step, rescheduled on the timer wheel while running."""
+        with self.lock:
+            if not self.running:
+                return
+            self.remaining_seconds = max(0, self.remaining_seconds - 1)
+            display = self._format_time()
+            remaining = self.remaining_seconds
 
-            with self.lock:
-                if not self.running:
-                    break
-                self.remaining_seconds = max(0, self.remaining_seconds - 1)
-                display = self._format_time()
-                remaining = self.remaining_seconds
+            if self._on_tick_callback:
+                self._on_tick_callback(remaining, display, self.blinking)
 
+            if remaining <= 0:
+                self.running = False
+                self.blinking = True
+                self._tick_timeout = None
+                print("[TIMER] TIME'S UP! 4SD blinking 00:00")
+                if self._on_finished_callback:
+                    self._on_finished_callback()
                 if self._on_tick_callback:
-                    self._on_tick_callback(remaining, display, self.blinking)
-
-                if remaining <= 0:
-                    self.running = False
-                    self.blinking = True
-                    print("[TIMER] TIME'S UP! 4SD blinking 00:00")
-                    if self._on_finished_callback:
-                        self._on_finished_callback()
-                    if self._on_tick_callback:
-                        self._on_tick_callback(0, "00:00", True)
-                    break
+                    self._on_tick_callback(0, "00:00", True)
+                return
+
+            # Step from the previous deadline, not from now: the wheel fires
+            # late, and rescheduling "now + 1" would add that lateness every tick.
+            self._deadline += 1
+            delay = max(0.0, self._deadline - time.monotonic())
+            self._tick_timeout = self._timers.schedule(delay, self._countdown_tick)
 
 
 # ==================== ALARM SYSTEM ====================
@@ -138,12 +149,13 @@ class AlarmSystem:
     ALARM = "ALARM"
     ARMING = "ARMING"  # 10-second arming delay
 
-    def __init__(self, pin="1234"):
+    def __init__(self, pin="1234", timers=None):
         self.state = self.DISARMED
         self.pin = pin
         self.pin_buffer = ""
         self.lock = threading.Lock()
         self.alarm_reason = ""
+        self._timers = timers or get_timer_wheel()
         self._arming_timer = None
         self._door_open_timers = {}  # DS sensor -> timer for feature 3
         self._ds_grace_timers = {}   # DS sensor -> grace timer for feature 4
@@ -162,9 +174,7 @@ class AlarmSystem:
                 print(f"[ALARM] System ARMING in 10 seconds...")
                 if self._on_arming_callback:
                     self._on_arming_callback()
-                self._arming_timer = threading.Timer(10, self._complete_arming)
-                self._arming_timer.daemon = True
-                self._arming_timer.start()
+                self._arming_timer = self._timers.schedule(10, self._complete_arming)
                 return True
             else:
                 self.state = self.ARMED
@@ -257,10 +267,7 @@ class AlarmSystem:
     def start_door_open_timer(self, sensor_id, on_timeout):
         """Feature 3: Start 5-second timer when door opens. If still open, trigger ALARM."""
         self.cancel_door_open_timer(sensor_id)
-        timer = threading.Timer(5.0, on_timeout, args=[sensor_id])
-        timer.daemon = True
-        timer.start()
-        self._door_open_timers[sensor_id] = timer
+        self._door_open_timers[sensor_id] = self._timers.schedule(5.0, on_timeout, sensor_id)
         print(f"[ALARM] Door {sensor_id} open - 5s timer started")
 
     def cancel_door_open_timer(self, sensor_id):
@@ -273,10 +280,7 @@ class AlarmSystem:
         """Feature 4: When armed and DS triggers, give grace period for PIN entry."""
         if sensor_id in self._ds_grace_timers:
             return  # Already waiting
-        timer = threading.Timer(10.0, on_timeout, args=[sensor_id])
-        timer.daemon = True
-        timer.start()
-        self._ds_grace_timers[sensor_id] = timer
+        self._ds_grace_timers[sensor_id] = self._timers.schedule(10.0, on_timeout, sensor_id)
         print(f"[ALARM] Door {sensor_id} opened while ARMED - 10s grace for PIN entry")
 
     def cancel_ds_grace_timer(self, sensor_id):
@@ -290,18 +294,20 @@ class PeopleCounter:
     def __init__(self):
         self.count = 0
         self.lock = threading.Lock()
-        self._distance_buffers = {}  # sensor_id -> deque
+        self._estimators = {}  # sensor_id -> DirectionEstimator
         self.last_detection_time = {}
+        self.last_confidence = {}
 
     def add_distance(self, sensor_id, distance, timestamp):
-        if sensor_id not in self._distance_buffers:
-            self._distance_buffers[sensor_id] = deque(maxlen=50)
-        self._distance_buffers[sensor_id].append((distance, timestamp))
+        estimator = self._estimators.get(sensor_id)
+        if estimator is None:
+            estimator = self._estimators.setdefault(sensor_id, DirectionEstimator())
+        estimator.add(distance, timestamp)
 
     def detect_direction(self, sensor_id="DUS1"):
-        """Analyze ultrasonic distance trend to determine enter/exit."""
-        buf = self._distance_buffers.get(sensor_id)
-        if not buf or len(buf) < 5:
+        """Classify enter/exit from the distance trend of the last 5 seconds."""
+        estimator = self._estimators.get(sensor_id)
+        if estimator is None:
             return None
 
         now = time.time()
@@ -309,23 +315,13 @@ class PeopleCounter:
         if now - last_time < 3:
             return None
 
-        recent = [(d, t) for d, t in buf if now - t < 5]
-        if len(recent) < 4:
-            return None
-
-        mid = len(recent) // 2
-        first_half_avg = sum(d for d, _ in recent[:mid]) / mid
-        second_half_avg = sum(d for d, _ in recent[mid:]) / (len(recent) - mid)
-
-        diff = second_half_avg - first_half_avg
-
-        if diff < -10:
-            self.last_detection_time[sensor_id] = now
-            return "ENTERING"
-        elif diff > 10:
+        direction, confidence, slope = estimator.estimate(now)
+        self.last_confidence[sensor_id] = round(confidence, 3)
+        if direction is not None:
             self.last_detection_time[sensor_id] = now
-            return "EXITING"
-        return None
+            print(f"[PEOPLE] {sensor_id} trend {slope:+.1f} cm/s -> {direction} "
+                  f"(confidence {confidence:.2f})")
+        return direction
 
     def person_entered(self):
         with self.lock:
@@ -347,6 +343,7 @@ def main():
     settings = load_settings()
     device_info = settings.get('device_info', {})
     mqtt_config = settings.get('mqtt', {})
+    namespace = mqtt_namespace(settings)
     alarm_pin = settings.get('alarm_pin', '1234')
 
     print("=" * 50)
@@ -355,11 +352,33 @@ def main():
     print("=" * 50)
 
     # Initialize core systems
-    alarm = AlarmSystem(pin=alarm_pin)
+    # All timeouts (door, grace, arming, LED auto-off, kitchen timer) share one wheel thread
+    timers = get_timer_wheel()
+    alarm = AlarmSystem(pin=alarm_pin, timers=timers)
     people = PeopleCounter()
 
     threads = []
     stop_event = threading.Event()
+    # Loop lag/duration, queue and thread CPU stats of the controller itself
+    telemetry_settings = mqtt_config.get('telemetry', {})
+    telemetry = Telemetry(device_info) if telemetry_settings.get('enabled', True) else None
+    # Periodic sensor reads share one scheduler thread; blocking hardware
+    # reads run on its small worker pool
+    scheduler = Scheduler(workers=settings.get('scheduler_workers', 2), telemetry=telemetry)
+
+    # Real buttons and PIRs report GPIO edges through one shared event queue
+    # ('gpio_edge_detect': false, or an unsupported pin, falls back to polling)
+    gpio_events = None
+
+    def watch_gpio(watch, sensor, callback):
+        nonlocal gpio_events
+        if not settings.get('gpio_edge_detect', True):
+            return False
+        if gpio_events is None:
+            from sensors.gpio_events import GPIOEventQueue
+            gpio_events = GPIOEventQueue()
+            gpio_events.start(stop_event)
+        return watch(sensor, callback, gpio_events)
 
     # Initialize MQTT Publisher
     print("\nInitializing MQTT Publisher...")
@@ -369,6 +388,9 @@ def main():
     led = None
     buzzer = None
     led_timer = None
+    webcam = None  # Feature 10; door PIR motion wakes its motion gate
+    clip_recorder = None  # Feature 10; alarms and door PIR motion save clips
+    clip_uploader = None
     led_timer_lock = threading.Lock()
 
     # ---- Helper functions ----
@@ -380,9 +402,15 @@ def main():
             if led_timer is not None:
                 led_timer.cancel()
             led.turn_on()
-            led_timer = threading.Timer(seconds, lambda: led.turn_off())
-            led_timer.daemon = True
-            led_timer.start()
+            led_timer = timers.schedule(seconds, led.turn_off)
+
+    def count_direction(sensor_id):
+        """Count a person in or out if the ultrasonic trend shows a walk-through."""
+        direction = people.detect_direction(sensor_id)
+        if direction == "ENTERING":
+            publish_people_event("ENTERING", people.person_entered())
+        elif direction == "EXITING":
+            publish_people_event("EXITING", people.person_exited())
 
     def activate_alarm_hardware(reason=""):
         if buzzer:
@@ -431,6 +459,8 @@ def main():
 
     def on_alarm_triggered(reason):
         activate_alarm_hardware(reason)
+        if clip_recorder:
+            clip_recorder.trigger("ALARM")
 
     def on_alarm_deactivated():
         deactivate_alarm_hardware()
@@ -493,6 +523,9 @@ def main():
             buzzer = Buzzer(db_settings['pin'], callback=on_buzzer_change)
             print("[DB] Door Buzzer initialized")
 
+    # Real DUS1/DUS2 are measured together on one schedule so their pings don't cross-talk
+    ultrasonic_entries = []
+
     # ---- Ultrasonic Sensor (DUS1) ----
     dus1_settings = settings.get('DUS1', {})
     if dus1_settings:
@@ -502,19 +535,14 @@ def main():
             people.add_distance("DUS1", distance, time.time())
 
         if dus1_simulated:
-            from simulators.ultrasonic import run_ultrasonic_simulator
-            t = threading.Thread(target=run_ultrasonic_simulator,
-                               args=(0.5, on_ultrasonic_dus1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.ultrasonic import make_ultrasonic_simulator_step
+            scheduler.every(0.5, make_ultrasonic_simulator_step(on_ultrasonic_dus1), name="DUS1")
             print("[DUS1] Ultrasonic Sensor simulator started")
         else:
-            from sensors.ultrasonic import run_ultrasonic_loop, UltrasonicSensor
-            us = UltrasonicSensor(dus1_settings['trig_pin'], dus1_settings['echo_pin'])
-            t = threading.Thread(target=run_ultrasonic_loop,
-                               args=(us, 0.5, on_ultrasonic_dus1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from sensors.ultrasonic import UltrasonicSensor
+            us = UltrasonicSensor(dus1_settings['trig_pin'], dus1_settings['echo_pin'],
+                                  mode=dus1_settings.get('mode', 'edge'))
+            ultrasonic_entries.append((us, on_ultrasonic_dus1))
             print("[DUS1] Ultrasonic Sensor started")
 
     # ---- Ultrasonic Sensor (DUS2) ----
@@ -526,21 +554,28 @@ def main():
             people.add_distance("DUS2", distance, time.time())
 
         if dus2_simulated:
-            from simulators.ultrasonic import run_ultrasonic_simulator
-            t = threading.Thread(target=run_ultrasonic_simulator,
-                               args=(0.5, on_ultrasonic_dus2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.ultrasonic import make_ultrasonic_simulator_step
+            scheduler.every(0.5, make_ultrasonic_simulator_step(on_ultrasonic_dus2), name="DUS2")
             print("[DUS2] Ultrasonic Sensor simulator started")
         else:
-            from sensors.ultrasonic import run_ultrasonic_loop, UltrasonicSensor
-            us2 = UltrasonicSensor(dus2_settings['trig_pin'], dus2_settings['echo_pin'])
-            t = threading.Thread(target=run_ultrasonic_loop,
-                               args=(us2, 0.5, on_ultrasonic_dus2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from sensors.ultrasonic import UltrasonicSensor
+            us2 = UltrasonicSensor(dus2_settings['trig_pin'], dus2_settings['echo_pin'],
+                                  mode=dus2_settings.get('mode', 'edge'))
+            ultrasonic_entries.append((us2, on_ultrasonic_dus2))
             print("[DUS2] Ultrasonic Sensor started")
 
+    if ultrasonic_entries:
+        from sensors.ultrasonic import ultrasonic_group_step
+        us_samples = settings.get('ultrasonic_samples', 5)
+
+        def ultrasonic_cycle():
+            started = time.monotonic()
+            ultrasonic_group_step(ultrasonic_entries, samples=us_samples)
+            # Keep a 0.5 s cadence regardless of how long the burst took
+            return max(0.05, 0.5 - (time.monotonic() - started))
+
+        scheduler.every(0.5, ultrasonic_cycle, name="DUS", blocking=True)
+
     # ---- PIR Motion Sensor (DPIR1) ----
     dpir1_settings = settings.get('DPIR1', {})
     if dpir1_settings:
@@ -549,6 +584,11 @@ def main():
 
         def on_pir1(motion_detected):
             if motion_detected == last_pir1_motion[0]:
+                if motion_detected:
+                    # Motion continues (re-reported every 0.5 s): keep DL on and
+                    # retry enter/exit until the walk-through shows up on DUS1
+                    turn_on_led_timed(10)
+                    count_direction("DUS1")
                 return
             last_pir1_motion[0] = motion_detected
 
@@ -556,18 +596,16 @@ def main():
 
             if motion_detected:
                 print("[DPIR1] Motion DETECTED!")
+                if webcam:
+                    webcam.motion.trigger()
+                if clip_recorder:
+                    clip_recorder.trigger("DPIR1")
 
                 # 1. Turn on DL for 10 seconds
                 turn_on_led_timed(10)
 
                 # 2. Detect enter/exit using ultrasonic data
-                direction = people.detect_direction("DUS1")
-                if direction == "ENTERING":
-                    count = people.person_entered()
-                    publish_people_event("ENTERING", count)
-                elif direction == "EXITING":
-                    count = people.person_exited()
-                    publish_people_event("EXITING", count)
+                count_direction("DUS1")
 
                 # Feature 4: Check alarm - trigger if system is armed
                 if alarm.state == AlarmSystem.ARMED:
@@ -575,19 +613,14 @@ def main():
                         pass  # callback handles hardware
 
         if dpir1_simulated:
-            from simulators.pir import run_pir_simulator
-            t = threading.Thread(target=run_pir_simulator,
-                               args=(2, on_pir1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.pir import pir_simulator_step
+            scheduler.every(2, lambda: pir_simulator_step(on_pir1), name="DPIR1")
             print("[DPIR1] PIR Motion Sensor simulator started")
         else:
-            from sensors.pir import run_pir_loop, PIRSensor
+            from sensors.pir import make_pir_step, watch_pir, PIRSensor
             pir = PIRSensor(dpir1_settings['pin'])
-            t = threading.Thread(target=run_pir_loop,
-                               args=(pir, 0.5, on_pir1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_pir, pir, on_pir1):
+                scheduler.every(0.5, make_pir_step(pir, on_pir1), name="DPIR1")
             print("[DPIR1] PIR Motion Sensor started")
 
     # ---- PIR Motion Sensor (DPIR2) ----
@@ -598,6 +631,8 @@ def main():
 
         def on_pir2(motion_detected):
             if motion_detected == last_pir2_motion[0]:
+                if motion_detected:
+                    count_direction("DUS2")
                 return
             last_pir2_motion[0] = motion_detected
 
@@ -605,15 +640,13 @@ def main():
 
             if motion_detected:
                 print("[DPIR2] Motion DETECTED!")
+                if webcam:
+                    webcam.motion.trigger()
+                if clip_recorder:
+                    clip_recorder.trigger("DPIR2")
 
                 # 2a. Same logic as DPIR1 but using DUS2
-                direction = people.detect_direction("DUS2")
-                if direction == "ENTERING":
-                    count = people.person_entered()
-                    publish_people_event("ENTERING", count)
-                elif direction == "EXITING":
-                    count = people.person_exited()
-                    publish_people_event("EXITING", count)
+                count_direction("DUS2")
 
                 # Feature 4: Check alarm
                 if alarm.state == AlarmSystem.ARMED:
@@ -621,19 +654,14 @@ def main():
                         pass
 
         if dpir2_simulated:
-            from simulators.pir import run_pir_simulator
-            t = threading.Thread(target=run_pir_simulator,
-                               args=(2, on_pir2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.pir import pir_simulator_step
+            scheduler.every(2, lambda: pir_simulator_step(on_pir2), name="DPIR2")
             print("[DPIR2] PIR Motion Sensor simulator started")
         else:
-            from sensors.pir import run_pir_loop, PIRSensor
+            from sensors.pir import make_pir_step, watch_pir, PIRSensor
             pir2 = PIRSensor(dpir2_settings['pin'])
-            t = threading.Thread(target=run_pir_loop,
-                               args=(pir2, 0.5, on_pir2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_pir, pir2, on_pir2):
+                scheduler.every(0.5, make_pir_step(pir2, on_pir2), name="DPIR2")
             print("[DPIR2] PIR Motion Sensor started")
 
     # ---- Door Sensor / Button (DS1) ----
@@ -655,19 +683,15 @@ def main():
                     alarm.start_ds_grace_timer("DS1", on_ds_grace_expired)
 
         if ds1_simulated:
-            from simulators.button import run_button_simulator
-            t = threading.Thread(target=run_button_simulator,
-                               args=(on_button_ds1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.button import make_button_simulator_step
+            scheduler.every(random.uniform(5, 15), make_button_simulator_step(on_button_ds1),
+                            name="DS1")
             print("[DS1] Door Sensor simulator started")
         else:
-            from sensors.button import run_button_loop, Button
+            from sensors.button import make_button_step, watch_button, Button
             btn = Button(ds1_settings['pin'])
-            t = threading.Thread(target=run_button_loop,
-                               args=(btn, on_button_ds1, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_button, btn, on_button_ds1):
+                scheduler.every(0.05, make_button_step(btn, on_button_ds1), name="DS1")
             print("[DS1] Door Sensor started")
 
     # ---- Door Sensor / Button (DS2) ----
@@ -689,19 +713,15 @@ def main():
                     alarm.start_ds_grace_timer("DS2", on_ds_grace_expired)
 
         if ds2_simulated:
-            from simulators.button import run_button_simulator
-            t = threading.Thread(target=run_button_simulator,
-                               args=(on_button_ds2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.button import make_button_simulator_step
+            scheduler.every(random.uniform(5, 15), make_button_simulator_step(on_button_ds2),
+                            name="DS2")
             print("[DS2] Door Sensor simulator started")
         else:
-            from sensors.button import run_button_loop, Button
+            from sensors.button import make_button_step, watch_button, Button
             btn2 = Button(ds2_settings['pin'])
-            t = threading.Thread(target=run_button_loop,
-                               args=(btn2, on_button_ds2, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_button, btn2, on_button_ds2):
+                scheduler.every(0.05, make_button_step(btn2, on_button_ds2), name="DS2")
             print("[DS2] Door Sensor started")
 
     # ---- Membrane Switch (DMS) ----
@@ -725,23 +745,20 @@ def main():
                 pass
 
         if dms_simulated:
-            from simulators.membrane_switch import run_membrane_switch_simulator
-            t = threading.Thread(target=run_membrane_switch_simulator,
-                               args=(on_membrane_key, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.membrane_switch import membrane_switch_simulator_step
+            scheduler.every(random.uniform(3, 10),
+                            lambda: membrane_switch_simulator_step(on_membrane_key), name="DMS")
             print("[DMS] Membrane Switch simulator started")
         else:
-            from sensors.membrane_switch import run_membrane_switch_loop, MembraneSwitch
+            from sensors.membrane_switch import membrane_switch_step, MembraneSwitch
             row_pins = [dms_settings['R1'], dms_settings['R2'],
                        dms_settings['R3'], dms_settings['R4']]
             col_pins = [dms_settings['C1'], dms_settings['C2'],
                        dms_settings['C3'], dms_settings['C4']]
             ms = MembraneSwitch(row_pins, col_pins)
-            t = threading.Thread(target=run_membrane_switch_loop,
-                               args=(ms, on_membrane_key, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            # scan_key() busy-waits while a key is held, so scan on the pool
+            scheduler.every(0.1, lambda: membrane_switch_step(ms, on_membrane_key),
+                            name="DMS", blocking=True)
             print("[DMS] Membrane Switch started")
 
     # ---- Room PIR Sensors (RPIR1, RPIR2, RPIR3) - Feature 5 ----
@@ -770,19 +787,14 @@ def main():
         rpir_callback = make_rpir_callback(sid, rpir_simulated, last_state)
 
         if rpir_simulated:
-            from simulators.pir import run_pir_simulator
-            t = threading.Thread(target=run_pir_simulator,
-                               args=(2, rpir_callback, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.pir import pir_simulator_step
+            scheduler.every(2, lambda cb=rpir_callback: pir_simulator_step(cb), name=rpir_id)
             print(f"[{rpir_id}] Room PIR Sensor simulator started")
         else:
-            from sensors.pir import run_pir_loop, PIRSensor
+            from sensors.pir import make_pir_step, watch_pir, PIRSensor
             rpir_sensor = PIRSensor(rpir_settings['pin'])
-            t = threading.Thread(target=run_pir_loop,
-                               args=(rpir_sensor, 0.5, rpir_callback, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_pir, rpir_sensor, rpir_callback):
+                scheduler.every(0.5, make_pir_step(rpir_sensor, rpir_callback), name=rpir_id)
             print(f"[{rpir_id}] Room PIR Sensor started")
 
     # ==================== FEATURE 6: GSG Gyroscope Alarm ====================
@@ -802,20 +814,15 @@ def main():
                 alarm.trigger_alarm(reason="GSG gyroscope - significant movement on patron saint icon")
 
         if gsg_simulated:
-            from simulators.gyroscope import run_gyroscope_simulator
-            t = threading.Thread(target=run_gyroscope_simulator,
-                               args=(1, on_gyroscope, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.gyroscope import gyroscope_simulator_step
+            scheduler.every(1, lambda: gyroscope_simulator_step(on_gyroscope), name="GSG")
             print("[GSG] Gyroscope simulator started")
         else:
-            from sensors.gyroscope import run_gyroscope_loop, Gyroscope
+            from sensors.gyroscope import gyroscope_step, Gyroscope
             gyro = Gyroscope(bus_num=gsg_settings.get('bus', 1),
                            address=int(gsg_settings.get('address', '0x68'), 16))
-            t = threading.Thread(target=run_gyroscope_loop,
-                               args=(gyro, 1, on_gyroscope, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            scheduler.every(1, lambda: gyroscope_step(gyro, on_gyroscope),
+                            name="GSG", blocking=True)
             print("[GSG] Gyroscope started")
 
     # ==================== FEATURE 7: DHT1-3 on LCD ====================
@@ -866,55 +873,44 @@ def main():
         dht_callback = make_dht_callback(sid, dht_simulated)
 
         if dht_simulated:
-            from simulators.dht import run_dht_simulator
-            t = threading.Thread(target=run_dht_simulator,
-                               args=(2, dht_callback, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.dht import make_dht_simulator_step
+            scheduler.every(2, make_dht_simulator_step(dht_callback), name=dht_id)
             print(f"[{dht_id}] DHT Sensor simulator started")
         else:
-            from sensors.dht import run_dht_loop, DHTSensor
+            from sensors.dht import dht_step, DHTSensor
             dht_sensor = DHTSensor(dht_settings['pin'])
-            t = threading.Thread(target=run_dht_loop,
-                               args=(dht_sensor, 2, dht_callback, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            scheduler.every(2, lambda s=dht_sensor, cb=dht_callback: dht_step(s, cb),
+                            name=dht_id, blocking=True)
             print(f"[{dht_id}] DHT Sensor started")
 
-    # LCD rotation thread - alternates DHT readings every 5 seconds
-    def lcd_rotation_loop():
-        dht_order = ["DHT1", "DHT2", "DHT3"]
-        dht_names = {"DHT1": "Bedroom", "DHT2": "Master Bed", "DHT3": "Kitchen"}
-        idx = 0
-        while not stop_event.is_set():
-            time.sleep(5)
-            if stop_event.is_set():
-                break
-            if not lcd:
-                continue
-
-            with dht_readings_lock:
-                if not dht_readings:
-                    continue
-                # Cycle through available DHTs
-                for _ in range(len(dht_order)):
-                    sensor_id = dht_order[idx % len(dht_order)]
-                    idx += 1
-                    if sensor_id in dht_readings:
-                        reading = dht_readings[sensor_id]
-                        name = dht_names.get(sensor_id, sensor_id)
-                        line1 = f"{name}: {reading['temperature']}C"
-                        line2 = f"Humidity: {reading['humidity']}%"
-                        lcd.write(line1, line2)
-                        break
-
-    lcd_thread = threading.Thread(target=lcd_rotation_loop, daemon=True)
-    lcd_thread.start()
-    threads.append(lcd_thread)
+    # LCD rotation - alternates DHT readings every 5 seconds
+    dht_order = ["DHT1", "DHT2", "DHT3"]
+    dht_names = {"DHT1": "Bedroom", "DHT2": "Master Bed", "DHT3": "Kitchen"}
+    lcd_idx = [0]
+
+    def lcd_rotation_step():
+        if not lcd:
+            return
+        with dht_readings_lock:
+            if not dht_readings:
+                return
+            # Cycle through available DHTs
+            for _ in range(len(dht_order)):
+                sensor_id = dht_order[lcd_idx[0] % len(dht_order)]
+                lcd_idx[0] += 1
+                if sensor_id in dht_readings:
+                    reading = dht_readings[sensor_id]
+                    name = dht_names.get(sensor_id, sensor_id)
+                    line1 = f"{name}: {reading['temperature']}C"
+                    line2 = f"Humidity: {reading['humidity']}%"
+                    lcd.write(line1, line2)
+                    break
+
+    scheduler.every(5, lcd_rotation_step, name="LCD")
     print("[LCD] DHT rotation display started")
 
     # ==================== FEATURE 8: Kitchen Timer ====================
-    kitchen_timer = KitchenTimer()
+    kitchen_timer = KitchenTimer(timers=timers)
     kitchen_timer.btn_add_seconds = settings.get('timer_btn_seconds', 10)
 
     # 4SD Display
@@ -956,19 +952,15 @@ def main():
                 kitchen_timer.add_seconds()
 
         if btn_simulated:
-            from simulators.button import run_button_simulator
-            t = threading.Thread(target=run_button_simulator,
-                               args=(on_kitchen_btn, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.button import make_button_simulator_step
+            scheduler.every(random.uniform(5, 15), make_button_simulator_step(on_kitchen_btn),
+                            name="BTN")
             print("[BTN] Kitchen Button simulator started")
         else:
-            from sensors.button import run_button_loop, Button
+            from sensors.button import make_button_step, watch_button, Button
             kitchen_btn = Button(btn_settings['pin'])
-            t = threading.Thread(target=run_button_loop,
-                               args=(kitchen_btn, on_kitchen_btn, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            if not watch_gpio(watch_button, kitchen_btn, on_kitchen_btn):
+                scheduler.every(0.05, make_button_step(kitchen_btn, on_kitchen_btn), name="BTN")
             print("[BTN] Kitchen Button started")
 
     # Timer callbacks -> update 4SD display
@@ -1040,15 +1032,14 @@ def main():
                     brgb.set_color_name(action)
 
         if ir_simulated:
-            from simulators.ir_receiver import run_ir_simulator
-            t = threading.Thread(target=run_ir_simulator,
-                               args=(1, on_ir_received, stop_event), daemon=True)
-            t.start()
-            threads.append(t)
+            from simulators.ir_receiver import ir_simulator_step
+            scheduler.every(random.uniform(3, 8), lambda: ir_simulator_step(on_ir_received),
+                            name="IR")
             print("[IR] IR Receiver simulator started")
         else:
             from sensors.ir_receiver import run_ir_loop, IRReceiver
             ir_sensor = IRReceiver(ir_settings['pin'])
+            # Decoding blocks on GPIO edges for a whole frame; keep its own thread
             t = threading.Thread(target=run_ir_loop,
                                args=(ir_sensor, 0.1, on_ir_received, stop_event), daemon=True)
             t.start()
@@ -1056,23 +1047,37 @@ def main():
             print("[IR] IR Receiver started")
 
     # ==================== FEATURE 10: Web Camera ====================
-    webcam = None
+    webcam_uplink = None
+    media_client = []
     webc_settings = settings.get('WEBC', {})
+
+    def get_media_client():
+        """Separate MQTT connection for frames and clips, so alarms never queue behind them."""
+        if not media_client:
+            client = mqtt.Client(client_id=f"{namespace}_webcam_media")
+            client.connect_async(mqtt_config.get('broker_host', 'localhost'),
+                                 mqtt_config.get('broker_port', 1883), keepalive=60)
+            client.loop_start()
+            media_client.append(client)
+        return media_client[0]
     if webc_settings:
         webc_simulated = webc_settings.get('simulated', True)
         webc_width = webc_settings.get('width', 640)
         webc_height = webc_settings.get('height', 480)
         webc_fps = webc_settings.get('fps', 10)
+        webc_motion = dict(idle_fps=webc_settings.get('idle_fps', 2),
+                           motion_threshold=webc_settings.get('motion_threshold', 1.5))
 
         if webc_simulated:
             from simulators.webcam import WebcamSimulator
-            webcam = WebcamSimulator(width=webc_width, height=webc_height, fps=webc_fps)
+            webcam = WebcamSimulator(width=webc_width, height=webc_height, fps=webc_fps,
+                                     **webc_motion)
             webcam.start()
             print("[WEBC] Webcam simulator started")
         else:
             from sensors.webcam import Webcam
             webcam = Webcam(device_index=webc_settings.get('device_index', 0),
-                          width=webc_width, height=webc_height, fps=webc_fps)
+                          width=webc_width, height=webc_height, fps=webc_fps, **webc_motion)
             webcam.start()
             print("[WEBC] Webcam started")
 
@@ -1083,20 +1088,72 @@ def main():
                                      "simulated": webc_simulated}),
                           webc_simulated, "status")
 
+        # Motion score: publish while the scene is changing, then one final 0
+        last_motion_score = [0.0]
+
+        def publish_webcam_motion():
+            score = round(webcam.motion.take_peak(), 1)
+            if score >= webcam.motion.threshold or last_motion_score[0] >= webcam.motion.threshold:
+                publish_sensor_data("WEBC_MOTION", "webcam_motion", score, webc_simulated, "%")
+            last_motion_score[0] = score
+
+        scheduler.every(2, publish_webcam_motion, name="WEBC_MOTION")
+
+        # Pre/post-roll clips around alarms and door motion, uploaded to the server
+        clip_settings = webc_settings.get('clips', {})
+        if clip_settings.get('enabled', True):
+            clip_directory = clip_settings.get('directory', 'clips')
+            if publisher and clip_settings.get('upload', True):
+                clip_uploader = ClipUploader(
+                    get_media_client(),
+                    topic=mqtt_topics(settings).get('webcam_clip', f"{namespace}/webcam/clip"),
+                    directory=clip_directory,
+                    chunk_size=clip_settings.get('chunk_kb', 64) * 1024,
+                    max_kbps=clip_settings.get('upload_kbps', 2000))
+
+            clip_recorder = ClipRecorder(
+                directory=clip_directory,
+                pre_roll=clip_settings.get('pre_roll', 10),
+                post_roll=clip_settings.get('post_roll', 10),
+                max_clip=clip_settings.get('max_clip', 60),
+                ring_bytes=clip_settings.get('ring_mb', 32) * 1024 * 1024,
+                quota_bytes=clip_settings.get('quota_mb', 200) * 1024 * 1024,
+                on_clip=clip_uploader.notify if clip_uploader else None)
+            webcam.add_listener(clip_recorder.on_frame)
+            clip_recorder.start()
+            if clip_uploader:
+                clip_uploader.start()
+
+        # Ship frames to the server while someone is watching the stream
+        uplink_settings = webc_settings.get('uplink', {})
+        if publisher and uplink_settings.get('enabled', True):
+            webcam_uplink = FrameUplink(
+                get_media_client(), webcam,
+                topic=mqtt_topics(settings).get('webcam_frame', f"{namespace}/webcam/frame"),
+                max_fps=uplink_settings.get('max_fps', webc_fps),
+                max_kbps=uplink_settings.get('max_kbps', 4000))
+            webcam_uplink.start()
+
     # ---- MQTT Command Subscriber (for web app commands) ----
-    command_client = mqtt.Client(client_id="pi1_command_listener")
+    command_client = mqtt.Client(client_id=f"{namespace}_command_listener")
+    command_prefix = f"{namespace}/commands/"
+    # Commands the server sent with an id are acknowledged on <namespace>/acks/<command>
+    ack_prefix = f"{namespace}/acks/"
 
     def on_command_connect(client, userdata, flags, rc):
         if rc == 0:
-            client.subscribe("pi1/commands/#")
-            print("[MQTT-CMD] Subscribed to pi1/commands/#")
+            client.subscribe(command_prefix + "#")
+            print(f"[MQTT-CMD] Subscribed to {command_prefix}#")
 
     def on_command_message(client, userdata, msg):
+        started = time.perf_counter()
+        topic = msg.topic[len(command_prefix):]
+        payload = None
+        status = "ok"
         try:
             payload = json.loads(msg.payload.decode())
-            topic = msg.topic
 
-            if topic == "pi1/commands/alarm":
+            if topic == "alarm":
                 action = payload.get("action")
                 if action == "arm":
                     alarm.arm(delayed=False)  # Web app arm is immediate
@@ -1104,15 +1161,16 @@ def main():
                     pin = payload.get("pin", "")
                     if not alarm.deactivate(pin):
                         publish_sensor_data("ALARM", "alarm_event", "wrong_pin", True, "event")
+                        status = "rejected"
 
-            elif topic == "pi1/commands/led":
+            elif topic == "led":
                 action = payload.get("action")
                 if action == "on" and led:
                     led.turn_on()
                 elif action == "off" and led:
                     led.turn_off()
 
-            elif topic == "pi1/commands/buzzer":
+            elif topic == "buzzer":
                 action = payload.get("action")
                 if action == "on" and buzzer:
                     buzzer.turn_on()
@@ -1121,7 +1179,7 @@ def main():
                 elif action == "beep" and buzzer:
                     buzzer.beep()
 
-            elif topic == "pi1/commands/timer":
+            elif topic == "timer":
                 action = payload.get("action")
                 if action == "set_time":
                     seconds = int(payload.get("seconds", 0))
@@ -1137,7 +1195,7 @@ def main():
                     n = int(payload.get("seconds", 10))
                     kitchen_timer.set_btn_seconds(n)
 
-            elif topic == "pi1/commands/brgb":
+            elif topic == "brgb":
                 action = payload.get("action")
                 if brgb:
                     if action == "on":
@@ -1162,9 +1220,23 @@ def main():
                     elif action == "brightness_down":
                         brgb.brightness_down()
 
+            elif topic == "webcam":
+                if payload.get("action") == "viewers" and webcam_uplink:
+                    webcam_uplink.set_viewers(payload.get("count", 0))
+
+            else:
+                status = "unknown"
+
         except Exception as e:
+            status = "error"
             print(f"[MQTT-CMD] Error processing command: {e}")
 
+        if isinstance(payload, dict) and payload.get("id"):
+            ack = {"id": payload["id"], "status": status,
+                   "exec_ms": round((time.perf_counter() - started) * 1000, 3),
+                   "timestamp": time.time()}
+            client.publish(ack_prefix + topic, json.dumps(ack), qos=1)
+
     command_client.on_connect = on_command_connect
     command_client.on_message = on_command_message
 
@@ -1180,23 +1252,31 @@ def main():
     # ---- Periodic state publisher ----
     def state_publisher():
         """Periodically publish system state for the web app."""
-        while not stop_event.is_set():
-            publish_alarm_state()
-            publish_sensor_data("PEOPLE", "people_count", people.get_count(), True, "count")
-            # Publish timer state
-            ts = kitchen_timer.get_state()
-            publish_sensor_data("TIMER", "timer_state",
-                              json.dumps(ts), True, "state")
-            # Publish BRGB state
-            if brgb:
-                publish_sensor_data("BRGB", "rgb_led",
-                                  json.dumps(brgb.get_state()),
-                                  brgb_settings.get('simulated', True), "rgb")
-            time.sleep(10)
+        publish_alarm_state()
+        publish_sensor_data("PEOPLE", "people_count", people.get_count(), True, "count")
+        # Publish timer state
+        ts = kitchen_timer.get_state()
+        publish_sensor_data("TIMER", "timer_state",
+                          json.dumps(ts), True, "state")
+        # Publish BRGB state
+        if brgb:
+            publish_sensor_data("BRGB", "rgb_led",
+                              json.dumps(brgb.get_state()),
+                              brgb_settings.get('simulated', True), "rgb")
+
+    scheduler.every(10, state_publisher, name="STATE", initial_delay=0)
+
+    # ---- Self-telemetry, on its own topic ----
+    if telemetry and publisher:
+        telemetry_topic = mqtt_topics(settings).get('telemetry', f"{namespace}/telemetry/runtime")
+        telemetry.add_source("queue", lambda: publisher.get_queue_stats(reset_high_water=True))
+
+        def publish_telemetry():
+            publisher.client.publish(telemetry_topic, json.dumps(telemetry.report()))
+
+        scheduler.every(telemetry_settings.get('interval', 60), publish_telemetry, name="TELEMETRY")
 
-    state_thread = threading.Thread(target=state_publisher, daemon=True)
-    state_thread.start()
-    threads.append(state_thread)
+    scheduler.start(stop_event)
 
     # ---- Console Interface ----
     time.sleep(1)
@@ -1280,6 +1360,8 @@ def main():
                     if alarm.alarm_reason:
                         print(f"  Alarm Reason: {alarm.alarm_reason}")
                     print(f"  People inside: {people.get_count()}")
+                    for sensor_id, confidence in people.last_confidence.items():
+                        print(f"  {sensor_id} direction confidence: {confidence}")
                     print(f"  LED: {'ON' if led and led.get_state() else 'OFF'}")
                     print(f"  Buzzer: {'ON' if buzzer and buzzer.get_state() else 'OFF'}")
                     ts = kitchen_timer.get_state()
@@ -1290,7 +1372,21 @@ def main():
                         bs = brgb.get_state()
                         print(f"  BRGB: {'ON' if bs['on'] else 'OFF'} RGB({bs['r']},{bs['g']},{bs['b']}) @ {bs['brightness']}%")
                     if webcam:
-                        print(f"  Webcam: {'Active' if webcam.running else 'Stopped'}")
+                        print(f"  Webcam: {'Active' if webcam.running else 'Stopped'} "
+                              f"motion={webcam.motion.get_stats()}")
+                    if webcam_uplink:
+                        print(f"  Webcam uplink: {webcam_uplink.get_stats()}")
+                    if clip_recorder:
+                        print(f"  Clips: {clip_recorder.get_stats()}")
+                    if clip_uploader:
+                        print(f"  Clip upload: {clip_uploader.get_stats()}")
+                    publisher = get_publisher()
+                    if publisher and publisher.reporting and publisher.reporting.policies:
+                        print(f"  Reporting: {publisher.reporting.get_stats()}")
+                    if publisher:
+                        print(f"  MQTT queues: {publisher.get_queue_stats()}")
+                    ps = process_stats()
+                    print(f"  Threads: {ps['threads']}  RSS: {ps['rss_kb']} kB")
                 elif cmd == "menu":
                     print("Commands: arm, disarm, led on/off, buzz on/off/beep, rgb on/off/COLOR, timer ..., status, exit")
                 else:
@@ -1309,9 +1405,22 @@ def main():
             led.turn_off()
         if brgb:
             brgb.turn_off()
+        if webcam_uplink:
+            webcam_uplink.stop()
+        for client in media_client:
+            client.loop_stop()
+            client.disconnect()
+        if clip_recorder:
+            clip_recorder.stop()
+        if clip_uploader:
+            clip_uploader.stop()
         if webcam:
             webcam.stop()
 
+        scheduler.stop()
+        if gpio_events:
+            gpio_events.stop()
+        shutdown_timer_wheel()
         command_client.loop_stop()
         command_client.disconnect()
         shutdown_publisher()
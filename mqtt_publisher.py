@@ -3,25 +3,80 @@ import threading
 import time
 from collections import deque
 import paho.mqtt.client as mqtt
+from wire_format import encode_batch
+from spool import DiskSpool
+from reporting import ReportingFilter
+from aggregator import WindowAggregator
+from settings import mqtt_namespace, mqtt_topics
+
+# Priority per sensor type (anything not listed is "normal"). "high" readings
+# are published immediately instead of waiting for the batch interval; in the
+# spool they are evicted last, "low" first.
+DEFAULT_PRIORITIES = {
+    "high": ["alarm", "alarm_event", "alarm_reason", "people_count", "people_event",
+             "timer_state", "timer_event"],
+    "low": ["ultrasonic", "gyroscope", "dht", "webcam_motion"],
+}
 
 
 class MQTTPublisher:
     """
     MQTT Publisher with batch sending via daemon thread.
     Thread-safe implementation with minimal mutex-protected sections.
+
+    Readings whose sensor type is classified "high" (alarm, people and timer
+    events by default) wake the daemon and are published right away; bulk
+    telemetry keeps batching.
+
+    With a ReportingFilter, readings inside their sensor's deadband are
+    dropped before they are queued (see reporting.py).
+
+    With a WindowAggregator, configured sensor types also get per-window
+    min/max/mean/count/last readings ("<type>_agg", see aggregator.py),
+    computed from the full stream and sent with the regular batches,
+    alongside the raw readings or instead of them.
+
+    With a DiskSpool, readings that cannot be published (broker down or a
+    failed publish) are written to disk instead of being dropped, and are
+    drained in order, highest-priority lane first, once the broker is back.
     """
 
-    def __init__(self, broker_host, broker_port, device_info, topics, batch_interval=5):
+    def __init__(self, broker_host, broker_port, device_info, topics, batch_interval=5,
+                 encoding="json", spool=None, priorities=None, drain_budget=2.0,
+                 reporting=None, aggregator=None, namespace="pi1"):
         self.broker_host = broker_host
         self.broker_port = broker_port
         self.device_info = device_info
         self.topics = topics
+        # First topic level, shared by all of this device's topics
+        self.namespace = namespace
         self.batch_interval = batch_interval
+        # "json" (default) or "compact" (columnar binary, see wire_format.py)
+        self.encoding = encoding
 
         # Thread-safe queue for sensor data
         # Using deque with maxlen to prevent unbounded growth
         self._data_queue = deque(maxlen=1000)
+        self._urgent_queue = deque(maxlen=1000)
         self._queue_lock = threading.Lock()
+        # A full deque silently drops its oldest readings; count them
+        self._queue_stats = {"data": {"high_water": 0, "dropped": 0},
+                             "urgent": {"high_water": 0, "dropped": 0}}
+        self._wake = threading.Event()
+        self.urgent_flushes = 0
+
+        # Per-sensor deadband / heartbeat policies (optional, see reporting.py)
+        self.reporting = reporting
+        # Windowed aggregates for high-rate sensors (optional, see aggregator.py)
+        self.aggregator = aggregator
+
+        # Store-and-forward spool (optional, see spool.py)
+        self.spool = spool
+        self.drain_budget = drain_budget
+        self._lane_of = {}
+        for lane, sensor_types in (priorities or DEFAULT_PRIORITIES).items():
+            for sensor_type in sensor_types:
+                self._lane_of[sensor_type] = lane
 
         # MQTT client
         self.client = mqtt.Client(client_id=f"{device_info['pi_id']}_{device_info['device_name']}")
@@ -54,6 +109,9 @@ class MQTTPublisher:
             return True
         except Exception as e:
             print(f"[MQTT] Failed to connect: {e}")
+            # Keep retrying in the background; readings are spooled meanwhile
+            self.client.connect_async(self.broker_host, self.broker_port, keepalive=60)
+            self.client.loop_start()
             return False
 
     def disconnect(self):
@@ -61,7 +119,10 @@ class MQTTPublisher:
         self.client.loop_stop()
         self.client.disconnect()
 
-    def queue_data(self, sensor_id, sensor_type, value, simulated, unit=""):
+    def priority_of(self, sensor_type):
+        return self._lane_of.get(sensor_type, "normal")
+
+    def queue_data(self, sensor_id, sensor_type, value, simulated, unit="", priority=None):
         """
         Queue sensor data for batch publishing.
         This method is thread-safe and designed to be called from sensor callbacks.
@@ -72,7 +133,18 @@ class MQTTPublisher:
             value: The measured/simulated value
             simulated: Boolean indicating if the value is simulated
             unit: Optional unit of measurement
+            priority: "high", "normal" or "low"; defaults to the sensor type's class
         """
+        now = time.time()
+        if self.aggregator is not None:
+            mode = self.aggregator.mode(sensor_type)
+            if mode:
+                self.aggregator.add(sensor_id, sensor_type, value, simulated, unit, now)
+                if mode == "aggregate":
+                    return
+        if self.reporting is not None and not self.reporting.allow(sensor_id, value, now):
+            return
+
         data = {
             "measurement": sensor_type,
             "sensor_id": sensor_id,
@@ -81,25 +153,82 @@ class MQTTPublisher:
             "value": value,
             "simulated": simulated,
             "unit": unit,
-            "timestamp": time.time()
+            "timestamp": now
         }
 
+        urgent = (priority or self.priority_of(sensor_type)) == "high"
         # Minimal critical section - just append to queue
         with self._queue_lock:
-            self._data_queue.append(data)
-
-    def _publish_batch(self):
+            if urgent:
+                self._enqueue("urgent", self._urgent_queue, (data,))
+            else:
+                self._enqueue("data", self._data_queue, (data,))
+        if urgent:
+            self._wake.set()
+
+    def _queue_aggregates(self, now):
+        aggregates = self.aggregator.flush(now)
+        for data in aggregates:
+            data["pi_id"] = self.device_info["pi_id"]
+            data["device_name"] = self.device_info["device_name"]
+        if aggregates:
+            with self._queue_lock:
+                self._enqueue("data", self._data_queue, aggregates)
+
+    def _enqueue(self, name, queue, items):
+        # Caller holds _queue_lock
+        stats = self._queue_stats[name]
+        overflow = len(queue) + len(items) - queue.maxlen
+        if overflow > 0:
+            stats["dropped"] += overflow
+        queue.extend(items)
+        if len(queue) > stats["high_water"]:
+            stats["high_water"] = len(queue)
+
+    def get_queue_stats(self, reset_high_water=False):
         """
-        Publish all queued data in batches grouped by sensor type.
-        Called periodically by the daemon thread.
+        Depth, capacity, high-water mark and (cumulative) drops of each queue.
+        With reset_high_water the marks restart from the current depth.
         """
-        # Quickly extract all data from queue (minimal lock time)
         with self._queue_lock:
-            if not self._data_queue:
-                return
-            batch_data = list(self._data_queue)
-            self._data_queue.clear()
+            stats = {}
+            for name, queue in (("data", self._data_queue), ("urgent", self._urgent_queue)):
+                stats[name] = {"depth": len(queue), "capacity": queue.maxlen, **self._queue_stats[name]}
+                if reset_high_water:
+                    self._queue_stats[name]["high_water"] = len(queue)
+        return stats
+
+    def _take(self, urgent_only=False):
+        # Quickly extract data from the queues (minimal lock time)
+        with self._queue_lock:
+            batch_data = list(self._urgent_queue)
+            self._urgent_queue.clear()
+            if not urgent_only:
+                batch_data.extend(self._data_queue)
+                self._data_queue.clear()
+        return batch_data
+
+    def _publish_batch(self, batch_data=None):
+        """
+        Publish queued data (all of it unless batch_data is given) in batches
+        grouped by sensor type. Called by the daemon thread.
+        """
+        if batch_data is None:
+            batch_data = self._take()
+
+        if self.spool is not None and (not self._connected or self.spool.pending_records()):
+            # Keep order: new readings queue up behind the spooled ones
+            self._spool_readings(batch_data)
+            if self._connected:
+                self._drain_spool()
+            return
+
+        if batch_data:
+            failed = self._publish_grouped(batch_data)
+            if failed and self.spool is not None:
+                self._spool_readings(failed)
 
+    def _group(self, batch_data):
         # Group data by sensor type for batch publishing
         grouped_data = {}
         for data in batch_data:
@@ -107,25 +236,79 @@ class MQTTPublisher:
             if sensor_type not in grouped_data:
                 grouped_data[sensor_type] = []
             grouped_data[sensor_type].append(data)
+        return grouped_data
 
+    def _publish_grouped(self, batch_data):
+        """Publish readings per topic; returns the readings that could not be sent."""
+        failed = []
         # Publish each batch to its respective topic
-        for sensor_type, readings in grouped_data.items():
-            topic = self.topics.get(sensor_type, f"pi1/sensors/{sensor_type}")
-            payload = {
-                "pi_id": self.device_info["pi_id"],
-                "device_name": self.device_info["device_name"],
-                "batch_timestamp": time.time(),
-                "readings": readings
-            }
+        for sensor_type, readings in self._group(batch_data).items():
+            topic = self.topics.get(sensor_type, f"{self.namespace}/sensors/{sensor_type}")
 
             try:
-                result = self.client.publish(topic, json.dumps(payload), qos=1)
+                payload = self._encode_batch(readings)
+                result = self.client.publish(topic, payload, qos=1)
                 if result.rc == mqtt.MQTT_ERR_SUCCESS:
                     print(f"[MQTT] Published batch of {len(readings)} {sensor_type} readings to {topic}")
                 else:
                     print(f"[MQTT] Failed to publish to {topic}: rc={result.rc}")
+                    failed.extend(readings)
             except Exception as e:
                 print(f"[MQTT] Error publishing to {topic}: {e}")
+                failed.extend(readings)
+        return failed
+
+    def _spool_readings(self, readings):
+        if not readings:
+            return
+        self.spool.append_many([
+            (self._lane_of.get(data["measurement"], "normal"),
+             json.dumps(data, separators=(",", ":")).encode())
+            for data in readings
+        ])
+
+    def _drain_spool(self):
+        """
+        Send spooled readings lane by lane, oldest first. A chunk is only
+        committed once the broker acknowledged it, so nothing is lost if the
+        connection drops mid-drain. Stops after drain_budget seconds.
+        """
+        deadline = time.monotonic() + self.drain_budget
+        sent = 0
+        for lane in self.spool.lanes:
+            while self._connected and time.monotonic() < deadline:
+                payloads, position = self.spool.read(lane, 500)
+                if position is None:
+                    break
+                readings = [json.loads(p) for p in payloads]
+                infos = []
+                for sensor_type, group in self._group(readings).items():
+                    topic = self.topics.get(sensor_type, f"{self.namespace}/sensors/{sensor_type}")
+                    infos.append(self.client.publish(topic, self._encode_batch(group), qos=1))
+                if any(info.rc != mqtt.MQTT_ERR_SUCCESS for info in infos):
+                    return
+                for info in infos:
+                    info.wait_for_publish(timeout=5)
+                if not all(info.is_published() for info in infos):
+                    print("[MQTT] Spool drain: broker did not acknowledge, retrying later")
+                    return
+                self.spool.commit(lane, position)
+                sent += len(readings)
+        if sent:
+            print(f"[MQTT] Drained {sent} spooled readings "
+                  f"({self.spool.pending_records()} still spooled)")
+
+    def _encode_batch(self, readings):
+        """Serialize one topic's readings in the configured encoding."""
+        if self.encoding == "compact":
+            return encode_batch(self.device_info["pi_id"], self.device_info["device_name"],
+                                readings, time.time())
+        return json.dumps({
+            "pi_id": self.device_info["pi_id"],
+            "device_name": self.device_info["device_name"],
+            "batch_timestamp": time.time(),
+            "readings": readings
+        })
 
     def _daemon_loop(self):
         """
@@ -133,17 +316,35 @@ class MQTTPublisher:
         """
         print(f"[MQTT] Batch publisher daemon started (interval: {self.batch_interval}s)")
 
+        next_batch = time.monotonic() + self.batch_interval
         while not self._stop_event.is_set():
-            # Wait for the batch interval or stop event
-            if self._stop_event.wait(timeout=self.batch_interval):
-                break  # Stop event was set
-
-            if self._connected:
-                self._publish_batch()
-
-        # Final flush before stopping
-        if self._connected:
+            # Wait for the batch interval, a high-priority reading or stop
+            self._wake.wait(timeout=max(0.0, next_batch - time.monotonic()))
+            if self._stop_event.is_set():
+                break
+            can_send = self._connected or self.spool is not None
+
+            if self._wake.is_set():
+                self._wake.clear()
+                if can_send:
+                    self._publish_batch(self._take(urgent_only=True))
+                    self.urgent_flushes += 1
+
+            if time.monotonic() >= next_batch:
+                next_batch = time.monotonic() + self.batch_interval
+                if self.aggregator is not None:
+                    self._queue_aggregates(time.time())
+                if can_send:
+                    self._publish_batch()
+
+        # Final flush before stopping (spooled to disk if the broker is away),
+        # including the aggregates of the windows still open
+        if self.aggregator is not None:
+            self._queue_aggregates(float("inf"))
+        if self._connected or self.spool is not None:
             self._publish_batch()
+        if self.spool is not None:
+            self.spool.close()
 
         print("[MQTT] Batch publisher daemon stopped")
 
@@ -160,6 +361,7 @@ class MQTTPublisher:
     def stop_batch_daemon(self):
         """Stop the batch publishing daemon thread."""
         self._stop_event.set()
+        self._wake.set()
         if self._daemon_thread is not None:
             self._daemon_thread.join(timeout=self.batch_interval + 1)
             self._daemon_thread = None
@@ -184,20 +386,38 @@ def init_publisher(settings):
         'device_name': 'Unknown'
     })
 
+    spool = None
+    spool_config = mqtt_config.get('spool', {})
+    priorities = mqtt_config.get('priorities', spool_config.get('priorities'))
+    aggregator = None
+    aggregate_config = mqtt_config.get('aggregate', {})
+    if aggregate_config.get('enabled', False):
+        aggregator = WindowAggregator(window=aggregate_config.get('window', 10.0),
+                                      modes=aggregate_config.get('sensors', {}))
+    if spool_config.get('enabled', False):
+        spool = DiskSpool(spool_config.get('directory', 'spool'),
+                          max_bytes=spool_config.get('max_mb', 64) * 1024 * 1024,
+                          fsync_interval=spool_config.get('fsync_interval', 1.0))
+
     _publisher = MQTTPublisher(
         broker_host=mqtt_config.get('broker_host', 'localhost'),
         broker_port=mqtt_config.get('broker_port', 1883),
         device_info=device_info,
-        topics=mqtt_config.get('topics', {}),
-        batch_interval=mqtt_config.get('batch_interval', 5)
+        topics=mqtt_topics(settings),
+        batch_interval=mqtt_config.get('batch_interval', 5),
+        encoding=mqtt_config.get('encoding', 'json'),
+        spool=spool,
+        priorities=priorities,
+        reporting=ReportingFilter.from_settings(settings),
+        aggregator=aggregator,
+        namespace=mqtt_namespace(settings)
     )
 
-    if _publisher.connect():
-        _publisher.start_batch_daemon()
-        return _publisher
-    else:
-        print("[MQTT] Warning: Running without MQTT connection")
-        return _publisher
+    if not _publisher.connect():
+        print("[MQTT] Warning: Running without MQTT connection"
+              + (" (readings are spooled to disk)" if spool else ""))
+    _publisher.start_batch_daemon()
+    return _publisher
 
 
 def get_publisher():
@@ -205,7 +425,7 @@ def get_publisher():
     return _publisher
 
 
-def publish_sensor_data(sensor_id, sensor_type, value, simulated, unit=""):
+def publish_sensor_data(sensor_id, sensor_type, value, simulated, unit="", priority=None):
     """
     Convenience function to queue sensor data for publishing.
 
@@ -215,9 +435,10 @@ def publish_sensor_data(sensor_id, sensor_type, value, simulated, unit=""):
         value: The measured/simulated value
         simulated: Boolean indicating if the value is simulated
         unit: Optional unit of measurement
+        priority: Optional "high"/"normal"/"low" override of the sensor type's class
     """
     if _publisher is not None:
-        _publisher.queue_data(sensor_id, sensor_type, value, simulated, unit)
+        _publisher.queue_data(sensor_id, sensor_type, value, simulated, unit, priority)
 
 
 def shutdown_publisher():
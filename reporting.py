@@ -0,0 +1,98 @@
+"""
+Per-sensor reporting policy: deadband and change-only filtering at the source.
+
+The publisher asks ReportingFilter.allow() before queueing a reading. A
+sensor without a policy reports everything. With one, a reading is sent
+only if it differs from the last *reported* value by more than the deadband
+(absolute, or deadband_pct percent of the last value, whichever is larger),
+and no sooner than min_interval after the previous report. A heartbeat
+(the maximum reporting interval) re-sends the value after that many seconds
+of silence, so the server can tell a quiet sensor from a dead one.
+
+JSON object values (DHT, gyroscope) are compared field by field: any
+numeric field leaving its deadband or any other field changing reports the
+whole reading. Non-numeric values are reported on change only.
+
+Only what is published is filtered; local consumers (PeopleCounter, alarm
+logic) are called before the publisher and still see every reading.
+"""
+import json
+import threading
+
+
+class ReportingPolicy:
+    def __init__(self, deadband=0.0, deadband_pct=0.0, min_interval=0.0, heartbeat=None):
+        self.deadband = deadband
+        self.deadband_pct = deadband_pct
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self._last_value = None
+        self._last_time = None
+
+    def _changed(self, old, new):
+        if isinstance(old, dict) and isinstance(new, dict):
+            return old.keys() != new.keys() or any(self._changed(old[k], new[k]) for k in new)
+        numeric = (int, float)
+        if isinstance(old, bool) or isinstance(new, bool) \
+                or not isinstance(old, numeric) or not isinstance(new, numeric):
+            return old != new
+        band = max(self.deadband, abs(old) * self.deadband_pct / 100.0)
+        return abs(new - old) > band
+
+    def should_report(self, value, now):
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if self._last_time is None:
+            report = True
+        elif self.heartbeat and now - self._last_time >= self.heartbeat:
+            report = True
+        elif now - self._last_time < self.min_interval:
+            report = False
+        else:
+            report = self._changed(self._last_value, value)
+        if report:
+            self._last_value = value
+            self._last_time = now
+        return report
+
+
+class ReportingFilter:
+    """Reporting policies by sensor id, with reported/suppressed counters."""
+
+    def __init__(self, policies=None):
+        self.policies = dict(policies or {})
+        self.reported = {}
+        self.suppressed = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build policies from the "report" block of each sensor's settings."""
+        policies = {}
+        for sensor_id, sensor_settings in settings.items():
+            if isinstance(sensor_settings, dict) and sensor_settings.get('report'):
+                policies[sensor_id] = ReportingPolicy(**sensor_settings['report'])
+        return cls(policies)
+
+    def allow(self, sensor_id, value, now):
+        policy = self.policies.get(sensor_id)
+        if policy is None:
+            return True
+        with self._lock:
+            report = policy.should_report(value, now)
+            counter = self.reported if report else self.suppressed
+            counter[sensor_id] = counter.get(sensor_id, 0) + 1
+        return report
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "reported": sum(self.reported.values()),
+                "suppressed": sum(self.suppressed.values()),
+                "by_sensor": {sid: f"{self.reported.get(sid, 0)}/"
+                                   f"{self.reported.get(sid, 0) + self.suppressed.get(sid, 0)}"
+                              for sid in self.policies},
+            }
@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def process_stats():
+    """Return the live thread count and resident memory (kB, Linux only) of this process."""
+    rss_kb = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss_kb = int(line.split()[1])
+                    break
+    except OSError:
+        pass
+    return {"threads": threading.active_count(), "rss_kb": rss_kb}
+
+
+class _Task:
+    def __init__(self, name, fn, period, blocking):
+        self.name = name
+        self.fn = fn
+        self.period = period
+        self.blocking = blocking
+
+
+class Scheduler:
+    """
+    Runs periodic sensor reads on a single thread instead of one thread per sensor.
+
+    Tasks are kept in a heap ordered by due time. A task function may return
+    the delay until its next run; returning None reschedules it after its
+    period. Tasks marked blocking (hardware reads that wait on GPIO edges or
+    I2C) run on a small worker pool and are rescheduled when they finish.
+    With telemetry (see telemetry.py), every run's lag behind its due time
+    and its duration are recorded per task.
+    """
+
+    def __init__(self, workers=2, telemetry=None):
+        self.workers = workers
+        self.telemetry = telemetry
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = None
+        self._thread = None
+        self._stop_event = None
+
+    def every(self, period, fn, name=None, blocking=False, initial_delay=None):
+        """Schedule fn to run every `period` seconds (or as fn's return value dictates)."""
+        task = _Task(name or getattr(fn, "__name__", "task"), fn, period, blocking)
+        self._push(task, period if initial_delay is None else initial_delay)
+        return task
+
+    def _push(self, task, delay):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), task))
+            self._cond.notify()
+
+    def start(self, stop_event):
+        """Start the scheduler thread; it runs until stop_event is set."""
+        self._stop_event = stop_event
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sensor-io")
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+        print(f"[SCHED] Scheduler started ({len(self._heap)} tasks, {self.workers} workers)")
+
+    def stop(self, timeout=2):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait(timeout=1.0)
+                    continue
+                due, _, task = self._heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._heap)
+
+            if task.blocking:
+                self._pool.submit(self._run_blocking, task, due)
+            else:
+                self._push(task, self._call(task, due))
+
+    def _run_blocking(self, task, due):
+        delay = self._call(task, due)
+        if not self._stop_event.is_set():
+            self._push(task, delay)
+
+    def _call(self, task, due):
+        """Run a task and return the delay until its next run."""
+        start = time.monotonic()
+        failed = False
+        try:
+            delay = task.fn()
+        except Exception as e:
+            print(f"[SCHED] {task.name} error: {e}")
+            delay = None
+            failed = True
+        if self.telemetry is not None:
+            self.telemetry.record_loop(task.name, start - due, time.monotonic() - start, failed)
+        return task.period if delay is None else delay
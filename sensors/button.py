@@ -1,6 +1,7 @@
-import RPi.GPIO as GPIO
 import time
 
+from sensors.gpio_backend import GPIO
+
 class Button:
     """
     Button class for door sensor.
@@ -28,6 +29,39 @@ class Button:
         return False
 
 
+def make_button_step(button, callback, debounce_time=0.2):
+    """
+    Single-poll version of run_button_loop for the scheduler.
+    Returns a function that checks the button once and returns the poll delay.
+    """
+    last_callback_time = [0]
+
+    def step():
+        if button.state_changed():
+            current_time = time.time()
+            if current_time - last_callback_time[0] > debounce_time:
+                callback(button.is_pressed())
+                last_callback_time[0] = current_time
+        return 0.05
+    return step
+
+
+def watch_button(button, callback, events, bouncetime=200):
+    """
+    Edge-driven alternative to run_button_loop: registers the button with a
+    GPIOEventQueue and reports each debounced state change.
+    Returns False if edge detection is unavailable (poll instead).
+    """
+    last_pressed = [button.is_pressed()]
+
+    def on_edge():
+        pressed = button.is_pressed()
+        if pressed != last_pressed[0]:
+            last_pressed[0] = pressed
+            callback(pressed)
+    return events.watch(button.pin, on_edge, bouncetime=bouncetime)
+
+
 def run_button_loop(button, callback, stop_event, debounce_time=0.2):
     """
     Runs the button monitoring loop.
@@ -32,6 +32,13 @@ class DHTSensor:
             return None, None
 
 
+def dht_step(dht, callback):
+    """Single read of run_dht_loop (slow; run on the scheduler pool)."""
+    temp, hum = dht.read()
+    if temp is not None and hum is not None:
+        callback(round(temp, 1), round(hum, 1))
+
+
 def run_dht_loop(dht, delay, callback, stop_event):
     """
     Continuously read DHT sensor and call callback with (temperature, humidity).
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+
+class FakeGPIO:
+    """
+    In-memory stand-in for RPi.GPIO, for running real-sensor code on a dev box.
+    Input levels are driven with set_input(); edge callbacks registered with
+    add_event_detect fire from the calling thread (as RPi.GPIO fires them from
+    its own event thread), honouring bouncetime. on_output() lets a fake
+    device react to output pins, e.g. an HC-SR04 answering its trigger.
+    """
+
+    BCM = "BCM"
+    BOARD = "BOARD"
+    IN = "IN"
+    OUT = "OUT"
+    PUD_UP = "PUD_UP"
+    PUD_DOWN = "PUD_DOWN"
+    PUD_OFF = "PUD_OFF"
+    LOW = 0
+    HIGH = 1
+    RISING = "RISING"
+    FALLING = "FALLING"
+    BOTH = "BOTH"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._levels = {}
+        self._detect = {}  # pin -> [edge, callback, bouncetime_s, last_fired]
+        self._output_hooks = {}
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        with self._lock:
+            if direction == self.OUT:
+                self._levels[pin] = self.LOW if initial is None else initial
+            else:
+                self._levels.setdefault(pin, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+
+    def input(self, pin):
+        return self._levels.get(pin, self.LOW)
+
+    def output(self, pin, value):
+        self._levels[pin] = value
+        hook = self._output_hooks.get(pin)
+        if hook:
+            hook(pin, value)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self._detect:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self._detect[pin] = [edge, callback, (bouncetime or 0) / 1000.0, 0.0]
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._detect.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        with self._lock:
+            if pin is None:
+                self._levels.clear()
+                self._detect.clear()
+            else:
+                self._levels.pop(pin, None)
+                self._detect.pop(pin, None)
+
+    def on_output(self, pin, hook):
+        """Call hook(pin, value) whenever pin is written (test/benchmark hook)."""
+        self._output_hooks[pin] = hook
+
+    def set_input(self, pin, level):
+        """Drive an input pin (test/benchmark hook) and fire matching edge callbacks."""
+        with self._lock:
+            previous = self._levels.get(pin, self.LOW)
+            self._levels[pin] = level
+            detect = self._detect.get(pin)
+            if detect is None or previous == level:
+                return
+            edge, callback, bouncetime, last_fired = detect
+            rising = level == self.HIGH
+            if edge != self.BOTH and (edge == self.RISING) != rising:
+                return
+            now = time.monotonic()
+            if now - last_fired < bouncetime:
+                return
+            detect[3] = now
+        if callback:
+            callback(pin)
+
+
+# GPIO_BACKEND=fake forces the fake backend even on a Pi
+if os.environ.get("GPIO_BACKEND") == "fake":
+    GPIO = FakeGPIO()
+    USING_FAKE_GPIO = True
+else:
+    try:
+        import RPi.GPIO as GPIO
+        USING_FAKE_GPIO = False
+    except ImportError:
+        print("[GPIO] RPi.GPIO not available, using fake GPIO backend")
+        GPIO = FakeGPIO()
+        USING_FAKE_GPIO = True
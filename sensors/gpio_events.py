@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+
+from sensors.gpio_backend import GPIO
+from timer_wheel import get_timer_wheel
+
+
+class GPIOEventQueue:
+    """
+    Interrupt-driven GPIO input: edges detected with GPIO.add_event_detect are
+    pushed into one shared queue and handled on a single dispatcher thread, so
+    sensor callbacks never run on RPi.GPIO's event thread and no sensor has to
+    poll. watch() returns False when edge detection is unavailable for a pin,
+    in which case the caller should fall back to polling.
+
+    RPi.GPIO drops every edge inside the bounce window, including the release
+    of a press shorter than bouncetime. So once the window after an edge
+    ends, the handler runs once more (a settle check on the timer wheel) to
+    pick up the pin's final level; handlers must be idempotent.
+    """
+
+    def __init__(self, max_queue_size=1000, timers=None):
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._timers = timers
+        self._handlers = {}
+        self._settle_delays = {}
+        self._settles = {}
+        self._thread = None
+        self._stop_event = None
+        self.events = 0
+        self.dropped = 0
+        self.max_latency_ms = 0.0
+
+    def watch(self, pin, handler, edge=None, bouncetime=200):
+        """Call handler() on the dispatcher thread for every debounced edge on pin."""
+        try:
+            GPIO.add_event_detect(pin, GPIO.BOTH if edge is None else edge,
+                                  callback=self._on_edge, bouncetime=bouncetime)
+        except (RuntimeError, ValueError) as e:
+            print(f"[GPIO] Edge detection unavailable on pin {pin} ({e}), polling instead")
+            return False
+        self._handlers[pin] = handler
+        if bouncetime:
+            self._settle_delays[pin] = bouncetime / 1000 + 0.01
+        return True
+
+    def unwatch(self, pin):
+        self._handlers.pop(pin, None)
+        self._settle_delays.pop(pin, None)
+        settle = self._settles.pop(pin, None)
+        if settle is not None:
+            settle.cancel()
+        GPIO.remove_event_detect(pin)
+
+    def recheck(self, pin, delay):
+        """Run pin's handler again (on the dispatcher thread) after delay seconds."""
+        if self._timers is None:
+            self._timers = get_timer_wheel()
+        return self._timers.schedule(delay, self._enqueue, pin, True)
+
+    def start(self, stop_event):
+        self._stop_event = stop_event
+        self._thread = threading.Thread(target=self._run, name="gpio-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        for pin in list(self._handlers):
+            self.unwatch(pin)
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _on_edge(self, channel):
+        # Runs on RPi.GPIO's event thread: just hand the edge over
+        self._enqueue(channel, False)
+
+    def _enqueue(self, channel, recheck):
+        try:
+            self._queue.put_nowait((channel, time.perf_counter(), recheck))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                channel, detected_at, recheck = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            handler = self._handlers.get(channel)
+            if handler is None:
+                continue
+            delay = self._settle_delays.get(channel)
+            if delay is not None and not recheck:
+                # Each edge restarts the bounce window; settle after the last one
+                settle = self._settles.get(channel)
+                if settle is not None:
+                    settle.cancel()
+                self._settles[channel] = self.recheck(channel, delay)
+            try:
+                handler()
+            except Exception as e:
+                print(f"[GPIO] Handler error on pin {channel}: {e}")
+            self.events += 1
+            latency_ms = (time.perf_counter() - detected_at) * 1000
+            if latency_ms > self.max_latency_ms:
+                self.max_latency_ms = latency_ms
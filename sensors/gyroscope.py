@@ -51,6 +51,12 @@ class Gyroscope:
         return deviation > threshold, x, y, z
 
 
+def gyroscope_step(gyro, callback):
+    """Single read of run_gyroscope_loop (I2C; run on the scheduler pool)."""
+    significant, x, y, z = gyro.is_significant_movement()
+    callback(x, y, z, significant)
+
+
 def run_gyroscope_loop(gyro, delay, callback, stop_event):
     """
     Continuously read gyroscope and call callback with (x, y, z, significant).
@@ -58,6 +58,13 @@ class MembraneSwitch:
         return None
 
 
+def membrane_switch_step(membrane, callback):
+    """Single scan of run_membrane_switch_loop (blocks while a key is held)."""
+    key = membrane.scan_key()
+    if key is not None:
+        callback(key)
+
+
 def run_membrane_switch_loop(membrane, callback, stop_event, scan_delay=0.1):
     """
     Runs the membrane switch scanning loop.
@@ -1,6 +1,7 @@
-import RPi.GPIO as GPIO
 import time
 
+from sensors.gpio_backend import GPIO
+
 class PIRSensor:
     """
     PIR (Passive Infrared) Motion Sensor class.
@@ -20,10 +21,45 @@ class PIRSensor:
         return GPIO.input(self.pin)
 
 
+def make_pir_step(pir, callback):
+    """Single-poll version of run_pir_loop for the scheduler."""
+    last_motion = [False]
+
+    def step():
+        current_motion = pir.motion_detected()
+        if current_motion != last_motion[0] or current_motion:
+            callback(current_motion)
+            last_motion[0] = current_motion
+    return step
+
+
+def watch_pir(pir, callback, events, bouncetime=50, repeat=0.5):
+    """
+    Edge-driven alternative to run_pir_loop: reports motion start/stop as soon
+    as the output changes, and motion again every repeat seconds while it
+    lasts (as the polling loop does). Returns False if edge detection is
+    unavailable.
+    """
+    last_motion = [pir.motion_detected()]
+    rearm = [None]
+
+    def on_edge():
+        current_motion = pir.motion_detected()
+        if current_motion != last_motion[0] or current_motion:
+            last_motion[0] = current_motion
+            callback(current_motion)
+        if rearm[0] is not None:
+            rearm[0].cancel()
+            rearm[0] = None
+        if current_motion:
+            rearm[0] = events.recheck(pir.pin, repeat)
+    return events.watch(pir.pin, on_edge, bouncetime=bouncetime)
+
+
 def run_pir_loop(pir, delay, callback, stop_event):
     """
     Runs the PIR sensor monitoring loop.
-    Reports only when motion state changes to avoid spam.
+    Reports state changes, and motion on every poll while it lasts.
     """
     last_motion = False
     
@@ -1,57 +1,162 @@
-import RPi.GPIO as GPIO
+import statistics
+import threading
 import time
 
+from sensors.gpio_backend import GPIO
+
+# Speed of sound = 34300 cm/s, divide by 2 for round trip
+CM_PER_NS = 17150 / 1e9
+ECHO_TIMEOUT = 0.05  # longest HC-SR04 echo (no obstacle) is ~38 ms
+
+
 class UltrasonicSensor:
     """
     HC-SR04 Ultrasonic Distance Sensor class.
+    In edge mode the echo pulse is timed from GPIO edge callbacks with
+    perf_counter_ns and the reading thread sleeps until the falling edge;
+    poll mode (or a pin without edge detection) spins on GPIO.input.
     """
-    def __init__(self, trig_pin, echo_pin):
+    def __init__(self, trig_pin, echo_pin, mode="edge"):
         self.trig_pin = trig_pin
         self.echo_pin = echo_pin
-        
+        self._rise_ns = None
+        self._pulse_ns = None
+        self._echo_done = threading.Event()
+
         GPIO.setup(self.trig_pin, GPIO.OUT)
         GPIO.setup(self.echo_pin, GPIO.IN)
         GPIO.output(self.trig_pin, GPIO.LOW)
+
+        self.mode = mode
+        if mode == "edge":
+            try:
+                GPIO.add_event_detect(self.echo_pin, GPIO.BOTH, callback=self._on_echo_edge)
+            except (RuntimeError, ValueError) as e:
+                print(f"[US] Edge detection unavailable on pin {echo_pin} ({e}), polling instead")
+                self.mode = "poll"
         time.sleep(0.1)  # Let sensor settle
-    
-    def get_distance(self):
-        """
-        Measure distance in centimeters.
-        Returns -1 if measurement fails.
-        """
-        # Send trigger pulse
+
+    def _trigger(self):
         GPIO.output(self.trig_pin, GPIO.HIGH)
         time.sleep(0.00001)  # 10 microseconds
         GPIO.output(self.trig_pin, GPIO.LOW)
-        
+
+    def _on_echo_edge(self, channel):
+        now = time.perf_counter_ns()
+        # Read the level rather than counting edges: a falling edge with no
+        # rising edge since the trigger is the tail of an earlier, timed-out
+        # ping and must not be taken as this echo's start.
+        if GPIO.input(self.echo_pin) == GPIO.HIGH:
+            self._rise_ns = now
+        elif self._rise_ns is not None and self._pulse_ns is None:
+            self._pulse_ns = now - self._rise_ns
+            self._echo_done.set()
+
+    def _pulse_ns_edge(self):
+        self._rise_ns = None
+        self._pulse_ns = None
+        self._echo_done.clear()
+        self._trigger()
+        if not self._echo_done.wait(ECHO_TIMEOUT):
+            return None
+        return self._pulse_ns
+
+    def _pulse_ns_poll(self):
+        self._trigger()
+
         # Wait for echo start
-        timeout = time.time() + 0.1
-        pulse_start = time.time()
+        timeout = time.perf_counter_ns() + int(ECHO_TIMEOUT * 1e9)
+        pulse_start = time.perf_counter_ns()
         while GPIO.input(self.echo_pin) == GPIO.LOW:
-            pulse_start = time.time()
+            pulse_start = time.perf_counter_ns()
             if pulse_start > timeout:
-                return -1
-        
+                return None
+
         # Wait for echo end
-        timeout = time.time() + 0.1
-        pulse_end = time.time()
+        timeout = pulse_start + int(ECHO_TIMEOUT * 1e9)
+        pulse_end = time.perf_counter_ns()
         while GPIO.input(self.echo_pin) == GPIO.HIGH:
-            pulse_end = time.time()
+            pulse_end = time.perf_counter_ns()
             if pulse_end > timeout:
-                return -1
-        
-        # Calculate distance
-        pulse_duration = pulse_end - pulse_start
-        # Speed of sound = 34300 cm/s, divide by 2 for round trip
-        distance = pulse_duration * 17150
-        
+                return None
+        return pulse_end - pulse_start
+
+    def get_distance(self):
+        """
+        Measure distance in centimeters (single ping).
+        Returns -1 if measurement fails.
+        """
+        if self.mode == "edge":
+            pulse_ns = self._pulse_ns_edge()
+        else:
+            pulse_ns = self._pulse_ns_poll()
+        if pulse_ns is None:
+            return -1
+
+        distance = pulse_ns * CM_PER_NS
+
         # Sensor range is typically 2-400 cm
         if distance < 2 or distance > 400:
             return -1
-        
+
         return round(distance, 2)
 
 
+def robust_median(samples, max_deviation=3.0, min_count=1):
+    """
+    Median of samples after rejecting outliers further than max_deviation
+    scaled MADs (at least 1 cm) from the raw median.
+    Returns None if fewer than min_count samples survive.
+    """
+    if len(samples) < min_count or not samples:
+        return None
+    median = statistics.median(samples)
+    mad = statistics.median(abs(s - median) for s in samples) * 1.4826
+    limit = max(max_deviation * mad, 1.0)
+    kept = [s for s in samples if abs(s - median) <= limit]
+    if len(kept) < min_count:
+        return None
+    return round(statistics.median(kept), 2)
+
+
+def ultrasonic_step(ultrasonic, callback):
+    """Single measurement of run_ultrasonic_loop (blocking; run on the scheduler pool)."""
+    distance = ultrasonic.get_distance()
+    if distance != -1:
+        callback(distance)
+
+
+def ultrasonic_group_step(entries, samples=5, spacing=0.03, budget=0.4):
+    """
+    One shared measurement cycle for several (sensor, callback) pairs
+    (blocking; run on the scheduler pool). Pings are interleaved across
+    sensors `spacing` seconds apart so no sensor hears another's echo, and
+    each sensor reports the outlier-filtered median of its `samples` pings.
+    Fewer rounds are taken if another one would overrun `budget` seconds,
+    which happens when echoes time out.
+    """
+    readings = [[] for _ in entries]
+    started = time.monotonic()
+    slowest = 0.0
+    rounds = 0
+    while rounds < samples:
+        round_start = time.monotonic()
+        if rounds and round_start - started + slowest > budget:
+            break
+        for values, (sensor, _) in zip(readings, entries):
+            distance = sensor.get_distance()
+            if distance != -1:
+                values.append(distance)
+            time.sleep(spacing)
+        slowest = max(slowest, time.monotonic() - round_start)
+        rounds += 1
+
+    for values, (_, callback) in zip(readings, entries):
+        distance = robust_median(values, min_count=(rounds + 1) // 2)
+        if distance is not None:
+            callback(distance)
+
+
 def run_ultrasonic_loop(ultrasonic, delay, callback, stop_event):
     """
     Runs the ultrasonic sensor monitoring loop.
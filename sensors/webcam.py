@@ -7,21 +7,28 @@ try:
 except ImportError:
     HAS_CV2 = False
 
+from motion_gate import MotionGate, thumbnail
+
 
 class Webcam:
     """
     Real webcam capture using OpenCV.
-    Captures frames from USB webcam at specified FPS.
+    Captures frames from USB webcam at specified FPS while the scene changes
+    and at idle_fps otherwise; unchanged frames are not JPEG-encoded.
     """
 
-    def __init__(self, device_index=0, width=640, height=480, fps=10):
+    def __init__(self, device_index=0, width=640, height=480, fps=10, idle_fps=2,
+                 motion_threshold=1.5):
         self.device_index = device_index
         self.width = width
         self.height = height
         self.fps = fps
+        self.quality = 70  # JPEG quality; lowered by the uplink when bandwidth is short
+        self.motion = MotionGate(threshold=motion_threshold, idle_fps=idle_fps, active_fps=fps)
         self.running = False
         self._frame = None
         self._frame_lock = threading.Lock()
+        self._listeners = []
         self._thread = None
         self._stop_event = threading.Event()
         self._cap = None
@@ -41,6 +48,8 @@ class Webcam:
         self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         self._cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Read the newest frame, not one buffered while capturing at idle_fps
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
         self.running = True
         self._stop_event.clear()
@@ -57,18 +66,30 @@ class Webcam:
             self._cap.release()
         print("[WEBC] Webcam stopped")
 
+    def add_listener(self, fn):
+        """Call fn(frame, timestamp) from the capture thread for every new frame."""
+        self._listeners.append(fn)
+
+    def _notify(self, frame):
+        now = time.time()
+        for fn in self._listeners:
+            fn(frame, now)
+
     def get_frame(self):
         """Get the latest JPEG-encoded frame bytes."""
         with self._frame_lock:
             return self._frame
 
     def _capture_loop(self):
-        """Continuously capture frames from the webcam."""
+        """Continuously capture frames, encoding only those that changed."""
         while not self._stop_event.is_set():
+            started = time.monotonic()
             ret, frame = self._cap.read()
-            if ret:
+            if ret and self.motion.check(thumbnail(frame), started):
                 # Encode as JPEG
-                _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+                frame = jpeg.tobytes()
                 with self._frame_lock:
-                    self._frame = jpeg.tobytes()
-            time.sleep(1.0 / self.fps)
+                    self._frame = frame
+                self._notify(frame)
+            self._stop_event.wait(max(0.0, 1.0 / self.motion.fps - (time.monotonic() - started)))
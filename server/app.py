@@ -2,10 +2,10 @@ import json
 import asyncio
 import threading
 import time
-import struct
-from datetime import datetime
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from functools import lru_cache
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -16,38 +16,37 @@ from influxdb_client.client.write_api import SYNCHRONOUS
 from config import (
     MQTT_BROKER, MQTT_PORT,
     INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET,
+    INFLUXDB_BATCH_SIZE, INFLUXDB_FLUSH_INTERVAL, INFLUXDB_QUEUE_SIZE, INFLUXDB_MAX_RETRIES,
+    WS_FRAME_INTERVAL, WS_CLIENT_QUEUE_SIZE,
+    WEBCAM_STREAM_FPS, WEBCAM_FRAME_TOPIC, WEBCAM_FRAME_MAX_AGE,
+    WEBCAM_CLIP_TOPIC, CLIP_DIR, CLIP_QUOTA_MB, CLIP_QUEUE_SIZE,
+    DEFAULT_PI_ID, ALARM_EVENT_INDEX_SIZE, ALARM_EVENT_BACKFILL_HOURS,
+    COMMAND_QUEUE_SIZE, COMMAND_ACK_TIMEOUT, COMMAND_ACK_TTL, BLOCKING_IO_WORKERS,
 )
+from influx_writer import InfluxBatchWriter
+from ws_manager import ConnectionManager
+from state_versions import StateVersions
+from wire_format import is_compact, decode_batch
+from webcam_frames import SimulatedFrameCache, unpack_frame
+from mjpeg_broadcaster import MJPEGBroadcaster
+from clip_store import ClipStore, ClipWriter, CLIP_BOUNDARY, replay
+from device_registry import DeviceRegistry
+from event_index import EventIndex, next_cursor, parse_cursor
+from command_bus import CommandBus, CommandQueueFull
+from metrics import REGISTRY, CONTENT_TYPE
 
 
 # ==================== WebSocket Manager ====================
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, data: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
-
-
-manager = ConnectionManager()
+manager = ConnectionManager(frame_interval=WS_FRAME_INTERVAL,
+                            client_queue_size=WS_CLIENT_QUEUE_SIZE)
+REGISTRY.gauge("iot_ws_clients", "Connected WebSocket clients", fn=lambda: len(manager.active_connections))
+state_versions = StateVersions()
 event_loop = None
 
 # ==================== In-memory State ====================
-sensor_states = {
+# Known sensors of a door controller; sensors of other models are registered
+# as their first readings arrive
+DEFAULT_SENSORS = {
     "DS1": {"value": 0, "name": "Door Sensor 1", "type": "button", "timestamp": None},
     "DS2": {"value": 0, "name": "Door Sensor 2", "type": "button", "timestamp": None},
     "DL": {"value": 0, "name": "Door Light", "type": "led", "timestamp": None},
@@ -72,36 +71,70 @@ sensor_states = {
     "IR": {"value": {"button": "", "action": ""}, "name": "Bedroom IR Receiver", "type": "ir_receiver", "timestamp": None},
     "BRGB": {"value": {"on": False, "r": 255, "g": 255, "b": 255, "brightness": 100}, "name": "Bedroom RGB LED", "type": "rgb_led", "timestamp": None},
     "WEBC": {"value": {"active": False}, "name": "Door Web Camera", "type": "webcam", "timestamp": None},
+    "WEBC_MOTION": {"value": 0, "name": "Door Camera Motion", "type": "motion_score", "timestamp": None},
 }
 
-alarm_state = {"state": "DISARMED", "reason": "", "timestamp": None}
-people_state = {"count": 0, "last_direction": None, "timestamp": None}
-timer_state = {"remaining": 0, "display": "00:00", "running": False, "blinking": False, "btn_seconds": 10, "timestamp": None}
-brgb_state = {"on": False, "r": 255, "g": 255, "b": 255, "brightness": 100, "timestamp": None}
+# State of every controller by pi_id. The default device backs the original
+# /api/... routes and the dashboard WebSocket; /api/devices/{pi_id}/... serve any.
+registry = DeviceRegistry()
+default_device = registry.get_or_create(DEFAULT_PI_ID, sensors=DEFAULT_SENSORS)
+sensor_states = default_device.sensors
+alarm_state = default_device.alarm
+people_state = default_device.people
+timer_state = default_device.timer
+brgb_state = default_device.brgb
+
+# State objects pushed to WebSocket clients as deltas, by key
+STATE_OBJECTS = default_device.state_objects()
+
+# Recent alarm events of all devices; complete from server start, and from
+# ALARM_EVENT_BACKFILL_HOURS earlier once backfilled from InfluxDB
+alarm_events = EventIndex(ALARM_EVENT_INDEX_SIZE, covered_from=time.time())
+for _key, _state in STATE_OBJECTS.items():
+    state_versions.update(_key, _state)
 
 # Webcam frame storage (updated via MQTT or direct access)
-webcam_frame = {"data": None, "timestamp": None, "simulated": True}
+webcam_frame = {"data": None, "content_type": "image/jpeg", "timestamp": None,
+                "received": 0.0, "latency_ms": None, "seq": None, "simulated": True}
 
 # ==================== InfluxDB ====================
 influx_client = None
 write_api = None
 query_api = None
+influx_writer = None
 
 
 def init_influxdb():
-    global influx_client, write_api, query_api
+    global influx_client, write_api, query_api, influx_writer
     try:
         influx_client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
         write_api = influx_client.write_api(write_options=SYNCHRONOUS)
         query_api = influx_client.query_api()
+        # Points are written in batches from a background thread so the
+        # MQTT network thread never waits on an InfluxDB round trip
+        influx_writer = InfluxBatchWriter(
+            write_api, INFLUXDB_BUCKET, INFLUXDB_ORG,
+            batch_size=INFLUXDB_BATCH_SIZE,
+            flush_interval=INFLUXDB_FLUSH_INTERVAL,
+            max_queue_size=INFLUXDB_QUEUE_SIZE,
+            max_retries=INFLUXDB_MAX_RETRIES,
+        )
+        influx_writer.start()
         print(f"[InfluxDB] Connected to {INFLUXDB_URL}")
     except Exception as e:
         print(f"[InfluxDB] Failed to connect: {e}")
 
 
+INFLUX_WRITE_SECONDS = REGISTRY.histogram(
+    "iot_influx_point_seconds", "Time to build a point and queue it for the batch writer")
+REGISTRY.gauge("iot_influx_queue_depth", "Points waiting for the InfluxDB batch writer",
+               fn=lambda: influx_writer.get_stats()["queue_depth"] if influx_writer else 0)
+
+
 def write_to_influxdb(measurement, tags, fields, timestamp=None):
-    if write_api is None:
+    if influx_writer is None:
         return
+    start = time.perf_counter()
     try:
         point = Point(measurement)
         for k, v in tags.items():
@@ -110,20 +143,30 @@ def write_to_influxdb(measurement, tags, fields, timestamp=None):
             point = point.field(k, v)
         if timestamp:
             point = point.time(datetime.fromtimestamp(timestamp))
-        write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=point)
+        influx_writer.write(point)
     except Exception as e:
         print(f"[InfluxDB] Write error: {e}")
+    INFLUX_WRITE_SECONDS.observe(time.perf_counter() - start)
 
 
 # ==================== MQTT ====================
 mqtt_client = mqtt.Client(client_id="pi1_fastapi_server")
+# Commands and other blocking calls from route handlers go through here
+command_bus = CommandBus(mqtt_client, queue_size=COMMAND_QUEUE_SIZE,
+                         workers=BLOCKING_IO_WORKERS, ack_timeout=COMMAND_ACK_TIMEOUT,
+                         ack_ttl=COMMAND_ACK_TTL)
 
+# Every device publishes under its own namespace: <namespace>/sensors/..., ...
 MQTT_TOPICS = [
-    ("pi1/sensors/#", 0),
-    ("pi1/actuators/#", 0),
-    ("pi1/alarm/#", 0),
-    ("pi1/people/#", 0),
-    ("pi1/timer/#", 0),
+    ("+/sensors/#", 0),
+    ("+/actuators/#", 0),
+    ("+/alarm/#", 0),
+    ("+/people/#", 0),
+    ("+/timer/#", 0),
+    ("+/acks/#", 1),
+    ("+/telemetry/#", 0),
+    (WEBCAM_FRAME_TOPIC, 0),
+    (WEBCAM_CLIP_TOPIC, 1),
 ]
 
 
@@ -131,20 +174,218 @@ def on_connect(client, userdata, flags, rc):
     if rc == 0:
         print(f"[MQTT] Connected to {MQTT_BROKER}:{MQTT_PORT}")
         client.subscribe(MQTT_TOPICS)
+        publish_webcam_viewers(webcam_broadcaster.get_stats()["subscribers"])
     else:
         print(f"[MQTT] Connection failed: rc={rc}")
 
 
+# ==================== Message Handlers ====================
+ALARM_STATE_MAP = {0: "DISARMED", 1: "ALARM", 2: "ARMED", 3: "ARMING"}
+ALARM_EVENT_STATES = {
+    "armed": "ARMED",
+    "arming": "ARMING",
+    "alarm_activated": "ALARM",
+    "alarm_deactivated": "DISARMED",
+}
+
+
+def _handle_alarm_state(device, sensor_id, value, timestamp):
+    # Numeric: 0=disarmed, 1=alarm, 2=armed, 3=arming
+    if isinstance(value, (int, float)):
+        device.alarm["state"] = ALARM_STATE_MAP.get(int(value), "DISARMED")
+    device.alarm["timestamp"] = timestamp
+
+
+def _handle_alarm_event(device, sensor_id, value, timestamp):
+    event_val = str(value)
+    alarm_events.add(device.pi_id, event_val, timestamp or time.time())
+    if event_val in ALARM_EVENT_STATES:
+        device.alarm["state"] = ALARM_EVENT_STATES[event_val]
+    if event_val == "alarm_deactivated":
+        device.alarm["reason"] = ""
+    device.alarm["timestamp"] = timestamp
+
+
+def _handle_alarm_reason(device, sensor_id, value, timestamp):
+    device.alarm["reason"] = str(value)
+    device.alarm["timestamp"] = timestamp
+
+
+def _handle_people_count(device, sensor_id, value, timestamp):
+    device.people["count"] = int(value) if isinstance(value, (int, float)) else 0
+    device.people["timestamp"] = timestamp
+
+
+def _handle_people_event(device, sensor_id, value, timestamp):
+    device.people["last_direction"] = str(value)
+    device.people["timestamp"] = timestamp
+
+
+def _handle_timer_state(device, sensor_id, value, timestamp):
+    device.timer["remaining"] = value.get("remaining", 0)
+    device.timer["display"] = value.get("display", "00:00")
+    device.timer["running"] = value.get("running", False)
+    device.timer["blinking"] = value.get("blinking", False)
+    device.timer["timestamp"] = timestamp
+
+
+def _handle_brgb(device, sensor_id, value, timestamp):
+    device.brgb["on"] = value.get("on", False)
+    device.brgb["r"] = value.get("r", 255)
+    device.brgb["g"] = value.get("g", 255)
+    device.brgb["b"] = value.get("b", 255)
+    device.brgb["brightness"] = value.get("brightness", 100)
+    device.brgb["timestamp"] = timestamp
+
+
+def _handle_webcam(device, sensor_id, value, timestamp):
+    if device is default_device:
+        webcam_frame["simulated"] = value.get("simulated", True)
+
+
+# (topic group, measurement type, sensor id) -> (handler, decode JSON string values).
+# The topic group is the second topic level (pi1/<group>/<measurement>); a None
+# group or sensor id matches anything. Readings on sensors/actuators topics
+# always update the device's sensor state, so state-only sensors need no handler.
+MESSAGE_HANDLERS = {
+    ("alarm", "state", None): (_handle_alarm_state, False),
+    ("alarm", "event", None): (_handle_alarm_event, False),
+    ("alarm", "reason", None): (_handle_alarm_reason, False),
+    ("people", "count", None): (_handle_people_count, False),
+    ("people", "event", None): (_handle_people_event, False),
+    ("timer", "state", None): (_handle_timer_state, True),
+    (None, "gyroscope", None): (None, True),
+    (None, "dht", None): (None, True),
+    (None, "lcd", None): (None, True),
+    (None, "segment_display", None): (None, True),
+    (None, "ir_receiver", None): (None, True),
+    (None, "rgb_led", None): (_handle_brgb, True),
+    (None, "webcam", None): (_handle_webcam, True),
+}
+
+_NO_HANDLER = (None, False)
+
+
+@lru_cache(maxsize=256)
+def resolve_topic(topic):
+    """
+    Resolve a topic once into (namespace, group, measurement_type, handlers_by_sensor,
+    default_handler) so each reading costs a single dict lookup instead of a
+    chain of topic checks.
+    """
+    topic_parts = topic.split("/")
+    measurement_type = topic_parts[-1] if len(topic_parts) > 2 else "unknown"
+    group = topic_parts[1] if len(topic_parts) > 2 else ""
+
+    by_sensor = {}
+    default = _NO_HANDLER
+    for (h_group, h_measurement, h_sensor), entry in MESSAGE_HANDLERS.items():
+        if h_measurement != measurement_type or h_group not in (None, group):
+            continue
+        if h_sensor is None:
+            default = entry
+        else:
+            by_sensor[h_sensor] = entry
+    return topic_parts[0], group, measurement_type, by_sensor, default
+
+
+# Topic groups whose readings are per-sensor state (the others feed the
+# alarm/people/timer state objects)
+SENSOR_GROUPS = {"sensors", "actuators"}
+
+
+def device_for(namespace, payload):
+    """The registry entry of the device that sent a batch (pi_id, else topic namespace)."""
+    pi_id = payload.get("pi_id")
+    if pi_id is None:
+        device = registry.by_namespace(namespace)
+        if device is not None:
+            return device
+        pi_id = namespace.upper()
+    return registry.get_or_create(pi_id, namespace=namespace)
+
+
+# Topic labels drop the device namespace (pi1/sensors/dht -> sensors/dht)
+MQTT_MESSAGES = REGISTRY.counter("iot_mqtt_messages_total", "MQTT messages received, by topic", ("topic",))
+MQTT_READINGS = REGISTRY.counter("iot_mqtt_readings_total", "Readings received in MQTT batches")
+MQTT_ERRORS = REGISTRY.counter("iot_mqtt_errors_total", "MQTT messages that failed to decode or process")
+MQTT_DECODE_SECONDS = REGISTRY.histogram(
+    "iot_mqtt_decode_seconds", "Payload decode time, by topic", ("topic",))
+MQTT_MESSAGE_SECONDS = REGISTRY.histogram(
+    "iot_mqtt_message_seconds", "Total on_message time (decode, state, InfluxDB, broadcast), by topic", ("topic",))
+WEBCAM_FRAME_LATENCY = REGISTRY.histogram(
+    "iot_webcam_frame_latency_seconds", "Device capture to server receipt of webcam frames")
+
+
+@lru_cache(maxsize=256)
+def topic_metrics(topic):
+    label = topic.split("/", 1)[-1]
+    return MQTT_MESSAGES.labels(label), MQTT_DECODE_SECONDS.labels(label), MQTT_MESSAGE_SECONDS.labels(label)
+
+
+def on_webcam_frame(payload):
+    unpacked = unpack_frame(payload)
+    if unpacked is None:
+        return
+    frame, content_type, captured_at, seq = unpacked
+    now = time.time()
+    webcam_frame["data"] = frame
+    webcam_frame["content_type"] = content_type
+    webcam_frame["timestamp"] = captured_at
+    webcam_frame["received"] = now
+    webcam_frame["latency_ms"] = round((now - captured_at) * 1000, 1)
+    WEBCAM_FRAME_LATENCY.observe(max(0.0, now - captured_at))
+    webcam_frame["seq"] = seq
+    if event_loop:
+        event_loop.call_soon_threadsafe(webcam_broadcaster.wake)
+
+
 def on_message(client, userdata, msg):
+    start = time.perf_counter()
+    messages, decode_seconds, message_seconds = topic_metrics(msg.topic)
+    messages.inc()
+    try:
+        handle_message(msg, start, decode_seconds)
+    finally:
+        message_seconds.observe(time.perf_counter() - start)
+
+
+def handle_message(msg, start, decode_seconds):
+    if msg.topic == WEBCAM_FRAME_TOPIC:
+        on_webcam_frame(msg.payload)
+        return
+    if msg.topic == WEBCAM_CLIP_TOPIC:
+        # Written to disk by the clip writer thread, off the MQTT network thread
+        if not clip_writer.submit(msg.payload):
+            print("[Clips] Writer queue full, dropping clip chunk")
+        return
     try:
-        payload = json.loads(msg.payload.decode('utf-8'))
+        if is_compact(msg.payload):
+            payload = decode_batch(msg.payload)
+        else:
+            payload = json.loads(msg.payload.decode('utf-8'))
+        decode_seconds.observe(time.perf_counter() - start)
         topic = msg.topic
-        topic_parts = topic.split("/")
-        measurement_type = topic_parts[-1] if len(topic_parts) > 2 else "unknown"
+        namespace, group, measurement_type, by_sensor, default_handler = resolve_topic(topic)
+        if group == "acks":
+            command_bus.on_ack(payload)
+            return
+        # Windowed aggregates (min/max/mean/count/last per window) and device
+        # self-telemetry carry numeric field dicts and no sensor state
+        aggregate = measurement_type.endswith("_agg") or group == "telemetry"
+        sensor_reading = group in SENSOR_GROUPS and not aggregate
 
         readings = payload.get("readings", [])
-        pi_id = payload.get("pi_id", "PI1")
+        MQTT_READINGS.inc(len(readings))
+        device = device_for(namespace, payload)
+        pi_id = device.pi_id
         device_name = payload.get("device_name", "unknown")
+        device.seen(device_name, len(readings))
+        dashboard = device is default_device
+        # Plain topics (ultrasonic, PIR, ...) have no handler or JSON values to decode
+        plain = default_handler is _NO_HANDLER and not by_sensor
+        touched = []
+        handled = False
 
         for reading in readings:
             sensor_id = reading.get("sensor_id", "unknown")
@@ -153,126 +394,31 @@ def on_message(client, userdata, msg):
             unit = reading.get("unit", "")
             timestamp = reading.get("timestamp")
 
-            # Update in-memory state
-            if sensor_id in sensor_states:
-                sensor_states[sensor_id]["value"] = value
-                sensor_states[sensor_id]["timestamp"] = timestamp
-
-            # Handle alarm state (numeric: 0=disarmed, 1=alarm, 2=armed, 3=arming)
-            if measurement_type == "state" and "alarm" in topic:
-                state_map = {0: "DISARMED", 1: "ALARM", 2: "ARMED", 3: "ARMING"}
-                if isinstance(value, (int, float)):
-                    alarm_state["state"] = state_map.get(int(value), "DISARMED")
-                alarm_state["timestamp"] = timestamp
-
-            # Handle alarm events
-            if measurement_type == "event" and "alarm" in topic:
-                event_val = str(value)
-                if event_val == "armed":
-                    alarm_state["state"] = "ARMED"
-                elif event_val == "arming":
-                    alarm_state["state"] = "ARMING"
-                elif event_val == "alarm_activated":
-                    alarm_state["state"] = "ALARM"
-                elif event_val == "alarm_deactivated":
-                    alarm_state["state"] = "DISARMED"
-                    alarm_state["reason"] = ""
-                alarm_state["timestamp"] = timestamp
-
-            # Handle alarm reason
-            if measurement_type == "reason" and "alarm" in topic:
-                alarm_state["reason"] = str(value)
-                alarm_state["timestamp"] = timestamp
-
-            # Handle people count
-            if measurement_type == "count" and "people" in topic:
-                people_state["count"] = int(value) if isinstance(value, (int, float)) else 0
-                people_state["timestamp"] = timestamp
-
-            if measurement_type == "event" and "people" in topic:
-                people_state["last_direction"] = str(value)
-                people_state["timestamp"] = timestamp
-
-            # Handle gyroscope data (Feature 6)
-            if measurement_type == "gyroscope" and sensor_id == "GSG":
-                try:
-                    gsg_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["GSG"]["value"] = gsg_data
-                    sensor_states["GSG"]["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle DHT data (Feature 7)
-            if measurement_type == "dht" and sensor_id in ["DHT1", "DHT2", "DHT3"]:
-                try:
-                    dht_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states[sensor_id]["value"] = dht_data
-                    sensor_states[sensor_id]["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle LCD data (Feature 7)
-            if measurement_type == "lcd" and sensor_id == "LCD":
-                try:
-                    lcd_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["LCD"]["value"] = lcd_data
-                    sensor_states["LCD"]["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle 4SD display data (Feature 8)
-            if measurement_type == "segment_display" and sensor_id == "4SD":
-                try:
-                    sd_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["4SD"]["value"] = sd_data
-                    sensor_states["4SD"]["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle timer state (Feature 8)
-            if "timer" in topic and measurement_type == "state":
-                try:
-                    ts_data = json.loads(value) if isinstance(value, str) else value
-                    timer_state["remaining"] = ts_data.get("remaining", 0)
-                    timer_state["display"] = ts_data.get("display", "00:00")
-                    timer_state["running"] = ts_data.get("running", False)
-                    timer_state["blinking"] = ts_data.get("blinking", False)
-                    timer_state["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle IR receiver data (Feature 9)
-            if measurement_type == "ir_receiver" and sensor_id == "IR":
-                try:
-                    ir_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["IR"]["value"] = ir_data
-                    sensor_states["IR"]["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle BRGB LED data (Feature 9)
-            if measurement_type == "rgb_led" and sensor_id == "BRGB":
-                try:
-                    rgb_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["BRGB"]["value"] = rgb_data
-                    sensor_states["BRGB"]["timestamp"] = timestamp
-                    brgb_state["on"] = rgb_data.get("on", False)
-                    brgb_state["r"] = rgb_data.get("r", 255)
-                    brgb_state["g"] = rgb_data.get("g", 255)
-                    brgb_state["b"] = rgb_data.get("b", 255)
-                    brgb_state["brightness"] = rgb_data.get("brightness", 100)
-                    brgb_state["timestamp"] = timestamp
-                except:
-                    pass
-
-            # Handle webcam status (Feature 10)
-            if measurement_type == "webcam" and sensor_id == "WEBC":
+            state_value = value
+            if plain:
+                handler = None
+            else:
+                handler, decode = by_sensor.get(sensor_id, default_handler)
+                if decode and isinstance(value, str):
+                    try:
+                        state_value = json.loads(value)
+                    except ValueError:
+                        handler = None
+
+            # Update in-memory state (registering sensors seen for the first time)
+            state = device.sensors.get(sensor_id) if not aggregate else None
+            if state is None and sensor_reading:
+                state = registry.sensor(device, sensor_id, measurement_type)
+            if state is not None:
+                state["value"] = state_value
+                state["timestamp"] = timestamp
+                touched.append(sensor_id)
+
+            if handler is not None:
+                handled = True
                 try:
-                    webc_data = json.loads(value) if isinstance(value, str) else value
-                    sensor_states["WEBC"]["value"] = webc_data
-                    sensor_states["WEBC"]["timestamp"] = timestamp
-                    webcam_frame["simulated"] = webc_data.get("simulated", True)
-                except:
+                    handler(device, sensor_id, state_value, timestamp)
+                except (AttributeError, TypeError, ValueError):
                     pass
 
             # Write to InfluxDB
@@ -283,29 +429,45 @@ def on_message(client, userdata, msg):
                 "simulated": str(simulated).lower(),
                 "unit": unit,
             }
-            if isinstance(value, (int, float)):
+            if aggregate and isinstance(value, dict):
+                fields = {k: float(v) for k, v in value.items() if isinstance(v, (int, float))}
+            elif isinstance(value, (int, float)):
                 fields = {"value": float(value)}
+            elif isinstance(value, dict):
+                # Compact batches carry objects decoded; store them as JSON like before
+                fields = {"value_str": json.dumps(value), "value": 1.0}
             else:
                 fields = {"value_str": str(value), "value": 1.0}
 
             write_to_influxdb(measurement_type, tags, fields, timestamp)
 
-        # Broadcast to WebSocket clients
+        # The dashboard WebSocket follows the default device; the others are
+        # served by /api/devices/{pi_id}/... (self-telemetry is for Grafana only)
+        if not dashboard or group == "telemetry":
+            return
+        if touched:
+            state_versions.touch_many(touched)
+
+        # Broadcast to WebSocket clients: readings plus only the state that changed
         ws_data = {
             "type": measurement_type,
             "topic": topic,
             "readings": readings,
-            "alarm": alarm_state,
-            "people": people_state,
-            "timer": timer_state,
-            "brgb": brgb_state,
         }
+        # Only handlers change the alarm/people/timer/brgb state objects
+        if handled:
+            for key, state in STATE_OBJECTS.items():
+                if state_versions.update(key, state):
+                    ws_data[key] = state
+        ws_data["epoch"] = state_versions.epoch
+        ws_data["version"] = state_versions.version
         if event_loop:
-            asyncio.run_coroutine_threadsafe(manager.broadcast(ws_data), event_loop)
+            event_loop.call_soon_threadsafe(manager.publish, ws_data)
 
     except json.JSONDecodeError:
-        pass
+        MQTT_ERRORS.inc()
     except Exception as e:
+        MQTT_ERRORS.inc()
         print(f"[MQTT] Error: {e}")
 
 
@@ -327,11 +489,19 @@ async def lifespan(app: FastAPI):
     global event_loop
     event_loop = asyncio.get_event_loop()
     init_influxdb()
+    if query_api is not None:
+        threading.Thread(target=backfill_alarm_events, daemon=True).start()
+    await command_bus.start()
+    clip_writer.start()
     start_mqtt()
     print("[Server] PI1 FastAPI server started")
     yield
+    await command_bus.stop()
     mqtt_client.loop_stop()
     mqtt_client.disconnect()
+    clip_writer.stop()
+    if influx_writer:
+        influx_writer.stop()
     if influx_client:
         influx_client.close()
     print("[Server] Shutdown complete")
@@ -372,15 +542,40 @@ class BRGBRequest(BaseModel):
 
 
 # ==================== Routes ====================
+def get_device(pi_id):
+    device = registry.get(pi_id)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Unknown device {pi_id}")
+    return device
+
+
+async def send_command(device, command, payload, wait=False):
+    """
+    Queue a command for the device without blocking. With wait, return the
+    device's acknowledgement (504 if none arrives within COMMAND_ACK_TIMEOUT).
+    """
+    try:
+        ack = await command_bus.command(f"{device.namespace}/commands/{command}", command, payload, wait=wait)
+    except CommandQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Command queue full: {e}")
+    if ack is None:
+        raise HTTPException(status_code=504,
+                            detail=f"{device.pi_id} did not acknowledge {command} within {command_bus.ack_timeout:g} s")
+    return ack
+
+
+def command_response(ack, **fields):
+    """Response of a command route; carries the device's ack when the caller waited for it."""
+    response = {"status": "ok", **fields, "command_id": ack["id"]}
+    if "status" in ack:
+        response["status"] = ack["status"]
+        response["ack"] = ack
+    return response
+
+
 @app.get("/api/status")
 async def get_status():
-    return {
-        "sensors": sensor_states,
-        "alarm": alarm_state,
-        "people": people_state,
-        "timer": timer_state,
-        "brgb": brgb_state,
-    }
+    return await get_device_status(DEFAULT_PI_ID)
 
 
 @app.get("/api/alarm/status")
@@ -389,16 +584,13 @@ async def get_alarm_status():
 
 
 @app.post("/api/alarm/arm")
-async def arm_alarm():
-    mqtt_client.publish("pi1/commands/alarm", json.dumps({"action": "arm"}))
-    return {"status": "ok", "message": "Arm command sent"}
+async def arm_alarm(wait: bool = False):
+    return await arm_device_alarm(DEFAULT_PI_ID, wait)
 
 
 @app.post("/api/alarm/deactivate")
-async def deactivate_alarm(req: AlarmDeactivateRequest):
-    mqtt_client.publish("pi1/commands/alarm",
-                        json.dumps({"action": "deactivate", "pin": req.pin}))
-    return {"status": "ok", "message": "Deactivate command sent"}
+async def deactivate_alarm(req: AlarmDeactivateRequest, wait: bool = False):
+    return await deactivate_device_alarm(DEFAULT_PI_ID, req, wait)
 
 
 @app.get("/api/people-count")
@@ -407,15 +599,13 @@ async def get_people_count():
 
 
 @app.post("/api/led")
-async def control_led(req: ActuatorRequest):
-    mqtt_client.publish("pi1/commands/led", json.dumps({"action": req.action}))
-    return {"status": "ok"}
+async def control_led(req: ActuatorRequest, wait: bool = False):
+    return await control_device_led(DEFAULT_PI_ID, req, wait)
 
 
 @app.post("/api/buzzer")
-async def control_buzzer(req: ActuatorRequest):
-    mqtt_client.publish("pi1/commands/buzzer", json.dumps({"action": req.action}))
-    return {"status": "ok"}
+async def control_buzzer(req: ActuatorRequest, wait: bool = False):
+    return await control_device_buzzer(DEFAULT_PI_ID, req, wait)
 
 
 @app.get("/api/timer")
@@ -424,12 +614,8 @@ async def get_timer_status():
 
 
 @app.post("/api/timer")
-async def control_timer(req: TimerRequest):
-    payload = {"action": req.action}
-    if req.action in ["set_time", "add_seconds", "set_btn_seconds"]:
-        payload["seconds"] = req.seconds
-    mqtt_client.publish("pi1/commands/timer", json.dumps(payload))
-    return {"status": "ok", "action": req.action}
+async def control_timer(req: TimerRequest, wait: bool = False):
+    return await control_device_timer(DEFAULT_PI_ID, req, wait)
 
 
 # ==================== Feature 9: BRGB Control ====================
@@ -439,7 +625,96 @@ async def get_brgb_status():
 
 
 @app.post("/api/brgb")
-async def control_brgb(req: BRGBRequest):
+async def control_brgb(req: BRGBRequest, wait: bool = False):
+    return await control_device_brgb(DEFAULT_PI_ID, req, wait)
+
+
+# ==================== Fleet ====================
+@app.get("/api/devices")
+async def list_devices():
+    return {"devices": [device.summary() for device in registry.devices()]}
+
+
+@app.get("/api/sensors")
+async def list_sensors_of_type(type: str):
+    """Every sensor of a type across the fleet, e.g. /api/sensors?type=dht."""
+    return {"sensors": [{"pi_id": pi_id, "sensor_id": sid, **state}
+                        for pi_id, sid, state in registry.sensors_of_type(type)]}
+
+
+@app.get("/api/devices/{pi_id}")
+async def get_device_status(pi_id: str):
+    return get_device(pi_id).snapshot()
+
+
+@app.get("/api/devices/{pi_id}/sensors")
+async def get_device_sensors(pi_id: str):
+    return get_device(pi_id).snapshot()["sensors"]
+
+
+@app.get("/api/devices/{pi_id}/sensors/{sensor_id}")
+async def get_device_sensor(pi_id: str, sensor_id: str):
+    sensor = get_device(pi_id).sensors.get(sensor_id)
+    if sensor is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sensor {sensor_id}")
+    return sensor
+
+
+@app.get("/api/devices/{pi_id}/alarm")
+async def get_device_alarm(pi_id: str):
+    return get_device(pi_id).alarm
+
+
+@app.post("/api/devices/{pi_id}/alarm/arm")
+async def arm_device_alarm(pi_id: str, wait: bool = False):
+    ack = await send_command(get_device(pi_id), "alarm", {"action": "arm"}, wait)
+    return command_response(ack, message="Arm command sent")
+
+
+@app.post("/api/devices/{pi_id}/alarm/deactivate")
+async def deactivate_device_alarm(pi_id: str, req: AlarmDeactivateRequest, wait: bool = False):
+    ack = await send_command(get_device(pi_id), "alarm", {"action": "deactivate", "pin": req.pin}, wait)
+    return command_response(ack, message="Deactivate command sent")
+
+
+@app.get("/api/devices/{pi_id}/people-count")
+async def get_device_people_count(pi_id: str):
+    return get_device(pi_id).people
+
+
+@app.post("/api/devices/{pi_id}/led")
+async def control_device_led(pi_id: str, req: ActuatorRequest, wait: bool = False):
+    ack = await send_command(get_device(pi_id), "led", {"action": req.action}, wait)
+    return command_response(ack)
+
+
+@app.post("/api/devices/{pi_id}/buzzer")
+async def control_device_buzzer(pi_id: str, req: ActuatorRequest, wait: bool = False):
+    ack = await send_command(get_device(pi_id), "buzzer", {"action": req.action}, wait)
+    return command_response(ack)
+
+
+@app.get("/api/devices/{pi_id}/timer")
+async def get_device_timer(pi_id: str):
+    return get_device(pi_id).timer
+
+
+@app.post("/api/devices/{pi_id}/timer")
+async def control_device_timer(pi_id: str, req: TimerRequest, wait: bool = False):
+    payload = {"action": req.action}
+    if req.action in ["set_time", "add_seconds", "set_btn_seconds"]:
+        payload["seconds"] = req.seconds
+    ack = await send_command(get_device(pi_id), "timer", payload, wait)
+    return command_response(ack, action=req.action)
+
+
+@app.get("/api/devices/{pi_id}/brgb")
+async def get_device_brgb(pi_id: str):
+    return get_device(pi_id).brgb
+
+
+@app.post("/api/devices/{pi_id}/brgb")
+async def control_device_brgb(pi_id: str, req: BRGBRequest, wait: bool = False):
     payload = {"action": req.action}
     if req.action == "set_color":
         payload["r"] = req.r
@@ -449,74 +724,73 @@ async def control_brgb(req: BRGBRequest):
         payload["color"] = req.color
     elif req.action == "brightness":
         payload["value"] = req.value
-    mqtt_client.publish("pi1/commands/brgb", json.dumps(payload))
-    return {"status": "ok", "action": req.action}
+    ack = await send_command(get_device(pi_id), "brgb", payload, wait)
+    return command_response(ack, action=req.action)
 
 
 # ==================== Feature 10: Webcam Stream ====================
-def _generate_simulated_frame():
-    """Generate a simple BMP test pattern for simulated webcam."""
-    import random
-    w, h = 320, 240
-    row_size = (w * 3 + 3) & ~3
-    pixel_data_size = row_size * h
-    file_size = 54 + pixel_data_size
-
-    # Cycle colors based on time
-    t = int(time.time()) % 5
-    colors = [(0, 100, 200), (0, 180, 100), (200, 100, 0), (150, 0, 150), (200, 200, 0)]
-    r, g, b = colors[t]
-
-    header = struct.pack('<2sIHHI', b'BM', file_size, 0, 0, 54)
-    dib = struct.pack('<IiiHHIIiiII', 40, w, h, 1, 24, 0, pixel_data_size, 2835, 2835, 0, 0)
-
-    rows = []
-    for y in range(h):
-        row = bytearray()
-        for x in range(w):
-            if (x // 40 + y // 40) % 2 == 0:
-                row.extend([b, g, r])
-            else:
-                row.extend([b // 2, g // 2, r // 2])
-        while len(row) % 4 != 0:
-            row.append(0)
-        rows.append(bytes(row))
+# Pre-rendered test pattern served while no real frame has arrived
+simulated_frames = SimulatedFrameCache()
+
+
+def current_webcam_frame():
+    """Latest device frame, or the simulated test pattern once it goes stale."""
+    frame_data = webcam_frame.get("data")
+    if frame_data and time.time() - webcam_frame["received"] < WEBCAM_FRAME_MAX_AGE:
+        return frame_data, webcam_frame["content_type"]
+    return simulated_frames.current(), "image/bmp"
 
-    return header + dib + b''.join(rows)
+
+def publish_webcam_viewers(count):
+    """Tell the device how many clients are watching; it only uploads while count > 0."""
+    # Retained and uncorrelated: the device re-reads it on every reconnect
+    command_bus.submit(f"{default_device.namespace}/commands/webcam",
+                       json.dumps({"action": "viewers", "count": count}), retain=True)
+
+
+# One producer for all stream viewers
+webcam_broadcaster = MJPEGBroadcaster(current_webcam_frame, fps=WEBCAM_STREAM_FPS,
+                                      on_subscribers=publish_webcam_viewers,
+                                      max_age=WEBCAM_FRAME_MAX_AGE)
+REGISTRY.gauge("iot_webcam_viewers", "Clients watching the MJPEG stream",
+               fn=lambda: webcam_broadcaster.get_stats()["subscribers"])
 
 
 @app.get("/api/webcam/frame")
 async def get_webcam_frame():
-    """Get a single webcam frame (BMP for simulated, JPEG for real)."""
-    frame_data = webcam_frame.get("data")
-    if frame_data:
-        content_type = "image/jpeg"
-        return Response(content=frame_data, media_type=content_type)
-
-    # Fallback: generate simulated frame
-    bmp_data = _generate_simulated_frame()
-    return Response(content=bmp_data, media_type="image/bmp")
+    """Get a single webcam frame (device JPEG, or BMP for simulated)."""
+    frame_data, content_type = current_webcam_frame()
+    return Response(content=frame_data, media_type=content_type)
 
 
 @app.get("/api/webcam/stream")
 async def webcam_stream():
     """MJPEG stream endpoint for continuous webcam video."""
-    async def generate():
-        while True:
-            frame_data = webcam_frame.get("data")
-            if frame_data:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
-            else:
-                # Simulated frame
-                bmp_data = _generate_simulated_frame()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/bmp\r\n\r\n' + bmp_data + b'\r\n')
-            await asyncio.sleep(0.1)  # ~10 FPS
+    return StreamingResponse(
+        webcam_broadcaster.subscribe(),
+        media_type=webcam_broadcaster.media_type
+    )
+
 
+# Alarm/motion clips recorded on the device
+clip_store = ClipStore(CLIP_DIR, CLIP_QUOTA_MB * 1024 * 1024)
+clip_writer = ClipWriter(clip_store, queue_size=CLIP_QUEUE_SIZE)
+
+
+@app.get("/api/clips")
+async def list_clips():
+    return {"clips": await command_bus.run_blocking(clip_store.list)}
+
+
+@app.get("/api/clips/{name}")
+async def stream_clip(name: str):
+    """Replay a clip as an MJPEG stream at its recorded pace."""
+    path = clip_store.path(name)
+    if path is None:
+        return Response(status_code=404)
     return StreamingResponse(
-        generate(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        replay(path, run_blocking=command_bus.run_blocking),
+        media_type=f"multipart/x-mixed-replace; boundary={CLIP_BOUNDARY}"
     )
 
 
@@ -525,35 +799,108 @@ async def get_webcam_status():
     return {
         "active": sensor_states["WEBC"]["value"].get("active", False) if isinstance(sensor_states["WEBC"]["value"], dict) else False,
         "simulated": webcam_frame.get("simulated", True),
+        "streaming": webcam_frame["received"] > time.time() - WEBCAM_FRAME_MAX_AGE,
+        "latency_ms": webcam_frame["latency_ms"],
+        "viewers": webcam_broadcaster.get_stats()["subscribers"],
     }
 
 
-@app.get("/api/alarm-events")
-async def get_alarm_events():
-    if query_api is None:
-        return {"events": []}
-    try:
-        query = f'''
+def flux_string(value):
+    """Escape a value for use inside a double-quoted Flux string literal."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("${", "\\${")
+
+
+def flux_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def query_alarm_events(start, end=None, before=None, limit=50, pi_id=None):
+    """
+    Alarm events from InfluxDB, newest first, as (events, next_cursor) like
+    EventIndex.query. Blocking: call it from a worker thread.
+    """
+    stop = end
+    skip = 0
+    if before is not None and (end is None or before[0] < end * 1e9):
+        # Up to and including the cursor time (record times are in microseconds),
+        # minus the events there the previous pages returned
+        stop, skip = (before[0] // 1000 + 1) / 1e6, before[1]
+    device_filter = f'\n          |> filter(fn: (r) => r["pi_id"] == "{flux_string(pi_id)}")' if pi_id else ""
+    query = f'''
         from(bucket: "{INFLUXDB_BUCKET}")
-          |> range(start: -24h)
+          |> range(start: {flux_time(start)}{f", stop: {flux_time(stop)}" if stop else ""})
           |> filter(fn: (r) => r["_measurement"] == "event")
           |> filter(fn: (r) => r["sensor_id"] == "ALARM")
-          |> sort(columns: ["_time"], desc: true)
-          |> limit(n: 50)
+          |> filter(fn: (r) => r["_field"] == "value_str"){device_filter}
+          |> group()
+          |> sort(columns: ["_time", "pi_id", "_value"], desc: true)
+          |> limit(n: {limit + 1 + skip})
         '''
-        tables = query_api.query(query, org=INFLUXDB_ORG)
-        events = []
-        for table in tables:
-            for record in table.records:
-                events.append({
-                    "time": str(record.get_time()),
-                    "event": record.get_value(),
-                    "field": record.get_field(),
-                })
-        return {"events": events}
+    events = []
+    for table in query_api.query(query, org=INFLUXDB_ORG):
+        for record in table.records:
+            events.append({
+                "time": str(record.get_time()),
+                "event": record.get_value(),
+                "field": record.get_field(),
+                "pi_id": record.values.get("pi_id"),
+                "time_ns": round(record.get_time().timestamp() * 1e6) * 1000,
+            })
+    if skip:
+        at_cursor = sum(1 for event in events[:skip] if event["time_ns"] == before[0])
+        events = events[at_cursor:]
+    if len(events) > limit:
+        return events[:limit], next_cursor(events[:limit], before if skip else None)
+    return events, None
+
+
+def backfill_alarm_events():
+    """Load the last ALARM_EVENT_BACKFILL_HOURS of events into the index (runs once, in a thread)."""
+    start = time.time() - ALARM_EVENT_BACKFILL_HOURS * 3600
+    try:
+        events, _ = query_alarm_events(start, limit=ALARM_EVENT_INDEX_SIZE)
     except Exception as e:
-        print(f"[InfluxDB] Query error: {e}")
-        return {"events": []}
+        print(f"[InfluxDB] Alarm event backfill failed: {e}")
+        return
+    for event in events:
+        alarm_events.add(event["pi_id"], event["event"], event["time_ns"] / 1e9)
+    # Complete from the backfill start, or after the oldest event if it hit the cap
+    oldest = start if len(events) < ALARM_EVENT_INDEX_SIZE else (events[-1]["time_ns"] + 1) / 1e9
+    alarm_events.covered_from = min(alarm_events.covered_from, oldest)
+    print(f"[Events] Backfilled {len(events)} alarm events")
+
+
+@app.get("/api/alarm-events")
+async def get_alarm_events(limit: int = 50, before: Optional[str] = None, start: Optional[float] = None,
+                           end: Optional[float] = None, pi_id: Optional[str] = None):
+    """
+    Alarm events, newest first. start/end are epoch seconds (default: the
+    last 24 h); pass next_cursor back as `before` for the next page.
+    """
+    limit = max(1, min(limit, 1000))
+    start = time.time() - 24 * 3600 if start is None else start
+    if pi_id is not None:
+        get_device(pi_id)
+    if before is not None:
+        try:
+            before = parse_cursor(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor {before!r}")
+    events, cursor = alarm_events.query(start, end, before, limit, pi_id)
+    # Older than the index has complete history for: ask InfluxDB, off the event loop
+    if cursor is None and not alarm_events.covers(start) and query_api is not None:
+        try:
+            events, cursor = await command_bus.run_blocking(query_alarm_events, start, end, before, limit, pi_id)
+        except Exception as e:
+            print(f"[InfluxDB] Query error: {e}")
+    return {"events": events, "next_cursor": cursor}
+
+
+@app.get("/api/devices/{pi_id}/alarm-events")
+async def get_device_alarm_events(pi_id: str, limit: int = 50, before: Optional[str] = None,
+                                  start: Optional[float] = None, end: Optional[float] = None):
+    get_device(pi_id)
+    return await get_alarm_events(limit, before, start, end, pi_id)
 
 
 @app.get("/health")
@@ -562,25 +909,67 @@ async def health():
         "status": "healthy",
         "mqtt": mqtt_client.is_connected(),
         "influxdb": influx_client is not None,
+        "websocket": manager.get_stats(),
+        "webcam_stream": webcam_broadcaster.get_stats(),
+        "commands": command_bus.get_stats(),
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Server metrics in the Prometheus text exposition format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/api/commands/metrics")
+async def get_command_metrics():
+    """Per-command-type acknowledgement counts and latency histograms (ms)."""
+    return command_bus.get_metrics()
+
+
+@app.get("/api/influxdb/stats")
+async def get_influxdb_stats():
+    if influx_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **influx_writer.get_stats()}
+
+
 # ==================== WebSocket ====================
+def build_state_delta(since):
+    """State keys and sensors changed after version `since`."""
+    version = state_versions.version
+    delta = {"type": "state_delta", "epoch": state_versions.epoch,
+             "base_version": since, "version": version}
+    for key in state_versions.changed_since(since):
+        if key in STATE_OBJECTS:
+            delta[key] = STATE_OBJECTS[key]
+        elif key in sensor_states:
+            delta.setdefault("sensors", {})[key] = sensor_states[key]
+    return delta
+
+
+manager.resync_builder = build_state_delta
+
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    # Send current state on connect
-    try:
-        await websocket.send_json({
+async def websocket_endpoint(websocket: WebSocket, epoch: str = "", version: int = -1):
+    # A reconnecting client passes the epoch and version it last applied and
+    # only receives what changed since; everyone else gets a full snapshot
+    resume = state_versions.is_valid(epoch, version)
+    await manager.connect(websocket, acked_version=version if resume else 0)
+    if resume:
+        manager.send(websocket, build_state_delta(version))
+    else:
+        manager.send(websocket, {
             "type": "initial_state",
-            "sensors": sensor_states,
+            "epoch": state_versions.epoch,
+            "version": state_versions.version,
+            "sensors": default_device.snapshot()["sensors"],
             "alarm": alarm_state,
             "people": people_state,
             "timer": timer_state,
             "brgb": brgb_state,
         })
-    except Exception:
-        pass
 
     try:
         while True:
@@ -589,8 +978,10 @@ async def websocket_endpoint(websocket: WebSocket):
             try:
                 msg = json.loads(data)
                 if msg.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
-            except json.JSONDecodeError:
+                    manager.send(websocket, {"type": "pong"})
+                elif msg.get("type") == "ack":
+                    manager.ack(websocket, int(msg.get("version", 0)))
+            except (json.JSONDecodeError, TypeError, ValueError):
                 pass
     except WebSocketDisconnect:
         manager.disconnect(websocket)
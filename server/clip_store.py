@@ -0,0 +1,217 @@
+"""
+Alarm/motion clips uploaded by the device.
+
+Clips arrive on the webcam clip topic in chunks, each a JSON header line
+{"name", "offset", "size"} followed by the chunk bytes, one clip at a time
+in order (the device's ClipUploader). A single ClipWriter thread appends
+them to <name>.part and renames the file once all size bytes are in. A
+clip the device restarts begins again at offset 0; a chunk that continues
+neither (one was lost) drops the partial clip. Each clip is a multipart MJPEG file
+written by the device's ClipRecorder (parts carry Content-Length and
+X-Timestamp headers). The store keeps them under a byte quota, deleting
+the oldest first, and can replay one at its recorded pace for the
+/api/clips stream endpoint.
+"""
+import asyncio
+import json
+import os
+import queue
+import re
+import threading
+
+from metrics import REGISTRY
+
+CLIP_SUFFIX = ".mjpeg"
+CLIP_BOUNDARY = "clip"
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+\.mjpeg$")
+
+CLIP_CHUNKS = REGISTRY.counter("iot_clip_chunks_total", "Uploaded clip chunks, by outcome", ("outcome",))
+
+
+class ClipStore:
+    def __init__(self, directory, quota_bytes):
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        """Absolute path of a stored clip, or None for unknown/invalid names."""
+        if not _NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def write_chunk(self, payload):
+        """Add one uploaded chunk; returns the clip path once the clip is complete."""
+        line, sep, data = payload.partition(b"\n")
+        try:
+            header = json.loads(line)
+            name, offset, size = header["name"], int(header["offset"]), int(header["size"])
+        except (ValueError, KeyError, TypeError):
+            name = offset = size = None
+        if not sep or not isinstance(name, str) or not _NAME_RE.match(name):
+            print(f"[Clips] Ignoring chunk with bad header {line[:80]!r}")
+            CLIP_CHUNKS.labels("rejected").inc()
+            return None
+        path = os.path.join(self.directory, name)
+        tmp = path + ".part"
+        if offset == 0:
+            mode = "wb"
+        elif os.path.exists(tmp) and os.path.getsize(tmp) == offset:
+            mode = "ab"
+        else:
+            # A chunk went missing: drop the partial clip, the device resends it
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            CLIP_CHUNKS.labels("out_of_order").inc()
+            return None
+        with open(tmp, mode) as f:
+            f.write(data)
+        CLIP_CHUNKS.labels("written").inc()
+        if offset + len(data) < size:
+            return None
+        os.replace(tmp, path)
+        removed = self.enforce_quota(keep=path)
+        print(f"[Clips] Stored {name} ({size // 1024} kB)"
+              + (f", evicted {len(removed)}" if removed else ""))
+        return path
+
+    def enforce_quota(self, keep=None):
+        clips = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CLIP_SUFFIX) and entry.path != keep:
+                stat = entry.stat()
+                clips.append((stat.st_mtime, stat.st_size, entry.path))
+        clips.sort()
+        total = sum(size for _, size, _ in clips)
+        if keep and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        removed = []
+        for _, size, path in clips:
+            if total <= self.quota_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed.append(path)
+        return removed
+
+    def list(self):
+        clips = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CLIP_SUFFIX):
+                continue
+            stat = entry.stat()
+            stem = entry.name[:-len(CLIP_SUFFIX)]
+            clips.append({
+                "name": entry.name,
+                "reason": stem.split("_", 1)[1] if "_" in stem else "",
+                "size": stat.st_size,
+                "created": stat.st_mtime,
+            })
+        clips.sort(key=lambda c: c["created"], reverse=True)
+        return clips
+
+
+class ClipWriter:
+    """
+    Writes uploaded clip chunks to the ClipStore on one daemon thread, off
+    the MQTT network thread. The queue is bounded: when it is full the
+    chunk is dropped, and with it the rest of that clip.
+    """
+
+    def __init__(self, store, queue_size=64):
+        self.store = store
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="clip-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def submit(self, payload):
+        """Queue a chunk (MQTT thread); False if the queue is full and it was dropped."""
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            CLIP_CHUNKS.labels("dropped").inc()
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            payload = self._queue.get()
+            if payload is None:
+                return
+            try:
+                self.store.write_chunk(payload)
+            except OSError as e:
+                print(f"[Clips] Failed to store clip chunk: {e}")
+
+
+def iter_parts(path, chunk_size=64 * 1024):
+    """Yield (timestamp, part_bytes) for each frame of a clip file."""
+    with open(path, "rb") as f:
+        while True:
+            header = b""
+            while not header.endswith(b"\r\n\r\n"):
+                line = f.readline(chunk_size)
+                if not line:
+                    return
+                header += line
+            length, timestamp = None, 0.0
+            for line in header.split(b"\r\n"):
+                key, _, value = line.partition(b":")
+                if key.lower() == b"content-length":
+                    length = int(value)
+                elif key.lower() == b"x-timestamp":
+                    timestamp = float(value)
+            if length is None:
+                return
+            body = f.read(length + 2)  # frame plus trailing CRLF
+            yield timestamp, header + body
+
+
+async def replay(path, max_gap=1.0, run_blocking=None):
+    """
+    Async generator of multipart parts paced by their recorded timestamps.
+    File reads go through run_blocking (an executor wrapper) when given.
+    """
+    parts = iter_parts(path)
+    read = None
+    previous = None
+    try:
+        while True:
+            if run_blocking is None:
+                item = next(parts, None)
+            else:
+                # Shielded: a viewer disconnecting mid-read leaves the read running
+                read = asyncio.ensure_future(run_blocking(next, parts, None))
+                item = await asyncio.shield(read)
+            if item is None:
+                return
+            timestamp, part = item
+            if previous is not None:
+                await asyncio.sleep(min(max_gap, max(0.0, timestamp - previous)))
+            previous = timestamp
+            yield part
+    finally:
+        # Close the clip file when the viewer disconnects; if a read is still
+        # running in the executor, once it returns (the generator is busy until then)
+        if read is not None and not read.done():
+            read.add_done_callback(lambda done: _close_parts(parts, done))
+        else:
+            parts.close()
+
+
+def _close_parts(parts, read):
+    if not read.cancelled():
+        read.exception()  # retrieved here, so asyncio does not report it as lost
+    parts.close()
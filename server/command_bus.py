@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import paho.mqtt.client as mqtt
+
+from metrics import Histogram
+
+
+class CommandQueueFull(Exception):
+    pass
+
+
+class CommandStats:
+    """
+    Acknowledgement counters and latency histograms (ms) of one command type.
+    round_trip is server send to ack received, device the execution time the
+    device reports, transit the rest (server queue, broker and network).
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0       # wait=true calls that gave up
+        self.unacked = 0        # never acknowledged within the ack TTL
+        self.statuses = {}
+        self.round_trip = Histogram()
+        self.device = Histogram()
+        self.transit = Histogram()
+
+    def observe(self, status, round_trip, device):
+        self.acked += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.round_trip.observe(round_trip)
+        self.device.observe(device)
+        self.transit.observe(max(0.0, round_trip - device))
+
+    def snapshot(self):
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "timeouts": self.timeouts,
+            "unacked": self.unacked,
+            "statuses": dict(self.statuses),
+            "round_trip_ms": self.round_trip.snapshot(),
+            "device_ms": self.device.snapshot(),
+            "transit_ms": self.transit.snapshot(),
+        }
+
+
+class CommandBus:
+    """
+    Keeps blocking work off the event loop.
+    Route handlers submit MQTT commands to a bounded asyncio queue and return;
+    a single publisher task hands them to paho in order on a small thread
+    pool, so a busy client lock or a full socket buffer never stalls other
+    requests. Other blocking calls, such as InfluxDB queries, go through
+    run_blocking() on the same bounded pool.
+
+    command() adds a correlation id to a device command; the device answers
+    on <namespace>/acks/<command> with the id, a status and its execution
+    time, which on_ack() matches to record per-command-type latencies and
+    to complete callers waiting for the acknowledgement.
+    """
+
+    def __init__(self, client, queue_size=1000, workers=4, ack_timeout=5.0, ack_ttl=60.0):
+        self.client = client
+        self.queue_size = queue_size
+        self.ack_timeout = ack_timeout
+        self.ack_ttl = ack_ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blocking")
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._lock = threading.Lock()
+        # Correlation ids are unique per server start
+        self._prefix = uuid.uuid4().hex[:6]
+        self._ids = itertools.count(1)
+        self._awaiting = OrderedDict()  # command id -> (command type, sent, future)
+        self.commands = {}              # command type -> CommandStats
+        self.stats = {"submitted": 0, "published": 0, "rejected": 0, "failed": 0}
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._publisher())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.executor.shutdown(wait=False)
+
+    def submit(self, topic, payload, qos=0, retain=False):
+        """
+        Queue a publish without blocking (CommandQueueFull when the queue is
+        full). Safe to call from other threads.
+        """
+        if self._loop is None:
+            # Not started (no event loop yet): publish directly
+            self.client.publish(topic, payload, qos=qos, retain=retain)
+            return
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if not in_loop:
+            self._loop.call_soon_threadsafe(self.submit, topic, payload, qos, retain)
+            return
+        try:
+            self._queue.put_nowait((topic, payload, qos, retain))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise CommandQueueFull(f"{self.queue_size} commands already queued")
+        self.stats["submitted"] += 1
+
+    async def command(self, topic, command, payload, wait=False, timeout=None):
+        """
+        Send a command dict with a correlation id. Returns {"id": ...} once
+        queued, or with wait the device's acknowledgement (None on timeout).
+        """
+        command_id = f"{self._prefix}-{next(self._ids)}"
+        message = json.dumps({**payload, "id": command_id, "sent": time.time()})
+        future = self._loop.create_future() if wait else None
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._awaiting[command_id] = (command, now, future)
+        try:
+            self.submit(topic, message)
+        except CommandQueueFull:
+            with self._lock:
+                self._awaiting.pop(command_id, None)
+            raise
+        stats.sent += 1
+        if future is None:
+            return {"id": command_id}
+        try:
+            return await asyncio.wait_for(future, timeout or self.ack_timeout)
+        except asyncio.TimeoutError:
+            # A late ack still gets its latency recorded
+            stats.timeouts += 1
+            return None
+
+    def on_ack(self, payload):
+        """Match a device acknowledgement to its command (paho network thread)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._awaiting.pop(payload.get("id"), None)
+        if entry is None:
+            return  # expired, or sent by another server instance
+        command, sent, future = entry
+        round_trip = (now - sent) * 1000
+        device = float(payload.get("exec_ms", 0.0))
+        self.commands[command].observe(payload.get("status", "ok"), round_trip, device)
+        if future is not None:
+            ack = {**payload, "command": command, "round_trip_ms": round(round_trip, 2)}
+            self._loop.call_soon_threadsafe(self._deliver, future, ack)
+
+    def _expire(self, now):
+        # Oldest first: stop at the first command still within the TTL
+        while self._awaiting:
+            command_id, (command, sent, _) = next(iter(self._awaiting.items()))
+            if now - sent < self.ack_ttl:
+                return
+            del self._awaiting[command_id]
+            self.commands[command].unacked += 1
+
+    @staticmethod
+    def _deliver(future, ack):
+        if not future.done():
+            future.set_result(ack)
+
+    def get_metrics(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            awaiting = len(self._awaiting)
+        return {"awaiting_ack": awaiting,
+                "commands": {name: stats.snapshot() for name, stats in sorted(self.commands.items())}}
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        return await self._loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def _publisher(self):
+        while True:
+            topic, payload, qos, retain = await self._queue.get()
+            try:
+                info = await self.run_blocking(self.client.publish, topic, payload, qos=qos, retain=retain)
+            except Exception as e:
+                print(f"[Commands] Publish to {topic} failed: {e}")
+                info = None
+            if info is None or info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.stats["failed"] += 1
+            else:
+                self.stats["published"] += 1
+
+    def get_stats(self):
+        return {**self.stats, "queued": self._queue.qsize() if self._queue else 0}
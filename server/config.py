@@ -4,8 +4,46 @@ import os
 MQTT_BROKER = os.environ.get("MQTT_BROKER", "localhost")
 MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
 
+# Device whose state backs the original /api/... routes and the dashboard WebSocket
+DEFAULT_PI_ID = os.environ.get("DEFAULT_PI_ID", "PI1")
+
 # InfluxDB Configuration
 INFLUXDB_URL = os.environ.get("INFLUXDB_URL", "http://localhost:8086")
 INFLUXDB_TOKEN = os.environ.get("INFLUXDB_TOKEN", "my-super-secret-token")
 INFLUXDB_ORG = os.environ.get("INFLUXDB_ORG", "pi1_org")
 INFLUXDB_BUCKET = os.environ.get("INFLUXDB_BUCKET", "pi1_data")
+
+# InfluxDB batch writer
+INFLUXDB_BATCH_SIZE = int(os.environ.get("INFLUXDB_BATCH_SIZE", 500))
+INFLUXDB_FLUSH_INTERVAL = float(os.environ.get("INFLUXDB_FLUSH_INTERVAL", 1.0))
+INFLUXDB_QUEUE_SIZE = int(os.environ.get("INFLUXDB_QUEUE_SIZE", 10000))
+INFLUXDB_MAX_RETRIES = int(os.environ.get("INFLUXDB_MAX_RETRIES", 5))
+
+# WebSocket broadcast
+WS_FRAME_INTERVAL = float(os.environ.get("WS_FRAME_INTERVAL", 0.1))
+WS_CLIENT_QUEUE_SIZE = int(os.environ.get("WS_CLIENT_QUEUE_SIZE", 64))
+
+# Webcam MJPEG stream
+WEBCAM_STREAM_FPS = float(os.environ.get("WEBCAM_STREAM_FPS", 10))
+WEBCAM_FRAME_TOPIC = os.environ.get("WEBCAM_FRAME_TOPIC", "pi1/webcam/frame")
+# Device frames older than this fall back to the simulated pattern
+WEBCAM_FRAME_MAX_AGE = float(os.environ.get("WEBCAM_FRAME_MAX_AGE", 5.0))
+
+# Alarm/motion clips uploaded by the device
+WEBCAM_CLIP_TOPIC = os.environ.get("WEBCAM_CLIP_TOPIC", "pi1/webcam/clip")
+CLIP_DIR = os.environ.get("CLIP_DIR", "clips")
+CLIP_QUOTA_MB = int(os.environ.get("CLIP_QUOTA_MB", 500))
+# Uploaded clip chunks (64 kB each) waiting for the clip writer thread
+CLIP_QUEUE_SIZE = int(os.environ.get("CLIP_QUEUE_SIZE", 64))
+
+# Recent alarm events served from memory by /api/alarm-events
+ALARM_EVENT_INDEX_SIZE = int(os.environ.get("ALARM_EVENT_INDEX_SIZE", 10000))
+ALARM_EVENT_BACKFILL_HOURS = float(os.environ.get("ALARM_EVENT_BACKFILL_HOURS", 24))
+
+# REST commands are queued for one MQTT publisher task
+COMMAND_QUEUE_SIZE = int(os.environ.get("COMMAND_QUEUE_SIZE", 1000))
+COMMAND_ACK_TIMEOUT = float(os.environ.get("COMMAND_ACK_TIMEOUT", 5.0))
+# Commands not acknowledged by the device within this are counted as unacked
+COMMAND_ACK_TTL = float(os.environ.get("COMMAND_ACK_TTL", 60.0))
+# Thread pool for blocking calls (MQTT publish, InfluxDB queries, clip listing)
+BLOCKING_IO_WORKERS = int(os.environ.get("BLOCKING_IO_WORKERS", 4))
@@ -0,0 +1,136 @@
+import threading
+import time
+
+
+def default_alarm_state():
+    return {"state": "DISARMED", "reason": "", "timestamp": None}
+
+
+def default_people_state():
+    return {"count": 0, "last_direction": None, "timestamp": None}
+
+
+def default_timer_state():
+    return {"remaining": 0, "display": "00:00", "running": False, "blinking": False,
+            "btn_seconds": 10, "timestamp": None}
+
+
+def default_brgb_state():
+    return {"on": False, "r": 255, "g": 255, "b": 255, "brightness": 100, "timestamp": None}
+
+
+class DeviceState:
+    """
+    State of one controller, keyed by its pi_id.
+    Sensors are registered on their first reading; a template (the known
+    sensors of a device model, with display names) can be given up front.
+    The state dicts are updated in place, so references to them stay valid.
+    """
+
+    def __init__(self, pi_id, namespace=None, sensors=None):
+        self.pi_id = pi_id
+        # First MQTT topic level of the device (pi1/sensors/..., pi2/...)
+        self.namespace = namespace or pi_id.lower()
+        self.device_names = set()
+        self.sensors = {sid: dict(s) for sid, s in (sensors or {}).items()}
+        self.alarm = default_alarm_state()
+        self.people = default_people_state()
+        self.timer = default_timer_state()
+        self.brgb = default_brgb_state()
+        self.messages = 0
+        self.readings = 0
+        self.last_seen = None
+        self._lock = threading.Lock()
+
+    def state_objects(self):
+        return {"alarm": self.alarm, "people": self.people, "timer": self.timer, "brgb": self.brgb}
+
+    def sensor(self, sensor_id, sensor_type):
+        """Return the sensor's state dict, registering the sensor if it is new."""
+        state = self.sensors.get(sensor_id)
+        if state is None:
+            with self._lock:
+                state = self.sensors.setdefault(sensor_id, {
+                    "value": None, "name": sensor_id, "type": sensor_type, "timestamp": None})
+        return state
+
+    def seen(self, device_name, readings):
+        self.messages += 1
+        self.readings += readings
+        self.last_seen = time.time()
+        if device_name not in self.device_names:
+            with self._lock:
+                self.device_names.add(device_name)
+
+    def summary(self):
+        return {
+            "pi_id": self.pi_id,
+            "namespace": self.namespace,
+            "device_names": sorted(self.device_names),
+            "sensors": len(self.sensors),
+            "messages": self.messages,
+            "readings": self.readings,
+            "last_seen": self.last_seen,
+            "alarm": self.alarm["state"],
+            "people": self.people["count"],
+        }
+
+    def snapshot(self):
+        with self._lock:
+            sensors = {sid: dict(s) for sid, s in self.sensors.items()}
+        return {"pi_id": self.pi_id, "sensors": sensors, **self.state_objects()}
+
+
+class DeviceRegistry:
+    """
+    All known controllers, indexed by pi_id, by MQTT namespace and by sensor
+    type (for fleet-wide queries such as every DHT in every house).
+    """
+
+    def __init__(self):
+        self._devices = {}
+        self._by_namespace = {}
+        self._by_type = {}      # sensor type -> set of (pi_id, sensor id)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._devices)
+
+    def get(self, pi_id):
+        return self._devices.get(pi_id)
+
+    def by_namespace(self, namespace):
+        return self._by_namespace.get(namespace)
+
+    def get_or_create(self, pi_id, namespace=None, sensors=None):
+        device = self._devices.get(pi_id)
+        if device is not None:
+            return device
+        with self._lock:
+            device = self._devices.get(pi_id)
+            if device is None:
+                device = DeviceState(pi_id, namespace, sensors)
+                for sensor_id, state in device.sensors.items():
+                    self._by_type.setdefault(state["type"], set()).add((pi_id, sensor_id))
+                self._by_namespace[device.namespace] = device
+                self._devices[pi_id] = device
+                print(f"[Devices] Registered {pi_id} (topics {device.namespace}/...)")
+        return device
+
+    def sensor(self, device, sensor_id, sensor_type):
+        """DeviceState.sensor() that also keeps the type index current."""
+        known = sensor_id in device.sensors
+        state = device.sensor(sensor_id, sensor_type)
+        if not known:
+            with self._lock:
+                self._by_type.setdefault(state["type"], set()).add((device.pi_id, sensor_id))
+        return state
+
+    def devices(self):
+        return list(self._devices.values())
+
+    def sensors_of_type(self, sensor_type):
+        """[(pi_id, sensor id, state)] of every sensor of a type, across the fleet."""
+        with self._lock:
+            keys = sorted(self._by_type.get(sensor_type, ()))
+        return [(pi_id, sid, self._devices[pi_id].sensors[sid]) for pi_id, sid in keys]
@@ -0,0 +1,113 @@
+import bisect
+import threading
+from datetime import datetime, timezone
+
+
+def format_time(ts):
+    """Event time as the InfluxDB client renders record times."""
+    return str(datetime.fromtimestamp(ts, timezone.utc))
+
+
+def parse_cursor(cursor):
+    """
+    (ns, seen) from a "ns:seen" cursor; ValueError if malformed. seen is how
+    many events at exactly ns the previous pages returned.
+    """
+    ns, sep, seen = str(cursor).partition(":")
+    if not sep:
+        raise ValueError(f"bad cursor {cursor!r}")
+    ns, seen = int(ns), int(seen)
+    if seen < 0:
+        raise ValueError(f"bad cursor {cursor!r}")
+    return ns, seen
+
+
+def next_cursor(page, before=None):
+    """Cursor continuing after the last event of a full page (newest first)."""
+    last = page[-1]["time_ns"]
+    seen = sum(1 for event in page if event["time_ns"] == last)
+    if before is not None and before[0] == last:
+        seen += before[1]
+    return f"{last}:{seen}"
+
+
+class EventIndex:
+    """
+    In-memory index of recent alarm events, oldest first, capped at capacity.
+    Fed from on_message as events arrive and backfilled once from InfluxDB.
+    Queries are served from memory for any range that starts at or after
+    covered_from (the point since which the index has seen every event).
+    Events at the same nanosecond are ordered by (pi_id, event), so a page
+    can end between them: cursors are "ns:seen" (see parse_cursor), and the
+    next_cursor of a page passed as `before` gives the following, older page.
+    """
+
+    def __init__(self, capacity=10000, covered_from=None):
+        self.capacity = capacity
+        self.covered_from = covered_from
+        self._keys = []         # (ns, pi_id, event), sorted; unique, so backfill duplicates are dropped
+        self._events = []       # same order as _keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, pi_id, event, ts):
+        # Microsecond precision, as InfluxDB records come back (Python datetimes),
+        # so backfilled copies dedupe against live events and cursors match the fallback
+        ns = round(ts * 1e6) * 1000
+        key = (ns, pi_id, event)
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                return False
+            self._keys.insert(i, key)
+            self._events.insert(i, {"time": format_time(ts), "event": event,
+                                    "field": "value_str", "pi_id": pi_id, "time_ns": ns})
+            # Trim in chunks so a full index does not shift the list on every add
+            if len(self._events) > self.capacity + self.capacity // 8:
+                self._evict(len(self._events) - self.capacity)
+            return True
+
+    def _evict(self, n):
+        # Everything after the newest evicted event is still complete
+        self.covered_from = max(self.covered_from or 0, (self._keys[n - 1][0] + 1) / 1e9)
+        del self._keys[:n]
+        del self._events[:n]
+
+    def covers(self, start):
+        return self.covered_from is not None and start >= self.covered_from
+
+    def query(self, start, end=None, before=None, limit=50, pi_id=None):
+        """
+        Newest-first events with start <= time < end, continuing after
+        `before` (a parse_cursor() result), as (events, next_cursor);
+        next_cursor is None on the last page.
+        """
+        lo = int(start * 1e9)
+        hi = int(end * 1e9) if end is not None else None
+        if before is not None:
+            if hi is not None and hi <= before[0]:
+                before = None
+        out = []
+        with self._lock:
+            first = bisect.bisect_left(self._keys, (lo,))
+            if before is not None:
+                # Resume below the events at ns the previous pages returned
+                ns, seen = before
+                run_start = bisect.bisect_left(self._keys, (ns,))
+                i = bisect.bisect_left(self._keys, (ns + 1,))
+                while seen and i > run_start:
+                    i -= 1
+                    if pi_id is None or self._events[i]["pi_id"] == pi_id:
+                        seen -= 1
+            else:
+                i = len(self._keys) if hi is None else bisect.bisect_left(self._keys, (hi,))
+            while i > first and len(out) <= limit:
+                i -= 1
+                event = self._events[i]
+                if pi_id is None or event["pi_id"] == pi_id:
+                    out.append(event)
+        if len(out) > limit:
+            return out[:limit], next_cursor(out[:limit], before)
+        return out, None
@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+
+INFLUX_POINTS = REGISTRY.counter("iot_influx_points_total", "Points written to InfluxDB, by outcome", ("outcome",))
+INFLUX_FLUSH_SECONDS = REGISTRY.histogram(
+    "iot_influx_flush_seconds", "InfluxDB batch write latency, retries included")
+
+
+class InfluxBatchWriter:
+    """
+    Background InfluxDB write pipeline.
+    Points are queued by the MQTT thread and written by a daemon thread as
+    line-protocol batches, flushed when the batch is full or old enough.
+    Failed batches are retried with exponential backoff.
+    """
+
+    def __init__(self, write_api, bucket, org, batch_size=500, flush_interval=1.0,
+                 max_queue_size=10000, put_timeout=0.05, max_retries=5,
+                 retry_base_delay=0.5, retry_max_delay=10.0):
+        self.write_api = write_api
+        self.bucket = bucket
+        self.org = org
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        # Bounded queue: producers block for at most put_timeout, then drop
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "points_queued": 0,
+            "points_written": 0,
+            "points_dropped": 0,
+            "batches_written": 0,
+            "batches_failed": 0,
+            "retries": 0,
+            "last_flush_latency_ms": 0.0,
+            "max_flush_latency_ms": 0.0,
+            "total_flush_latency_ms": 0.0,
+        }
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the writer daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"[InfluxDB] Batch writer started (batch: {self.batch_size}, "
+              f"interval: {self.flush_interval}s)")
+
+    def stop(self, timeout=5.0):
+        """Stop the writer, flushing whatever is still queued."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        print("[InfluxDB] Batch writer stopped")
+
+    def write(self, point):
+        """
+        Queue a Point (or line-protocol string) for writing.
+        Returns False if the queue stayed full for put_timeout and the point was dropped.
+        """
+        record = point if isinstance(point, str) else point.to_line_protocol()
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["points_dropped"] += 1
+            INFLUX_POINTS.labels("dropped").inc()
+            return False
+        with self._stats_lock:
+            self._stats["points_queued"] += 1
+        return True
+
+    def get_stats(self):
+        """Return a snapshot of queue depth and flush metrics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches_written"] + stats["batches_failed"]
+        stats["avg_flush_latency_ms"] = (
+            round(stats.pop("total_flush_latency_ms") / batches, 3) if batches else 0.0
+        )
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        return stats
+
+    def _run(self):
+        batch = []
+        batch_started = None
+
+        while True:
+            stopping = self._stop_event.is_set()
+            if stopping and self._queue.empty():
+                break
+
+            # Wait at most until the current batch becomes due
+            if batch_started is None:
+                timeout = self.flush_interval
+            else:
+                timeout = max(0.0, batch_started + self.flush_interval - time.monotonic())
+            try:
+                record = self._queue.get(timeout=0 if stopping else timeout)
+                if batch_started is None:
+                    batch_started = time.monotonic()
+                batch.append(record)
+            except queue.Empty:
+                pass
+
+            if not batch:
+                continue
+            due = time.monotonic() - batch_started >= self.flush_interval
+            if len(batch) >= self.batch_size or due:
+                self._flush(batch)
+                batch = []
+                batch_started = None
+
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        body = "\n".join(batch)
+        delay = self.retry_base_delay
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_api.write(bucket=self.bucket, org=self.org, record=body)
+                self._record_flush(start, len(batch), ok=True)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"[InfluxDB] Dropping batch of {len(batch)} points after "
+                          f"{attempt + 1} attempts: {e}")
+                    break
+                print(f"[InfluxDB] Write error (retry in {delay:.1f}s): {e}")
+                with self._stats_lock:
+                    self._stats["retries"] += 1
+                # Shutdown cuts the backoff short; the final attempt still runs
+                self._stop_event.wait(timeout=delay)
+                delay = min(delay * 2, self.retry_max_delay)
+
+        self._record_flush(start, len(batch), ok=False)
+
+    def _record_flush(self, start, count, ok):
+        latency = time.perf_counter() - start
+        latency_ms = latency * 1000
+        INFLUX_FLUSH_SECONDS.observe(latency)
+        INFLUX_POINTS.labels("written" if ok else "dropped").inc(count)
+        with self._stats_lock:
+            if ok:
+                self._stats["points_written"] += count
+                self._stats["batches_written"] += 1
+            else:
+                self._stats["points_dropped"] += count
+                self._stats["batches_failed"] += 1
+            self._stats["last_flush_latency_ms"] = round(latency_ms, 3)
+            self._stats["max_flush_latency_ms"] = max(
+                self._stats["max_flush_latency_ms"], round(latency_ms, 3))
+            self._stats["total_flush_latency_ms"] += latency_ms
@@ -0,0 +1,231 @@
+import bisect
+import threading
+
+# Upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Upper bounds, in seconds (for /metrics, where durations are in seconds)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shard(threading.local):
+    """One list of slots per observing thread; readers sum the shards."""
+
+    def __init__(self, size, shards):
+        self.values = [0] * size
+        shards.append(self.values)
+
+
+class _Metric:
+    """
+    Base of the metric types. A metric with labelnames is a family: its
+    labels(*values) children hold the values. Writers only touch their own
+    thread's shard, so observing takes no lock and never contends.
+    """
+    kind = "untyped"
+
+    def __init__(self, name="", help="", labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new())
+        return child
+
+    def _new(self):
+        return type(self)(self.name, self.help)
+
+    def samples(self):
+        """(suffix, labels, value) of every series of the metric."""
+        if not self.labelnames:
+            yield from self._samples({})
+            return
+        for values, child in list(self._children.items()):
+            yield from child._samples(dict(zip(self.labelnames, values)))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name="", help="", labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._shards = []
+        self._local = _Shard(1, self._shards)
+
+    def inc(self, n=1):
+        self._local.values[0] += n
+
+    @property
+    def value(self):
+        return sum(shard[0] for shard in self._shards)
+
+    def _samples(self, labels):
+        yield "", labels, self.value
+
+
+class Gauge(_Metric):
+    """The last value set, or fn() read at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name="", help="", labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self.fn() if self.fn is not None else self._value
+
+    def _samples(self, labels):
+        yield "", labels, self.value
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram: observe() is a bisect and a few increments.
+    Percentiles are estimated as the upper bound of the bucket they fall in
+    (the largest value seen, for the overflow bucket).
+    """
+    kind = "histogram"
+
+    def __init__(self, name="", help="", labelnames=(), buckets=LATENCY_BUCKETS_MS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._shards = []
+        # Bucket counts, +Inf, sum, max
+        self._local = _Shard(len(self.buckets) + 3, self._shards)
+
+    def _new(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value):
+        values = self._local.values
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        if value > values[-1]:
+            values[-1] = value
+
+    @property
+    def counts(self):
+        counts = [0] * (len(self.buckets) + 1)
+        for shard in list(self._shards):
+            for i, n in enumerate(shard[:-2]):
+                counts[i] += n
+        return counts
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def sum(self):
+        return sum(shard[-2] for shard in list(self._shards))
+
+    @property
+    def max(self):
+        return max((shard[-1] for shard in list(self._shards)), default=0.0)
+
+    def percentile(self, p, counts=None):
+        counts = counts or self.counts
+        total = sum(counts)
+        if not total:
+            return None
+        top = self.max
+        rank = p * total
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if seen >= rank:
+                return round(min(bound, top), 3)
+        return round(top, 3)
+
+    def snapshot(self):
+        counts = self.counts
+        count = sum(counts)
+        return {
+            "count": count,
+            "mean": round(self.sum / count, 3) if count else None,
+            "p50": self.percentile(0.5, counts),
+            "p90": self.percentile(0.9, counts),
+            "p99": self.percentile(0.99, counts),
+            "max": round(self.max, 3),
+            "buckets": {**{str(b): n for b, n in zip(self.buckets, counts)}, "+Inf": counts[-1]},
+        }
+
+    def _samples(self, labels):
+        counts = self.counts
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        cumulative += counts[-1]
+        yield "_bucket", {**labels, "le": "+Inf"}, cumulative
+        yield "_sum", labels, self.sum
+        yield "_count", labels, cumulative
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """
+    Named metrics of the server, rendered for /metrics in the Prometheus
+    text exposition format. Registering an existing name returns the
+    metric already registered.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._register(Gauge(name, help, labelnames, fn=fn))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets=buckets))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the server modules
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+from metrics import REGISTRY
+
+WEBCAM_FRAMES = REGISTRY.counter("iot_webcam_frames_total", "Frames published to MJPEG stream viewers")
+WEBCAM_FRAMES_SKIPPED = REGISTRY.counter(
+    "iot_webcam_frames_skipped_total", "Frames slow MJPEG viewers skipped to stay on the newest")
+WEBCAM_PUBLISH_SECONDS = REGISTRY.histogram(
+    "iot_webcam_publish_seconds", "Time to build a frame's multipart chunk and wake the viewers")
+
+
+class MJPEGBroadcaster:
+    """
+    Single-producer fan-out for a multipart MJPEG stream.
+
+    One producer task per camera reads frame_source() at fps, builds the
+    multipart chunk once per new frame and wakes all subscribers through an
+    asyncio.Condition. Subscribers always take the newest chunk, so a slow
+    client skips frames instead of queueing them. Unchanged frames are not
+    resent, except every keepalive seconds. The producer only runs while at
+    least one client is subscribed.
+
+    frame_source() returns (frame_bytes, content_type) or (None, None).
+    wake() makes the producer pick up a new frame immediately instead of at
+    the next tick; on_subscribers(count) is called when the viewer count
+    changes. A new subscriber is not sent a chunk older than max_age seconds
+    (left over from an earlier producer run); it waits for a fresh one.
+    """
+
+    def __init__(self, frame_source, fps=10, keepalive=1.0, boundary=b"frame",
+                 on_subscribers=None, max_age=None):
+        self.frame_source = frame_source
+        self.on_subscribers = on_subscribers
+        self.fps = fps
+        self.keepalive = keepalive
+        self.boundary = boundary
+        self.max_age = max_age
+        self.frames_produced = 0
+        self.frames_skipped = 0
+        self._cond = asyncio.Condition()
+        self._wake = asyncio.Event()
+        self._seq = 0
+        self._chunk = None
+        self._chunk_at = 0.0
+        self._last_frame = None
+        self._last_sent = 0.0
+        self._subscribers = 0
+        self._task = None
+
+    @property
+    def media_type(self):
+        return f"multipart/x-mixed-replace; boundary={self.boundary.decode()}"
+
+    def _build_chunk(self, frame, content_type):
+        return (b"--" + self.boundary + b"\r\nContent-Type: " + content_type.encode()
+                + b"\r\n\r\n" + frame + b"\r\n")
+
+    async def publish(self, frame, content_type):
+        """Make frame the current chunk and wake subscribers."""
+        start = time.perf_counter()
+        chunk = self._build_chunk(frame, content_type)
+        async with self._cond:
+            self._chunk = chunk
+            self._chunk_at = time.monotonic()
+            self._seq += 1
+            self.frames_produced += 1
+            self._cond.notify_all()
+        WEBCAM_FRAMES.inc()
+        WEBCAM_PUBLISH_SECONDS.observe(time.perf_counter() - start)
+
+    async def _produce(self):
+        interval = 1.0 / self.fps
+        while True:
+            self._wake.clear()
+            frame, content_type = self.frame_source()
+            now = time.monotonic()
+            if frame is not None and (frame is not self._last_frame
+                                      or now - self._last_sent >= self.keepalive):
+                self._last_frame = frame
+                self._last_sent = now
+                await self.publish(frame, content_type)
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def wake(self):
+        """A new frame is available; call on the event loop thread."""
+        self._wake.set()
+
+    def _notify_subscribers(self):
+        if self.on_subscribers is not None:
+            try:
+                self.on_subscribers(self._subscribers)
+            except Exception as e:
+                print(f"[Webcam] Subscriber callback error: {e}")
+
+    async def subscribe(self):
+        """Async generator of multipart chunks for one client."""
+        self._subscribers += 1
+        self._notify_subscribers()
+        if self._task is None or self._task.done():
+            if self._task is not None and not self._task.cancelled() and self._task.exception():
+                print(f"[Webcam] Producer failed: {self._task.exception()!r}, restarting")
+            if self._subscribers == 1:
+                # Nobody is waiting yet: rebind the primitives to the running
+                # loop. With viewers already waiting, keep them, or those
+                # waiters would never be notified again.
+                self._cond = asyncio.Condition()
+                self._wake = asyncio.Event()
+            self._last_frame = None
+            self._task = asyncio.create_task(self._produce())
+        seen = 0
+        if (self._chunk is not None and self.max_age is not None
+                and time.monotonic() - self._chunk_at > self.max_age):
+            seen = self._seq  # stale: wait for the producer's next chunk
+        try:
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: self._seq != seen)
+                    if seen and self._seq - seen > 1:
+                        self.frames_skipped += self._seq - seen - 1
+                        WEBCAM_FRAMES_SKIPPED.inc(self._seq - seen - 1)
+                    chunk, seen = self._chunk, self._seq
+                yield chunk
+        finally:
+            self._subscribers -= 1
+            self._notify_subscribers()
+            if self._subscribers == 0 and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def get_stats(self):
+        return {
+            "subscribers": self._subscribers,
+            "frames_produced": self.frames_produced,
+            "frames_skipped": self.frames_skipped,
+        }
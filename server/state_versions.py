@@ -0,0 +1,54 @@
+import threading
+import uuid
+
+
+class StateVersions:
+    """
+    Monotonic version counter for server state.
+    Every change to a tracked key (alarm, people, a sensor id, ...) bumps the
+    global version and records it against the key, so clients can be sent
+    only the keys that changed since a version they already have.
+    The epoch changes on every server start; versions from another epoch are invalid.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._lock = threading.Lock()
+        self._key_versions = {}
+        self._fingerprints = {}
+
+    def touch(self, key):
+        """Record a change of key unconditionally."""
+        with self._lock:
+            self.version += 1
+            self._key_versions[key] = self.version
+            return self.version
+
+    def touch_many(self, keys):
+        """touch() for several keys at once: they share one new version."""
+        with self._lock:
+            self.version += 1
+            for key in keys:
+                self._key_versions[key] = self.version
+            return self.version
+
+    def update(self, key, state, ignore=("timestamp",)):
+        """Record a change of key only if its values (minus ignored fields) differ."""
+        fingerprint = tuple(v for k, v in state.items() if k not in ignore)
+        with self._lock:
+            if self._fingerprints.get(key) == fingerprint:
+                return False
+            self._fingerprints[key] = fingerprint
+            self.version += 1
+            self._key_versions[key] = self.version
+            return True
+
+    def is_valid(self, epoch, version):
+        """True if (epoch, version) refers to a point in this server's history."""
+        return epoch == self.epoch and 0 <= version <= self.version
+
+    def changed_since(self, version):
+        """Return the keys changed after version."""
+        with self._lock:
+            return [k for k, v in self._key_versions.items() if v > version]
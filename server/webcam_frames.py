@@ -0,0 +1,37 @@
+"""
+Simulated webcam test pattern and the device frame uplink format.
+
+The pattern only ever has five distinct frames (one per colour), so they are
+rendered once into immutable bytes and every viewer is served the same
+object. The renderer lives in webcam_pattern.py, shared with the device
+simulator.
+"""
+import struct
+import time
+
+from webcam_pattern import COLORS, HAS_NUMPY, render_test_pattern  # noqa: F401
+
+
+class SimulatedFrameCache:
+    """The five pre-rendered test frames; current() cycles colour once per second."""
+
+    def __init__(self):
+        self.frames = tuple(render_test_pattern(r, g, b) for r, g, b in COLORS)
+
+    def current(self, now=None):
+        t = int(time.time() if now is None else now)
+        return self.frames[t % len(self.frames)]
+
+
+# Binary frame uplink from the device (must match webcam_uplink.py on the Pi)
+FRAME_MAGIC = b"WFR1"
+FRAME_HEADER = struct.Struct("<4sBdI")  # magic, content type, capture time, sequence
+CONTENT_TYPES = {0: "image/jpeg", 1: "image/bmp"}
+
+
+def unpack_frame(payload):
+    """Split an uplink message into (frame, content_type, captured_at, seq), or None."""
+    if len(payload) <= FRAME_HEADER.size or payload[:4] != FRAME_MAGIC:
+        return None
+    _, kind, captured_at, seq = FRAME_HEADER.unpack_from(payload)
+    return payload[FRAME_HEADER.size:], CONTENT_TYPES.get(kind, "image/jpeg"), captured_at, seq
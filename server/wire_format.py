@@ -0,0 +1,227 @@
+"""
+Compact binary encoding for MQTT sensor batches.
+
+A columnar alternative to the JSON batch payload. Strings (pi_id, device
+name, sensor ids, measurements, units, string values, object keys) are
+interned once per batch, per-reading metadata is stored as fixed-width
+columns, and values go into typed columns (int64, float64, string index).
+JSON-object string values such as DHT and gyroscope readings are stored as
+typed objects instead of JSON text nested inside the payload.
+
+Payloads start with MAGIC so receivers can tell them apart from JSON.
+server/wire_format.py is a copy of this module, since the server image is
+built from server/ only; keep the two identical.
+"""
+import json
+import struct
+
+MAGIC = b"PIC1"
+VERSION = 1
+
+T_NULL, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_OBJ = range(7)
+
+_HEADER = struct.Struct("<4sBd")
+_ENVELOPE = struct.Struct("<HHI")
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+_NO_TIMESTAMP = 0xFFFFFFFF
+
+
+def is_compact(payload):
+    """True if payload is a compact binary batch."""
+    return payload[:4] == MAGIC
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+        self.tags = bytearray()
+        self.ints = []
+        self.floats = []
+        self.str_refs = []
+        self.objects = bytearray()
+
+    def intern(self, s):
+        idx = self._index.get(s)
+        if idx is None:
+            idx = len(self.strings)
+            self._index[s] = idx
+            self.strings.append(s)
+        return idx
+
+    def value(self, v, parse_json=True):
+        if v is None:
+            self.tags.append(T_NULL)
+        elif v is True:
+            self.tags.append(T_TRUE)
+        elif v is False:
+            self.tags.append(T_FALSE)
+        elif isinstance(v, int) and _INT64_MIN <= v <= _INT64_MAX:
+            self.tags.append(T_INT)
+            self.ints.append(v)
+        elif isinstance(v, (int, float)):
+            self.tags.append(T_FLOAT)
+            self.floats.append(float(v))
+        elif isinstance(v, dict) and len(v) < 256:
+            self.tags.append(T_OBJ)
+            self.objects.append(len(v))
+            for key, item in v.items():
+                self.objects += struct.pack("<H", self.intern(str(key)))
+                self.value(item, parse_json=False)
+        elif isinstance(v, str):
+            # JSON object strings become typed objects
+            if parse_json and v.startswith("{"):
+                try:
+                    obj = json.loads(v)
+                except ValueError:
+                    obj = None
+                if isinstance(obj, dict):
+                    self.value(obj, parse_json=False)
+                    return
+            self.tags.append(T_STR)
+            self.str_refs.append(self.intern(v))
+        else:
+            self.tags.append(T_STR)
+            self.str_refs.append(self.intern(json.dumps(v)))
+
+
+def encode_batch(pi_id, device_name, readings, batch_timestamp):
+    """
+    Encode a batch of readings (dicts as queued by MQTTPublisher.queue_data).
+    Per-reading pi_id and device_name are taken from the envelope.
+    """
+    enc = _Encoder()
+    pi_idx = enc.intern(pi_id)
+    dev_idx = enc.intern(device_name)
+
+    n = len(readings)
+    sensors, measurements, units, flags = [], [], [], bytearray()
+    stamps = [r["timestamp"] for r in readings if r.get("timestamp") is not None]
+    base_ts = min(stamps) if stamps else batch_timestamp
+    offsets = []
+    for r in readings:
+        sensors.append(enc.intern(r["sensor_id"]))
+        measurements.append(enc.intern(r["measurement"]))
+        units.append(enc.intern(r.get("unit", "")))
+        flags.append(1 if r.get("simulated") else 0)
+        ts = r.get("timestamp")
+        offsets.append(_NO_TIMESTAMP if ts is None else int(round((ts - base_ts) * 1000)))
+        enc.value(r.get("value"))
+
+    parts = [_HEADER.pack(MAGIC, VERSION, batch_timestamp), struct.pack("<H", len(enc.strings))]
+    for s in enc.strings:
+        raw = s.encode("utf-8")
+        parts.append(struct.pack("<H", len(raw)))
+        parts.append(raw)
+    parts.append(_ENVELOPE.pack(pi_idx, dev_idx, n))
+    parts.append(struct.pack(f"<{n}H{n}H{n}H", *sensors, *measurements, *units))
+    parts.append(bytes(flags))
+    parts.append(struct.pack(f"<d{n}I", base_ts, *offsets))
+    parts.append(struct.pack("<III", len(enc.tags), len(enc.ints), len(enc.floats)))
+    parts.append(bytes(enc.tags))
+    parts.append(struct.pack(f"<{len(enc.ints)}q{len(enc.floats)}d", *enc.ints, *enc.floats))
+    parts.append(struct.pack(f"<I{len(enc.str_refs)}H", len(enc.str_refs), *enc.str_refs))
+    parts.append(struct.pack("<I", len(enc.objects)))
+    parts.append(bytes(enc.objects))
+    return b"".join(parts)
+
+
+class _Decoder:
+    def __init__(self, strings, tags, ints, floats, str_refs, objects):
+        self.strings = strings
+        self.tags = tags
+        self.ints = iter(ints)
+        self.floats = iter(floats)
+        self.str_refs = iter(str_refs)
+        self.objects = objects
+        self.tag_pos = 0
+        self.obj_pos = 0
+
+    def value(self):
+        tag = self.tags[self.tag_pos]
+        self.tag_pos += 1
+        if tag == T_INT:
+            return next(self.ints)
+        if tag == T_FLOAT:
+            return next(self.floats)
+        if tag == T_STR:
+            return self.strings[next(self.str_refs)]
+        if tag == T_OBJ:
+            count = self.objects[self.obj_pos]
+            self.obj_pos += 1
+            obj = {}
+            for _ in range(count):
+                (key_idx,) = struct.unpack_from("<H", self.objects, self.obj_pos)
+                self.obj_pos += 2
+                obj[self.strings[key_idx]] = self.value()
+            return obj
+        if tag == T_TRUE:
+            return True
+        if tag == T_FALSE:
+            return False
+        return None
+
+
+def decode_batch(payload):
+    """
+    Decode a compact batch into the same shape as the JSON batch payload.
+    Object values are returned as dicts rather than JSON strings.
+    """
+    magic, version, batch_ts = _HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported compact batch (magic={magic!r}, version={version})")
+    pos = _HEADER.size
+
+    (n_strings,) = struct.unpack_from("<H", payload, pos)
+    pos += 2
+    strings = []
+    for _ in range(n_strings):
+        (length,) = struct.unpack_from("<H", payload, pos)
+        pos += 2
+        strings.append(payload[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    pi_idx, dev_idx, n = _ENVELOPE.unpack_from(payload, pos)
+    pos += _ENVELOPE.size
+    meta = struct.unpack_from(f"<{n}H{n}H{n}H", payload, pos)
+    pos += 6 * n
+    flags = payload[pos:pos + n]
+    pos += n
+    (base_ts, *offsets) = struct.unpack_from(f"<d{n}I", payload, pos)
+    pos += 8 + 4 * n
+    n_tags, n_ints, n_floats = struct.unpack_from("<III", payload, pos)
+    pos += 12
+    tags = payload[pos:pos + n_tags]
+    pos += n_tags
+    numbers = struct.unpack_from(f"<{n_ints}q{n_floats}d", payload, pos)
+    pos += 8 * (n_ints + n_floats)
+    (n_refs,) = struct.unpack_from("<I", payload, pos)
+    pos += 4
+    str_refs = struct.unpack_from(f"<{n_refs}H", payload, pos)
+    pos += 2 * n_refs
+    (obj_len,) = struct.unpack_from("<I", payload, pos)
+    pos += 4
+    objects = payload[pos:pos + obj_len]
+
+    dec = _Decoder(strings, tags, numbers[:n_ints], numbers[n_ints:], str_refs, objects)
+    pi_id, device_name = strings[pi_idx], strings[dev_idx]
+    readings = []
+    for i in range(n):
+        offset = offsets[i]
+        readings.append({
+            "measurement": strings[meta[n + i]],
+            "sensor_id": strings[meta[i]],
+            "pi_id": pi_id,
+            "device_name": device_name,
+            "value": dec.value(),
+            "simulated": bool(flags[i]),
+            "unit": strings[meta[2 * n + i]],
+            "timestamp": None if offset == _NO_TIMESTAMP else base_ts + offset / 1000.0,
+        })
+
+    return {
+        "pi_id": pi_id,
+        "device_name": device_name,
+        "batch_timestamp": batch_ts,
+        "readings": readings,
+    }
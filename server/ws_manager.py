@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from fastapi import WebSocket
+
+from metrics import REGISTRY
+
+WS_BROADCASTS = REGISTRY.counter("iot_ws_broadcasts_total", "Messages broadcast to WebSocket clients")
+WS_BROADCAST_SECONDS = REGISTRY.histogram(
+    "iot_ws_broadcast_seconds", "Time to serialize a broadcast and queue it for every client")
+WS_MESSAGES_DROPPED = REGISTRY.counter(
+    "iot_ws_messages_dropped_total", "Queued WebSocket messages dropped for slow clients")
+
+
+class ClientConnection:
+    """
+    A connected WebSocket client with its own bounded outbound queue.
+    When the client falls behind, the oldest queued messages are dropped and
+    the client is flagged for a state resync from its last acknowledged version.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue=64, acked_version=0):
+        self.websocket = websocket
+        self.dropped = 0
+        self.acked_version = acked_version
+        self.needs_resync = False
+        self.task = None
+        self._queue = deque(maxlen=max_queue)
+        self._ready = asyncio.Event()
+
+    def enqueue(self, text):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+            WS_MESSAGES_DROPPED.inc()
+            self.needs_resync = True
+        self._queue.append(text)
+        self._ready.set()
+
+    def queue_depth(self):
+        return len(self._queue)
+
+    async def run(self):
+        """Writer task: send queued messages until the socket fails."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._queue:
+                await self.websocket.send_text(self._queue.popleft())
+
+
+class ConnectionManager:
+    """
+    WebSocket fan-out. Each message is serialized once and handed to every
+    client's queue, so a slow client never delays the others. Published state
+    updates are coalesced per topic over frame_interval seconds.
+    resync_builder(version) returns the state delta sent to a client that
+    dropped messages, starting from the version it last acknowledged.
+    """
+
+    def __init__(self, frame_interval=0.1, client_queue_size=64, resync_builder=None):
+        self.frame_interval = frame_interval
+        self.client_queue_size = client_queue_size
+        self.resync_builder = resync_builder
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self._pending = {}  # topic -> coalesced message
+        self._flush_handle = None
+
+    async def connect(self, websocket: WebSocket, acked_version=0):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.client_queue_size, acked_version)
+        self.active_connections[websocket] = client
+        client.task = asyncio.create_task(self._run_client(client))
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    async def _run_client(self, client):
+        try:
+            await client.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(client.websocket)
+
+    def ack(self, websocket: WebSocket, version):
+        """Record the latest state version a client has applied."""
+        client = self.active_connections.get(websocket)
+        if client and version > client.acked_version:
+            client.acked_version = version
+
+    def send(self, websocket: WebSocket, data: dict):
+        """Queue a message for a single client."""
+        client = self.active_connections.get(websocket)
+        if client:
+            client.enqueue(json.dumps(data))
+
+    def broadcast(self, data: dict):
+        """Serialize once and queue for every client immediately."""
+        if not self.active_connections:
+            return
+        start = time.perf_counter()
+        text = json.dumps(data)
+        for client in list(self.active_connections.values()):
+            client.enqueue(text)
+        WS_BROADCASTS.inc()
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def publish(self, data: dict):
+        """
+        Queue a state update for the next frame. Updates for the same topic
+        within a frame are merged: readings are concatenated and the latest
+        state wins. Must be called from the event loop thread.
+        """
+        key = data.get("topic")
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = dict(data, readings=list(data.get("readings", [])))
+        else:
+            readings = pending["readings"]
+            readings.extend(data.get("readings", []))
+            pending.update(data)
+            pending["readings"] = readings
+
+        if self.frame_interval <= 0:
+            self.flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.frame_interval, self.flush)
+
+    def flush(self):
+        """Broadcast all coalesced updates of the current frame."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for data in pending.values():
+            self.broadcast(data)
+        if self.resync_builder is None:
+            return
+        for client in list(self.active_connections.values()):
+            if client.needs_resync:
+                client.needs_resync = False
+                client.enqueue(json.dumps(self.resync_builder(client.acked_version)))
+
+    def get_stats(self):
+        return {
+            "clients": len(self.active_connections),
+            "dropped": sum(c.dropped for c in self.active_connections.values()),
+            "max_queue_depth": max(
+                (c.queue_depth() for c in self.active_connections.values()), default=0),
+        }
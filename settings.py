@@ -3,3 +3,16 @@ import json
 def load_settings(filePath='settings.json'):
     with open(filePath, 'r') as f:
         return json.load(f)
+
+
+def mqtt_namespace(settings):
+    """First MQTT topic level of this device (mqtt.namespace, default the lower-case pi_id)."""
+    pi_id = settings.get('device_info', {}).get('pi_id', 'PI1')
+    return settings.get('mqtt', {}).get('namespace') or pi_id.lower()
+
+
+def mqtt_topics(settings):
+    """The configured mqtt.topics, moved under this device's namespace."""
+    namespace = mqtt_namespace(settings)
+    return {key: f"{namespace}/{topic.split('/', 1)[1]}" if '/' in topic else topic
+            for key, topic in settings.get('mqtt', {}).get('topics', {}).items()}
@@ -1,22 +1,34 @@
 import time
 import random
 
+def make_button_simulator_step(callback):
+    """
+    Single-step version of run_button_simulator for the scheduler.
+    Returns a function that maybe toggles the door and returns the next delay.
+    """
+    state = [False]  # Start with door open
+
+    def step():
+        if random.random() > 0.5:
+            state[0] = not state[0]
+            callback(state[0])
+        return random.uniform(5, 15)
+    return step
+
+
 def run_button_simulator(callback, stop_event):
     """
     Simulates door sensor (button) behavior.
     Randomly changes between pressed (door closed) and released (door open).
     """
-    current_state = False  # Start with door open
-    
+    step = make_button_simulator_step(callback)
+    # Random delay between state changes (5-15 seconds)
+    delay = random.uniform(5, 15)
+
     while not stop_event.is_set():
-        # Random delay between state changes (5-15 seconds)
-        delay = random.uniform(5, 15)
         time.sleep(delay)
         
         if stop_event.is_set():
             break
         
-        # Toggle state randomly (simulating door opening/closing)
-        if random.random() > 0.5:
-            current_state = not current_state
-            callback(current_state)
+        delay = step()
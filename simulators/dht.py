@@ -2,13 +2,24 @@ import time
 import random
 
 
+def make_dht_simulator_step(callback):
+    """Returns a function performing one random-walk reading (scheduler step)."""
+    state = [random.uniform(20, 24), random.uniform(40, 55)]
+
+    def step():
+        # Gradual random walk
+        state[0] = max(18, min(28, state[0] + random.uniform(-0.3, 0.3)))
+        state[1] = max(30, min(70, state[1] + random.uniform(-1, 1)))
+        callback(round(state[0], 1), round(state[1], 1))
+    return step
+
+
 def run_dht_simulator(delay, callback, stop_event):
     """
     Simulates DHT temperature and humidity sensor.
     Produces realistic temperature (18-28C) and humidity (30-70%) values.
     """
-    temperature = random.uniform(20, 24)
-    humidity = random.uniform(40, 55)
+    step = make_dht_simulator_step(callback)
 
     while not stop_event.is_set():
         time.sleep(delay)
@@ -16,11 +27,4 @@ def run_dht_simulator(delay, callback, stop_event):
         if stop_event.is_set():
             break
 
-        # Gradual random walk
-        temperature += random.uniform(-0.3, 0.3)
-        temperature = max(18, min(28, temperature))
-
-        humidity += random.uniform(-1, 1)
-        humidity = max(30, min(70, humidity))
-
-        callback(round(temperature, 1), round(humidity, 1))
+        step()
@@ -44,20 +44,27 @@ BUTTON_ACTIONS = {
 }
 
 
+def ir_simulator_step(callback):
+    """
+    Single simulated remote press for the scheduler.
+    Returns the delay until the next press.
+    """
+    button = random.choice(list(BUTTON_ACTIONS.keys()))
+    callback(button, BUTTON_ACTIONS[button])
+    return random.uniform(3, 8)
+
+
 def run_ir_simulator(delay, callback, stop_event):
     """
     Simulates IR receiver sensor behavior.
     Randomly generates IR remote button presses.
     callback(button_name, action) is called on each press.
     """
-    buttons = list(BUTTON_ACTIONS.keys())
+    # Random delay between 3-8 seconds (simulate remote presses)
+    wait_time = random.uniform(3, 8)
 
     while not stop_event.is_set():
-        # Random delay between 3-8 seconds (simulate remote presses)
-        wait_time = random.uniform(3, 8)
         if stop_event.wait(timeout=wait_time):
             break
 
-        button = random.choice(buttons)
-        action = BUTTON_ACTIONS[button]
-        callback(button, action)
+        wait_time = ir_simulator_step(callback)
@@ -9,22 +9,29 @@ KEYPAD = [
     ['*', '0', '#', 'D']
 ]
 
+def membrane_switch_simulator_step(callback):
+    """
+    Single iteration of run_membrane_switch_simulator for the scheduler.
+    Returns the delay until the next possible key press.
+    """
+    # 50% chance of a key press
+    if random.random() > 0.5:
+        callback(random.choice([key for row in KEYPAD for key in row]))
+    return random.uniform(3, 10)
+
+
 def run_membrane_switch_simulator(callback, stop_event):
     """
     Simulates membrane switch (4x4 keypad) behavior.
     Randomly simulates key presses.
     """
-    all_keys = [key for row in KEYPAD for key in row]
-    
+    # Random delay between key presses (3-10 seconds)
+    delay = random.uniform(3, 10)
+
     while not stop_event.is_set():
-        # Random delay between key presses (3-10 seconds)
-        delay = random.uniform(3, 10)
         time.sleep(delay)
         
         if stop_event.is_set():
             break
         
-        # 50% chance of a key press
-        if random.random() > 0.5:
-            key = random.choice(all_keys)
-            callback(key)
+        delay = membrane_switch_simulator_step(callback)
@@ -1,6 +1,12 @@
 import time
 import random
 
+def pir_simulator_step(callback):
+    """Single iteration of run_pir_simulator, for use with the scheduler."""
+    # 30% chance of detecting motion
+    callback(random.random() < 0.3)
+
+
 def run_pir_simulator(delay, callback, stop_event):
     """
     Simulates PIR motion sensor behavior.
@@ -12,6 +18,4 @@ def run_pir_simulator(delay, callback, stop_event):
         if stop_event.is_set():
             break
         
-        # 30% chance of detecting motion
-        motion_detected = random.random() < 0.3
-        callback(motion_detected)
+        pir_simulator_step(callback)
@@ -29,12 +29,22 @@ def generate_distance(initial_distance=100):
         yield distance
 
 
+def make_ultrasonic_simulator_step(callback):
+    """Returns a function that reports the next simulated distance (scheduler step)."""
+    distances = generate_distance()
+
+    def step():
+        callback(next(distances))
+    return step
+
+
 def run_ultrasonic_simulator(delay, callback, stop_event):
     """
     Runs the ultrasonic sensor simulator loop.
     """
-    for distance in generate_distance():
+    step = make_ultrasonic_simulator_step(callback)
+    while not stop_event.is_set():
         time.sleep(delay)
-        callback(distance)
         if stop_event.is_set():
             break
+        step()
@@ -1,23 +1,34 @@
 import time
 import threading
-import struct
-import random
+from functools import lru_cache
+
+from motion_gate import THUMB_SIZE, MotionGate
+from webcam_pattern import render_test_pattern
+
+
+@lru_cache(maxsize=None)
+def scene_thumbnail(r, g, b):
+    """Grayscale motion-gate thumbnail of the (uniform-looking) test scene."""
+    return bytes(((r * 299 + g * 587 + b * 114) // 1000,)) * (THUMB_SIZE[0] * THUMB_SIZE[1])
 
 
 class WebcamSimulator:
     """
     Simulates a webcam by generating simple JPEG-like frames.
     In simulation mode, generates a colored test pattern frame.
-    The frame changes color periodically to show it's live.
+    The frame changes color periodically to show it's live; the colour
+    change is what the motion gate sees as a scene change.
     """
 
-    def __init__(self, width=640, height=480, fps=10):
+    def __init__(self, width=640, height=480, fps=10, idle_fps=2, motion_threshold=1.5):
         self.width = width
         self.height = height
         self.fps = fps
+        self.motion = MotionGate(threshold=motion_threshold, idle_fps=idle_fps, active_fps=fps)
         self.running = False
         self._frame = None
         self._frame_lock = threading.Lock()
+        self._listeners = []
         self._thread = None
         self._stop_event = threading.Event()
 
@@ -37,6 +48,15 @@ class WebcamSimulator:
             self._thread.join(timeout=2)
         print("[WEBC Simulator] Webcam stopped")
 
+    def add_listener(self, fn):
+        """Call fn(frame, timestamp) from the capture thread for every new frame."""
+        self._listeners.append(fn)
+
+    def _notify(self, frame):
+        now = time.time()
+        for fn in self._listeners:
+            fn(frame, now)
+
     def get_frame(self):
         """Get the latest JPEG frame bytes."""
         with self._frame_lock:
@@ -51,51 +71,17 @@ class WebcamSimulator:
             (150, 0, 150),   # Purple
             (200, 200, 0),   # Yellow
         ]
-        color_idx = 0
-        frame_count = 0
 
         while not self._stop_event.is_set():
-            # Create a simple BMP image
-            r, g, b = colors[color_idx % len(colors)]
-
-            # Create a minimal valid JPEG-like BMP frame
-            frame = self._create_bmp_frame(r, g, b, frame_count)
-
-            with self._frame_lock:
-                self._frame = frame
-
-            frame_count += 1
-            if frame_count % (self.fps * 3) == 0:  # Change color every 3 seconds
-                color_idx += 1
-
-            time.sleep(1.0 / self.fps)
-
-    def _create_bmp_frame(self, r, g, b, frame_num):
-        """Create a minimal BMP image with a color and frame counter text area."""
-        w, h = 320, 240  # Smaller for simulation
-        row_size = (w * 3 + 3) & ~3  # Row padding to 4 bytes
-        pixel_data_size = row_size * h
-        file_size = 54 + pixel_data_size
-
-        # BMP Header
-        header = struct.pack('<2sIHHI', b'BM', file_size, 0, 0, 54)
-        # DIB Header
-        dib = struct.pack('<IiiHHIIiiII', 40, w, h, 1, 24, 0,
-                          pixel_data_size, 2835, 2835, 0, 0)
-
-        # Pixel data (BGR format, bottom-up)
-        rows = []
-        for y in range(h):
-            row = bytearray()
-            for x in range(w):
-                # Add a simple grid pattern
-                if (x // 40 + y // 40) % 2 == 0:
-                    row.extend([b, g, r])
-                else:
-                    row.extend([b // 2, g // 2, r // 2])
-            # Pad row to 4-byte boundary
-            while len(row) % 4 != 0:
-                row.append(0)
-            rows.append(bytes(row))
-
-        return header + dib + b''.join(rows)
+            started = time.monotonic()
+            # Current colour; changes every 3 seconds
+            r, g, b = colors[int(time.time() // 3) % len(colors)]
+
+            if self.motion.check(scene_thumbnail(r, g, b), started):
+                # Pre-rendered BMP test frame for this colour
+                frame = render_test_pattern(r, g, b)
+                with self._frame_lock:
+                    self._frame = frame
+                self._notify(frame)
+
+            self._stop_event.wait(max(0.0, 1.0 / self.motion.fps - (time.monotonic() - started)))
@@ -0,0 +1,293 @@
+"""
+Append-only on-disk spool for readings that could not be published.
+
+Each priority lane is a directory of numbered segment files. A record is a
+length + CRC32 header followed by the payload bytes; writes are appended to
+the lane's newest segment and fsync'ed in batches (at most once per
+fsync_interval, plus on sync()), so an SD card sees few, sequential writes.
+Readers take records from a per-lane cursor and commit() it once the
+records are safely delivered; fully consumed segments are deleted. The
+cursor is saved on commit, so after a crash records are replayed at least
+once, never lost.
+
+When the spool exceeds max_bytes, whole segments are evicted oldest first
+from the lowest-priority lane that has data, so alarm events outlive
+ultrasonic noise. On startup a torn record at the end of the newest
+segment (power loss mid-write) is truncated away.
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+RECORD_HEADER = struct.Struct("<II")  # payload length, CRC32
+SEGMENT_SUFFIX = ".seg"
+
+
+class _Lane:
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.segments = []      # segment ids, oldest first
+        self.sizes = {}         # segment id -> bytes
+        self.file = None        # append handle on the newest segment
+        self.read_segment = None
+        self.read_offset = 0
+        self.records = 0        # records pending (approximate after eviction/restart scan)
+        self.evicted = 0
+
+    def path(self, segment):
+        return os.path.join(self.directory, f"{segment:09d}{SEGMENT_SUFFIX}")
+
+    @property
+    def pending_bytes(self):
+        total = sum(self.sizes.values())
+        if self.read_segment in self.sizes:
+            total -= self.read_offset
+        return total
+
+
+class DiskSpool:
+    def __init__(self, directory, lanes=("high", "normal", "low"), max_bytes=64 * 1024 * 1024,
+                 segment_bytes=1024 * 1024, fsync_interval=1.0):
+        """lanes are listed from highest to lowest priority."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._dirty = set()
+        self.lanes = {}
+        for name in lanes:
+            lane = _Lane(name, os.path.join(directory, name))
+            os.makedirs(lane.directory, exist_ok=True)
+            self._recover(lane)
+            self.lanes[name] = lane
+
+    # ---- recovery ----
+    def _recover(self, lane):
+        lane.segments = sorted(int(n[:-len(SEGMENT_SUFFIX)]) for n in os.listdir(lane.directory)
+                               if n.endswith(SEGMENT_SUFFIX))
+        cursor_path = os.path.join(lane.directory, "cursor")
+        segment, offset = None, 0
+        try:
+            with open(cursor_path) as f:
+                cursor = json.load(f)
+            segment, offset = cursor["segment"], cursor["offset"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        for seg in list(lane.segments):
+            if segment is not None and seg < segment:
+                os.remove(lane.path(seg))
+                lane.segments.remove(seg)
+        for seg in lane.segments:
+            lane.sizes[seg] = os.path.getsize(lane.path(seg))
+        if lane.segments:
+            last = lane.segments[-1]
+            valid, _ = self._scan(lane.path(last))
+            if valid < lane.sizes[last]:
+                with open(lane.path(last), "r+b") as f:
+                    f.truncate(valid)
+                print(f"[SPOOL] {lane.name}: truncated torn record in segment {last}")
+                lane.sizes[last] = valid
+            if segment in lane.sizes:
+                lane.read_segment, lane.read_offset = segment, min(offset, lane.sizes[segment])
+            else:
+                lane.read_segment, lane.read_offset = lane.segments[0], 0
+            for seg in lane.segments:
+                start = lane.read_offset if seg == lane.read_segment else 0
+                lane.records += self._scan(lane.path(seg), start)[1]
+        if lane.records:
+            print(f"[SPOOL] {lane.name}: {lane.records} records pending from a previous run")
+
+    @staticmethod
+    def _scan(path, start=0):
+        """Return (end offset of the valid records, record count) of a segment file."""
+        valid, count = start, 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                valid += RECORD_HEADER.size + length
+                count += 1
+        return valid, count
+
+    # ---- writing ----
+    def _open_new_segment(self, lane):
+        if lane.file is not None:
+            lane.file.close()
+        seg = lane.segments[-1] + 1 if lane.segments else 1
+        lane.segments.append(seg)
+        lane.sizes[seg] = 0
+        lane.file = open(lane.path(seg), "ab")
+        if lane.read_segment is None:
+            lane.read_segment, lane.read_offset = seg, 0
+
+    def append(self, lane_name, payload):
+        self.append_many([(lane_name, payload)])
+
+    def append_many(self, items):
+        """Append (lane, payload bytes) records; fsyncs if fsync_interval has passed."""
+        with self._lock:
+            for lane_name, payload in items:
+                lane = self.lanes[lane_name]
+                if lane.file is None and lane.segments and \
+                        lane.sizes[lane.segments[-1]] < self.segment_bytes:
+                    # Keep appending to the newest segment left by a previous run
+                    lane.file = open(lane.path(lane.segments[-1]), "ab")
+                elif lane.file is None or lane.sizes[lane.segments[-1]] >= self.segment_bytes:
+                    self._open_new_segment(lane)
+                lane.file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                lane.sizes[lane.segments[-1]] += RECORD_HEADER.size + len(payload)
+                lane.records += 1
+                self._dirty.add(lane)
+            self._evict()
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        for lane in self._dirty:
+            if lane.file is not None:
+                lane.file.flush()
+                os.fsync(lane.file.fileno())
+        self._dirty.clear()
+        self._last_sync = time.monotonic()
+
+    def _evict(self):
+        while self._pending_bytes() > self.max_bytes:
+            for lane in reversed(list(self.lanes.values())):
+                if lane.segments and lane.pending_bytes > 0:
+                    self._drop_oldest_segment(lane)
+                    break
+            else:
+                return
+
+    def _drop_oldest_segment(self, lane):
+        seg = lane.segments[0]
+        if seg == lane.segments[-1] and lane.file is not None:
+            # Only the active segment is left: seal it so it can go
+            self._open_new_segment(lane)
+        # Records before the cursor were already delivered
+        start = lane.read_offset if seg == lane.read_segment else 0
+        dropped = self._scan(lane.path(seg), start)[1]
+        os.remove(lane.path(seg))
+        lane.segments.pop(0)
+        del lane.sizes[seg]
+        lane.records = max(0, lane.records - dropped)
+        lane.evicted += dropped
+        if lane.read_segment == seg:
+            lane.read_segment = lane.segments[0] if lane.segments else None
+            lane.read_offset = 0
+            self._save_cursor(lane)
+
+    # ---- reading ----
+    def read(self, lane_name, max_records=500):
+        """
+        Next records of a lane as (payloads, position). Pass position to
+        commit() once they are delivered; reading again before committing
+        returns the same records.
+        """
+        with self._lock:
+            lane = self.lanes[lane_name]
+            while lane.read_segment is not None:
+                seg = lane.read_segment
+                if lane.file is not None and seg == lane.segments[-1]:
+                    lane.file.flush()
+                if lane.read_offset < lane.sizes[seg]:
+                    break
+                if seg == lane.segments[-1]:
+                    return [], None
+                # Fully consumed sealed segment
+                self._delete_consumed(lane)
+            else:
+                return [], None
+
+            payloads = []
+            with open(lane.path(seg), "rb") as f:
+                f.seek(lane.read_offset)
+                data = f.read(min(lane.sizes[seg] - lane.read_offset, 4 * 1024 * 1024))
+            remaining = lane.sizes[seg] - lane.read_offset
+            pos = 0
+            corrupt = False
+            while len(payloads) < max_records and pos < len(data):
+                if pos + RECORD_HEADER.size > remaining:
+                    corrupt = True
+                    break
+                length, crc = RECORD_HEADER.unpack_from(data, pos)
+                end = pos + RECORD_HEADER.size + length
+                if end > len(data):
+                    corrupt = end > remaining  # otherwise just the 4 MB read cap
+                    break
+                payload = data[pos + RECORD_HEADER.size:end]
+                if zlib.crc32(payload) != crc:
+                    corrupt = True
+                    break
+                payloads.append(payload)
+                pos = end
+            if corrupt:
+                print(f"[SPOOL] {lane.name}: skipping corrupt data at the end of segment {seg}")
+                pos = remaining
+            return payloads, (seg, lane.read_offset + pos, len(payloads))
+
+    def commit(self, lane_name, position):
+        with self._lock:
+            lane = self.lanes[lane_name]
+            seg, offset, count = position
+            if seg != lane.read_segment:
+                return  # segment was evicted meanwhile
+            lane.read_offset = offset
+            lane.records = max(0, lane.records - count)
+            if offset >= lane.sizes[seg]:
+                if seg != lane.segments[-1]:
+                    self._delete_consumed(lane)
+                elif lane.pending_bytes == 0:
+                    lane.records = 0  # resync the count after skipping corrupt data
+            self._save_cursor(lane)
+
+    def _delete_consumed(self, lane):
+        seg = lane.segments.pop(0)
+        del lane.sizes[seg]
+        os.remove(lane.path(seg))
+        lane.read_segment, lane.read_offset = lane.segments[0], 0
+
+    def _save_cursor(self, lane):
+        path = os.path.join(lane.directory, "cursor")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"segment": lane.read_segment, "offset": lane.read_offset}, f)
+        os.replace(path + ".tmp", path)
+
+    # ---- state ----
+    def _pending_bytes(self):
+        return sum(lane.pending_bytes for lane in self.lanes.values())
+
+    def pending_records(self):
+        with self._lock:
+            return sum(lane.records for lane in self.lanes.values())
+
+    def get_stats(self):
+        with self._lock:
+            return {name: {"records": lane.records, "kb": lane.pending_bytes // 1024,
+                           "evicted": lane.evicted}
+                    for name, lane in self.lanes.items()}
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            for lane in self.lanes.values():
+                if lane.file is not None:
+                    lane.file.close()
+                    lane.file = None
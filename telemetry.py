@@ -0,0 +1,156 @@
+"""
+Device self-telemetry: how well the controller keeps up with its own work.
+
+The Scheduler reports every task run (each periodic sensor loop) through
+record_loop(): the scheduling lag (how late the run started against its
+due time) and how long the callback took, into fixed-bucket histograms
+per task. Sources added with add_source() (the publisher's queue depth,
+high-water mark and drop counters) are read at report time, together with
+the CPU time each thread used (Linux /proc; skipped elsewhere) and the
+process thread count and memory.
+
+report() builds one compact batch covering the time since the previous
+report and starts a new window. main.py publishes it every minute on its
+own topic, so the server stores it in InfluxDB next to the sensor data
+(measurement "runtime") for Grafana.
+"""
+import bisect
+import os
+import threading
+import time
+
+from scheduler import process_stats
+
+# Upper bounds, in milliseconds
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram of milliseconds; percentiles are bucket upper bounds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= p * self.count:
+                return min(bound, round(self.max, 2))
+        return round(self.max, 2)
+
+
+class LoopStats:
+    def __init__(self):
+        self.lag = Histogram()
+        self.duration = Histogram()
+        self.errors = 0
+
+    def summary(self):
+        return {
+            "runs": self.lag.count,
+            "lag_p50_ms": self.lag.percentile(0.5),
+            "lag_p99_ms": self.lag.percentile(0.99),
+            "lag_max_ms": round(self.lag.max, 2),
+            "run_p50_ms": self.duration.percentile(0.5),
+            "run_p99_ms": self.duration.percentile(0.99),
+            "run_max_ms": round(self.duration.max, 2),
+            "errors": self.errors,
+        }
+
+
+def thread_cpu_times():
+    """{thread name: CPU seconds used} of this process' threads; {} without /proc."""
+    try:
+        tids = os.listdir("/proc/self/task")
+        ticks = os.sysconf("SC_CLK_TCK")
+    except (OSError, AttributeError, ValueError):
+        return {}
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    times = {}
+    for tid in tids:
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as f:
+                # Fields after the "(comm)" one; utime and stime are the 14th and 15th
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue  # thread exited
+        name = names.get(int(tid), f"native-{tid}")
+        times[name] = times.get(name, 0.0) + (int(fields[11]) + int(fields[12])) / ticks
+    return times
+
+
+class Telemetry:
+    def __init__(self, device_info=None):
+        self.device_info = device_info or {}
+        self._loops = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._cpu = thread_cpu_times()
+
+    def record_loop(self, name, lag, duration, failed=False):
+        """One run of a periodic task; lag and duration in seconds."""
+        with self._lock:
+            stats = self._loops.get(name)
+            if stats is None:
+                stats = self._loops[name] = LoopStats()
+            stats.lag.observe(max(0.0, lag) * 1000)
+            stats.duration.observe(duration * 1000)
+            if failed:
+                stats.errors += 1
+
+    def add_source(self, name, fn):
+        """fn() -> {key: {field: number}}, read at every report (e.g. queue stats)."""
+        self._sources[name] = fn
+
+    def report(self):
+        """The batch for the window since the last report, as a dict."""
+        now = time.monotonic()
+        with self._lock:
+            loops, self._loops = self._loops, {}
+        elapsed = max(now - self._window_start, 1e-9)
+        self._window_start = now
+
+        cpu = thread_cpu_times()
+        thread_cpu = {name: round((seconds - self._cpu.get(name, 0.0)) / elapsed * 100, 1)
+                      for name, seconds in cpu.items()}
+        self._cpu = cpu
+
+        timestamp = time.time()
+
+        def reading(sensor_id, value, unit):
+            return {"measurement": "runtime", "sensor_id": sensor_id, "value": value,
+                    "simulated": False, "unit": unit, "timestamp": timestamp}
+
+        readings = [reading(f"loop/{name}", stats.summary(), "ms")
+                    for name, stats in sorted(loops.items())]
+        for source, fn in self._sources.items():
+            try:
+                for key, fields in fn().items():
+                    readings.append(reading(f"{source}/{key}", fields, "count"))
+            except Exception as e:
+                print(f"[TELEMETRY] {source} stats error: {e}")
+        readings.extend(reading(f"thread/{name}", {"cpu_pct": pct}, "%")
+                        for name, pct in sorted(thread_cpu.items()))
+        ps = process_stats()
+        readings.append(reading("process", {
+            "threads": ps["threads"],
+            "rss_kb": ps["rss_kb"] or 0,
+            "cpu_pct": round(sum(thread_cpu.values()), 1),
+            "window_s": round(elapsed, 1),
+        }, "count"))
+        return {
+            "pi_id": self.device_info.get("pi_id"),
+            "device_name": self.device_info.get("device_name"),
+            "batch_timestamp": timestamp,
+            "readings": readings,
+        }
@@ -0,0 +1,185 @@
+import math
+import threading
+import time
+
+
+class Timeout:
+    """Handle for a callback scheduled on a TimerWheel."""
+
+    __slots__ = ("deadline", "fn", "args", "_wheel", "_bucket")
+
+    def __init__(self, wheel, deadline, fn, args):
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self._wheel = wheel
+        self._bucket = None
+
+    @property
+    def active(self):
+        return self._bucket is not None
+
+    def cancel(self):
+        """Cancel the callback. Returns False if it already fired or was cancelled."""
+        return self._wheel._cancel(self)
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel: one dispatcher thread for every timeout.
+
+    Replaces threading.Timer (a new OS thread per timeout) for door, grace,
+    arming and LED auto-off timeouts. Scheduling and cancelling are O(1):
+    a timeout goes into the slot of the lowest wheel level whose range covers
+    it and is cascaded to finer levels as time advances. Callbacks run on
+    the dispatcher thread, at most one tick (resolution seconds) late, so
+    they must not block.
+    """
+
+    def __init__(self, resolution=0.05, slots=64, levels=4):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._overflow = {}  # beyond the top level's range
+        self._count = 0
+        self._tick = 0
+        self._start = time.monotonic()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the dispatcher thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Stop the dispatcher; pending timeouts are dropped."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def schedule(self, delay, fn, *args):
+        """Call fn(*args) on the dispatcher thread after delay seconds. Returns a Timeout."""
+        with self._cond:
+            elapsed = time.monotonic() - self._start
+            if self._count == 0:
+                # Idle dispatcher: skip the empty ticks instead of replaying them
+                self._tick = max(self._tick, int(elapsed / self.resolution))
+            # Round the due time up to a tick so a timeout never fires early
+            deadline = max(self._tick + 1, math.ceil((elapsed + delay) / self.resolution))
+            timeout = Timeout(self, deadline, fn, args)
+            self._place(timeout)
+            self._count += 1
+            if self._count == 1:
+                self._cond.notify()
+        return timeout
+
+    def pending(self):
+        """Number of scheduled, not yet fired or cancelled timeouts."""
+        return self._count
+
+    def _current_tick(self):
+        return int((time.monotonic() - self._start) / self.resolution)
+
+    def _place(self, timeout):
+        # Lowest level where deadline and the current tick share the enclosing block
+        for level in range(self.levels):
+            upper = self._spans[level + 1]
+            if timeout.deadline // upper == self._tick // upper:
+                slot = (timeout.deadline // self._spans[level]) % self.slots
+                bucket = self._wheels[level][slot]
+                break
+        else:
+            bucket = self._overflow
+        bucket[timeout] = None
+        timeout._bucket = bucket
+
+    def _cancel(self, timeout):
+        with self._cond:
+            bucket = timeout._bucket
+            if bucket is None:
+                return False
+            del bucket[timeout]
+            timeout._bucket = None
+            self._count -= 1
+            return True
+
+    def _advance(self, target, expired):
+        """Advance the wheel up to target tick, collecting due timeouts."""
+        if self._count == 0:
+            self._tick = max(self._tick, target)
+            return
+        while self._tick < target:
+            self._tick += 1
+            # Cascade coarse levels first so entries fall through to level 0
+            if self._tick % self._spans[self.levels - 1] == 0 and self._overflow:
+                pending, self._overflow = self._overflow, {}
+                for timeout in pending:
+                    self._place(timeout)
+            for level in range(self.levels - 1, 0, -1):
+                if self._tick % self._spans[level]:
+                    continue
+                slot = (self._tick // self._spans[level]) % self.slots
+                bucket = self._wheels[level][slot]
+                if bucket:
+                    self._wheels[level][slot] = {}
+                    for timeout in bucket:
+                        self._place(timeout)
+            slot = self._tick % self.slots
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = {}
+                for timeout in bucket:
+                    timeout._bucket = None
+                    expired.append(timeout)
+                self._count -= len(bucket)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            expired = []
+            with self._cond:
+                self._advance(self._current_tick(), expired)
+                if not expired:
+                    if self._count == 0:
+                        self._cond.wait()
+                    else:
+                        next_at = self._start + (self._tick + 1) * self.resolution
+                        self._cond.wait(timeout=max(0.0, next_at - time.monotonic()))
+                    continue
+
+            for timeout in expired:
+                try:
+                    timeout.fn(*timeout.args)
+                except Exception as e:
+                    print(f"[TIMERS] Callback error: {e}")
+
+
+_timer_wheel = None
+_timer_wheel_lock = threading.Lock()
+
+
+def get_timer_wheel():
+    """Return the shared timer wheel, starting it on first use."""
+    global _timer_wheel
+    with _timer_wheel_lock:
+        if _timer_wheel is None:
+            _timer_wheel = TimerWheel()
+            _timer_wheel.start()
+        return _timer_wheel
+
+
+def shutdown_timer_wheel():
+    global _timer_wheel
+    with _timer_wheel_lock:
+        if _timer_wheel is not None:
+            _timer_wheel.stop()
+            _timer_wheel = None
@@ -0,0 +1,48 @@
+"""
+Checkerboard test frame of the simulated webcam.
+
+The simulator only cycles through a handful of colours, so each frame is
+rendered once (cached) and then shared as immutable bytes. Rendering is
+vectorized with NumPy when available; the pure-Python path builds the two
+distinct pixel rows once and repeats them.
+
+server/webcam_pattern.py is a copy of this module, since the server image
+is built from server/ only; keep the two identical.
+"""
+import struct
+from functools import lru_cache
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+WIDTH, HEIGHT = 320, 240
+CELL = 40
+COLORS = [(0, 100, 200), (0, 180, 100), (200, 100, 0), (150, 0, 150), (200, 200, 0)]
+
+
+@lru_cache(maxsize=None)
+def render_test_pattern(r, g, b, width=WIDTH, height=HEIGHT, cell=CELL):
+    """Render the checkerboard test frame (24-bit BMP, BGR) in the given colour."""
+    row_size = (width * 3 + 3) & ~3  # Row padding to 4 bytes
+    pixel_data_size = row_size * height
+    header = struct.pack('<2sIHHI', b'BM', 54 + pixel_data_size, 0, 0, 54)
+    dib = struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0,
+                      pixel_data_size, 2835, 2835, 0, 0)
+    bright, dark = bytes((b, g, r)), bytes((b // 2, g // 2, r // 2))
+
+    if HAS_NUMPY:
+        ys, xs = np.indices((height, width))
+        mask = ((xs // cell + ys // cell) % 2 == 0)[..., None]
+        pixels = np.where(mask, np.frombuffer(bright, np.uint8), np.frombuffer(dark, np.uint8))
+        rows = np.zeros((height, row_size), np.uint8)
+        rows[:, :width * 3] = pixels.reshape(height, width * 3)
+        return header + dib + rows.tobytes()
+
+    # Only two distinct rows exist; build them once and repeat
+    padding = b'\x00' * (row_size - width * 3)
+    even = b''.join(bright if (x // cell) % 2 == 0 else dark for x in range(width)) + padding
+    odd = b''.join(dark if (x // cell) % 2 == 0 else bright for x in range(width)) + padding
+    return header + dib + b''.join(even if (y // cell) % 2 == 0 else odd for y in range(height))
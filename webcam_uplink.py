@@ -0,0 +1,151 @@
+"""
+Webcam frame uplink from the device to the server over MQTT.
+
+Frames are published as binary messages on their own topic: a small header
+(magic, content type, capture timestamp, sequence number) followed by the
+JPEG (or simulator BMP) bytes. The server announces how many clients are
+watching on pi1/commands/webcam; with no viewers nothing is sent. The client
+should be a connection of its own (main.py shares one with the clip
+uploader), not the sensor publisher's: paho sends in order, so alarms would
+otherwise wait behind queued frames.
+
+The uplink adapts to the link: once per second it compares the sent bitrate
+with max_kbps and checks whether a frame was still unsent when the next one
+was due (the link is lagging, so that frame is dropped). On pressure it
+lowers JPEG quality first (real camera) and then halves the frame rate; with
+headroom it raises the frame rate back step by step, then the quality.
+A frame the camera has not replaced (static scene, see motion_gate.py) is
+only resent every keepalive seconds.
+"""
+import struct
+import threading
+import time
+
+FRAME_MAGIC = b"WFR1"
+FRAME_HEADER = struct.Struct("<4sBdI")  # magic, content type, capture time, sequence
+CONTENT_JPEG, CONTENT_BMP = 0, 1
+
+
+def pack_frame(frame, seq, captured_at):
+    kind = CONTENT_BMP if frame[:2] == b"BM" else CONTENT_JPEG
+    return FRAME_HEADER.pack(FRAME_MAGIC, kind, captured_at, seq) + frame
+
+
+class FrameUplink:
+    def __init__(self, client, camera, topic, max_fps=10, min_fps=1, max_kbps=4000,
+                 min_quality=30, max_quality=80, keepalive=2.0):
+        self.client = client
+        self.camera = camera
+        self.topic = topic
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.max_kbps = max_kbps
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.keepalive = keepalive
+        self.fps = max_fps
+        self.viewers = 0
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.kbps = 0.0
+        self._seq = 0
+        self._pending = None
+        self._last_frame = None
+        self._last_sent_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def set_viewers(self, count):
+        if count != self.viewers:
+            print(f"[WEBC] Stream viewers: {count}" + ("" if count else " - uplink paused"))
+        self.viewers = max(0, int(count))
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="webcam-uplink", daemon=True)
+        self._thread.start()
+        print(f"[WEBC] Frame uplink ready on {self.topic} (max {self.max_fps} fps, "
+              f"{self.max_kbps} kbps)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def get_stats(self):
+        return {
+            "viewers": self.viewers,
+            "fps": round(self.fps, 1),
+            "quality": getattr(self.camera, "quality", None),
+            "kbps": round(self.kbps, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+    def send_frame(self):
+        """Publish the camera's latest frame unless the previous one is still in flight."""
+        frame = self.camera.get_frame()
+        if frame is None:
+            return 0
+        if frame is self._last_frame and time.monotonic() - self._last_sent_at < self.keepalive:
+            return 0
+        if self._pending is not None and not self._pending.is_published():
+            self.dropped += 1
+            return -1
+        payload = pack_frame(frame, self._seq, time.time())
+        info = self.client.publish(self.topic, payload, qos=0)
+        if info.rc != 0:
+            # Not connected: nothing is queued, so don't wait on it
+            self._pending = None
+            self.dropped += 1
+            return 0
+        self._pending = info
+        self._last_frame = frame
+        self._last_sent_at = time.monotonic()
+        self._seq += 1
+        self.sent += 1
+        self.bytes_sent += len(payload)
+        return len(payload)
+
+    def _run(self):
+        window_start = time.monotonic()
+        window_bytes = 0
+        lagged = False
+
+        while not self._stop_event.is_set():
+            if self.viewers <= 0:
+                self._pending = None
+                self._last_frame = None
+                self._stop_event.wait(0.5)
+                window_start, window_bytes, lagged = time.monotonic(), 0, False
+                continue
+
+            started = time.monotonic()
+            sent = self.send_frame()
+            if sent < 0:
+                lagged = True
+            else:
+                window_bytes += sent
+
+            elapsed = time.monotonic() - window_start
+            if elapsed >= 1.0:
+                self.kbps = window_bytes * 8 / 1000 / elapsed
+                self._adapt(lagged)
+                window_start, window_bytes, lagged = time.monotonic(), 0, False
+
+            self._stop_event.wait(max(0.0, 1.0 / self.fps - (time.monotonic() - started)))
+
+    def _adapt(self, lagged):
+        quality = getattr(self.camera, "quality", None)
+        if lagged or self.kbps > self.max_kbps:
+            if quality is not None and quality > self.min_quality:
+                self.camera.quality = max(self.min_quality, quality - 10)
+            else:
+                self.fps = max(self.min_fps, self.fps / 2)
+        elif self.kbps < self.max_kbps * 0.6:
+            if self.fps < self.max_fps:
+                self.fps = min(self.max_fps, self.fps + 1)
+            elif quality is not None and quality < self.max_quality:
+                self.camera.quality = min(self.max_quality, quality + 5)